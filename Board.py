@@ -1,20 +1,29 @@
 import numpy as np
-from numba import jit
-from numba.core.errors import NumbaPendingDeprecationWarning
-from render_board import render_board
-import warnings
 
-warnings.simplefilter('ignore', category=NumbaPendingDeprecationWarning)
+# bump whenever the tracing rules change (in laser_kernels or in beam_rules, which every interpreted tracer uses), so
+# solutions persisted by an older tracer are not trusted (see SolutionCache)
+TRACER_VERSION = '2'
+
+# number of cell types in the integer mapping of the Board class (free, placed blocks, hole, fixed blocks)
+N_BLOCK_TYPES = 8
 
 
 class Board:
     """
     A class to represent a Lazors puzzle board with all relevant blocks placed.
 
+    Cells are stored as one occupancy bitmask per block type (bit row * n_cols + col is set when that cell holds the
+    block type), and the points visited by the laser as a bitmask over the grid where each cell is 2 units wide
+    (bit y * (2 * n_cols + 1) + x is set when point [x, y] is visited), so a Board is a small fixed-size record.
+
     **Attributes**
 
-        board: *list, list, int*
-            A double-nested list representing the cells and blocks on the board:
+        n_rows: *int*
+            The number of rows of cells on the board
+        n_cols: *int*
+            The number of columns of cells on the board
+        block_masks: *tuple, int*
+            Occupancy bitmask of each block type, indexed by block type:
                 0 - free
                 1 - reflective block (placed)
                 2 - refractive block (placed)
@@ -23,25 +32,41 @@ class Board:
                 5 - reflective block (fixed)
                 6 - refractive block (fixed)
                 7 - opaque block (fixed)
+        board: *list, list, int*
+            A double-nested list representing the cells and blocks on the board (rebuilt from block_masks)
         laser_pos: *list, list, int*
             A double-nested list holding [x, y] coords of the laser sources
         laser_dir: *list, list, int*
             A double-nested list holding [vx, vy] directions of the laser sources
-        laser_visited_pts: *list, list, int*
-            A double-nested list holding [x, y] coords of points that the laser travels to given this board config
+        laser_visited_pts: *dict*
+            A dict where each key is a laser ((x, y), (vx, vy)) pair and each value holds the [x, y] coords of
+            the points that laser travels to given this board config, in order (up to where it merges into the
+            beam of an earlier laser, unless get_laser_path was asked to attribute every laser its complete path)
+        laser_branches: *list, list, list, int*
+            The same points split into runs of beam steps, one run per laser source or branch split off at a
+            refractive block, each in order (consecutive points of a run are one step apart)
+        visited_mask: *int*
+            Bitmask of every point that any laser travels to given this board config
         file_ptr: *str*
             A string pointing to the .bff file that was used to generate this board
 
     **Methods**
 
         get_laser_path: computes the path that the laser takes given a board configuration
-            args - None
+            args - segment_cache (SegmentCache, optional), stats (SolverStats, optional),
+                   attribute_lasers (bool, optional)
             returns - None
+        hits_goals: checks whether the computed laser path goes through every point of a goal mask
+            args - goal_mask (int)
+            returns - Boolean
         render_board: saves the board as a visually-interpretable grid image
-            args - None
+            args - file_ptr (str, optional), point_goal_list (list, list, int, optional)
             returns - None
     """
 
+    __slots__ = ('n_rows', 'n_cols', 'block_masks', 'laser_pos', 'laser_dir', 'file_ptr', 'laser_visited_pts',
+                 'laser_branches', 'visited_mask')
+
     def __init__(self, initial_board, laser_pos, laser_dir, file_ptr):
         """
         Board class constructor
@@ -59,301 +84,146 @@ class Board:
 
             None
         """
-        self.board = initial_board  # initial config of board (with everything on it)
-        self.laser_pos = laser_pos  # [x, y] position(s) of laser source(s) on grid where cells are 3x3 across
-        self.laser_dir = laser_dir  # [dx, dy] direction(s) of laser source(s) on grid where cells are 3x3 across
+        self.n_rows = len(initial_board)
+        self.n_cols = len(initial_board[0])
+        block_masks = [0] * N_BLOCK_TYPES
+        for i, row in enumerate(initial_board):
+            for j, cell in enumerate(row):
+                block_masks[cell] |= 1 << (i * self.n_cols + j)
+        self.block_masks = tuple(block_masks)
+        self.laser_pos = laser_pos  # [x, y] position(s) of laser source(s) on grid where cells are 2 units across
+        self.laser_dir = laser_dir  # [dx, dy] direction(s) of laser source(s) on grid where cells are 2 units across
         self.file_ptr = file_ptr
-        self.laser_visited_pts = []  # initialize empty list, need it later for rendering
+        self.laser_visited_pts = {}  # initialize empty, need it later for rendering
+        self.laser_branches = []
+        self.visited_mask = 0
 
-    def get_laser_path(self):
+    @property
+    def board(self):
+        """
+        Double-nested list of the cells and blocks on the board, rebuilt from block_masks.
+        """
+        board = [[0] * self.n_cols for _ in range(self.n_rows)]
+        for block, mask in enumerate(self.block_masks):
+            while mask:
+                low_bit = mask & -mask
+                i, j = divmod(low_bit.bit_length() - 1, self.n_cols)
+                board[i][j] = block
+                mask ^= low_bit
+        return board
+
+    def get_laser_path(self, segment_cache=None, stats=None, attribute_lasers=False):
         """
         Compute the path that the laser source(s) take through the given board configuration.
 
         **Parameters**
 
-            None
+            segment_cache: *SegmentCache object*
+                Optional cache of beam segments shared between boards of the same puzzle. Without it the path is
+                computed by the compiled tracing kernel.
+            stats: *SolverStats object*
+                Optional instrumentation, credited with the board traced and its steps and refractive splits
+            attribute_lasers: *bool*
+                Trace every laser source to its end, so laser_visited_pts holds the complete path of each source. By
+                default the sources share their visited beam states, and a source merging into the beam of an earlier
+                one stops at the merge point (the points visited overall are the same).
 
         **Returns**
 
             None
         """
-        # convert board into grid using same convention as .bff file
-        new_board = np.zeros((2*len(self.board) + 1, 2*len(self.board) + 1))
-        for i, row in enumerate(self.board):
-            for j, cell in enumerate(row):
-                if cell == 0:
-                    continue
-
-                new_board[2*i + 1, 2*j + 1] = cell
-
-        # NOTE: transpose because coord system is opposite order from (row, col) accessing in the array
-        new_board = np.transpose(new_board)
-
-        # initialize dict where each key is a laser initial position/direction pair (unique) and
+        counters = None if stats is None else stats.trace_counters()
+        if segment_cache is not None:
+            visited_pts, laser_idxs, _, branch_starts = segment_cache.trace(self.block_masks, self.laser_pos,
+                                                                            self.laser_dir, counters, attribute_lasers)
+        else:
+            from laser_kernels import trace_laser_paths
+            grid = np.array(self.board, dtype=np.int8)
+            laser_pos = np.array(self.laser_pos, dtype=np.int64).reshape(-1, 2)
+            laser_dir = np.array(self.laser_dir, dtype=np.int64).reshape(-1, 2)
+            visited_pts, laser_idxs, _, branch_starts = trace_laser_paths(grid, laser_pos, laser_dir, counters,
+                                                                          attribute_lasers)
+            visited_pts = visited_pts.tolist()
+            laser_idxs = laser_idxs.tolist()
+            branch_starts = branch_starts.tolist()
+        if stats is not None:
+            stats.add('boards_traced')
+            stats.add_trace_counters(counters)
+
+        # dict where each key is a laser initial position/direction pair (unique) and
         # each value is a list of visited coordinates in order [[x1, y1], [x2, y2]]
         total_visited_pts = {}
         for i, pos in enumerate(self.laser_pos):
             total_visited_pts[(tuple(pos), tuple(self.laser_dir[i]))] = []
-
-        # now compute the traveled path for each laser source
-        for i, pos in enumerate(self.laser_pos):
-            # initialize dict where each key is a cell center's coordinates, the incoming pos, and the incoming
-            # direction, and each value is the alternate backtracking route available
-            # (a new position and a new direction)
-            backtracking_options = {}
-
-            # initialize stack, build from starting point, backtrack if you exit grid or hit opaque block,
-            # only able to continue after backtracking if another route exists because of a refraction block
-            laser_path = [pos]
-            direction = self.laser_dir[i]  # initial direction pulled from .bff file
-            laser_dir_history = [direction]  # store history of directions for backtracking
-            max_path_length = 50
-            iter = 0
-            # keep going until you've emptied the stack or you hit the upper bound on path length
-            # (prevents infinite loops)
-            while len(laser_path) > 0 and iter < max_path_length:
-                # add most recent position to total visited pts for this laser source if it's within the board
-                latest_pos = laser_path[-1]
-                direction = laser_dir_history[-1]
-
-                if pos_check(new_board, latest_pos):
-                    total_visited_pts[(tuple(pos), tuple(self.laser_dir[i]))].append(latest_pos)
-
-                # get the coordinates of the next relevant cell center (relevant for path behavior at next step)
-                next_relevant_center_coords = get_next_relevant_cell_center(latest_pos, direction)
-
-                # check cell behavior at the next relevant center
-                should_path_end = should_laser_path_end(new_board, next_relevant_center_coords)
-                if should_path_end:
-                    # backtrack until either your next relevant cell center is a refractive block or the queue empties
-                    laser_path.pop()
-                    laser_dir_history.pop()
-                    if len(laser_path) == 0:
-                        break
-                    backtracked_center_coords = get_next_relevant_cell_center(laser_path[-1], laser_dir_history[-1])
-                    backtracked_center_val = new_board[backtracked_center_coords[0], backtracked_center_coords[1]]
-                    while len(laser_path) > 0 and \
-                            (backtracked_center_val != 2 and backtracked_center_val != 6):
-                        laser_path.pop()
-                        laser_dir_history.pop()
-                        if len(laser_path) == 0:
-                            break
-                        backtracked_center_coords = get_next_relevant_cell_center(laser_path[-1], laser_dir_history[-1])
-                        backtracked_center_val = new_board[backtracked_center_coords[0], backtracked_center_coords[1]]
-
-                else:
-                    # get the position and direction of the next step in the laser path
-                    next_pos, next_direction = get_next_laser_pos_dir(new_board, next_relevant_center_coords,
-                                                                      latest_pos, direction, backtracking_options)
-                    # edge case: you already tried the alternative route from a refractive block
-                    if next_pos is None:
-                        # backtrack until either your next relevant cell center is a different refractive block
-                        # or the queue empties
-                        laser_path.pop()
-                        laser_dir_history.pop()
-                        if len(laser_path) == 0:
-                            break
-                        backtracked_center_coords = get_next_relevant_cell_center(laser_path[-1], laser_dir_history[-1])
-                        tmp_key = (tuple(backtracked_center_coords), tuple(laser_path[-1]),
-                                   tuple(laser_dir_history[-1]))
-                        backtracked_center_val = new_board[backtracked_center_coords[0],
-                                                           backtracked_center_coords[1]]
-                        found_diff_refractive_block = \
-                            (backtracked_center_val == 2 or backtracked_center_val == 6) and \
-                            backtracking_options[tmp_key] != []
-                        while not found_diff_refractive_block and len(laser_path) > 0:
-                            laser_path.pop()
-                            laser_dir_history.pop()
-                            if len(laser_path) == 0:
-                                break
-                            backtracked_center_coords = get_next_relevant_cell_center(laser_path[-1],
-                                                                                      laser_dir_history[-1])
-                            tmp_key = (tuple(backtracked_center_coords), tuple(laser_path[-1]),
-                                       tuple(laser_dir_history[-1]))
-                            backtracked_center_val = new_board[backtracked_center_coords[0],
-                                                               backtracked_center_coords[1]]
-                            found_diff_refractive_block = \
-                                (backtracked_center_val == 2 or backtracked_center_val == 6) and \
-                                backtracking_options[tmp_key] != []
-
-                    else:
-                        # update
-                        laser_path.append(next_pos)
-                        laser_dir_history.append(next_direction)
-                        iter += 1
-
-        # store visited points as attribute
+        laser_branches = []
+        for pt, i, branch_start in zip(visited_pts, laser_idxs, branch_starts):
+            total_visited_pts[(tuple(self.laser_pos[i]), tuple(self.laser_dir[i]))].append(pt)
+            if branch_start:
+                laser_branches.append([])
+            laser_branches[-1].append(pt)
+
+        # store visited points as attributes
         self.laser_visited_pts = total_visited_pts
+        self.laser_branches = laser_branches
+        self.visited_mask = points_to_mask(visited_pts, self.n_cols)
 
-    def render_board(self):
+    def hits_goals(self, goal_mask):
         """
-        Render the board configuration as a visually-interpretable grid image.
+        Check whether the computed laser path goes through every required point (call get_laser_path first).
 
         **Parameters**
 
-            None
+            goal_mask: *int*
+                Bitmask of the points that the laser must pass through (see points_to_mask)
 
         **Returns**
 
-            None
+            *Boolean*
+                True if every point of goal_mask is visited
         """
-        laser_list = [pos + self.laser_dir[i] for i, pos in enumerate(self.laser_pos)]
-        render_board(self.board, laser_list, self.file_ptr)
-
-
-@jit(nopython=True)
-def pos_check(coord_board, coords):
-    """
-    Check if a given position is within the gridded board.
-
-    **Parameters**
-
-        coord_board: *list, list, int*
-            Board represented by grid where each cell is 2 units wide
-        coords: *list, int*
-            [x, y] coordinate pair to check
-
-    **Returns**
-
-        *Boolean*
-            True if the given coordinates are within the board
-    """
-    return 0 <= coords[0] < coord_board.shape[0] and 0 <= coords[1] < coord_board.shape[1]
-
+        return self.visited_mask & goal_mask == goal_mask
 
-@jit(nopython=True)
-def get_next_relevant_cell_center(latest_pos, direction):
-    """
-    Get the next relevant cell center coordinates.
+    def render_board(self, file_ptr=None, point_goal_list=None):
+        """
+        Render the board configuration as a visually-interpretable grid image, including the traced laser path
+        (if get_laser_path has been called).
 
-    **Parameters**
+        **Parameters**
 
-        latest_pos: *list, int*
-            The latest position of the laser's path
-        direction: *list, int*
-            The latest direction of the laser's path
+            file_ptr: *str*
+                Path of the puzzle the image is named after (defaults to the .bff file this board came from)
+            point_goal_list: *list, list, int*
+                Optional [x, y] positions of the points that the laser must pass through, drawn on the image
 
-    **Returns**
+        **Returns**
 
-        next_relevant_center_coords: *list, int*
-            The coordinates of the next relevant cell center (in the path of the laser)
-    """
-    # case 1: latest position is within a vertical slice between cells
-    if latest_pos[0] % 2 == 0:
-        if direction[0] > 0:
-            next_relevant_center_coords = [latest_pos[0] + 1, latest_pos[1]]
-        else:
-            next_relevant_center_coords = [latest_pos[0] - 1, latest_pos[1]]
-    # case 2: latest position is within a horizontal slice between cells
-    else:
-        if direction[1] > 0:
-            next_relevant_center_coords = [latest_pos[0], latest_pos[1] + 1]
-        else:
-            next_relevant_center_coords = [latest_pos[0], latest_pos[1] - 1]
-    return next_relevant_center_coords
+            None
+        """
+        from render_board import render_board
+        laser_list = [pos + self.laser_dir[i] for i, pos in enumerate(self.laser_pos)]
+        render_board(self.board, laser_list, self.file_ptr if file_ptr is None else file_ptr,
+                     pointGoalList=point_goal_list, laserPaths=self.laser_branches)
 
 
-def get_next_laser_pos_dir(new_board, next_relevant_center_coords, latest_pos, direction, backtracking_options):
+def points_to_mask(points, n_cols):
     """
-    Get the next position and direction of the laser path.
+    Pack points of the grid where each cell is 2 units wide into a bitmask.
 
     **Parameters**
 
-        new_board: *list, list, int*
-            Double-nested list representing the current board state
-        next_relevant_center_coords: *list, int*
-            The coordinates of the next cell center in the path of the laser
-        latest_pos: *list, int*
-            The latest position of the laser's path
-        direction: *list, int*
-            The latest direction of the laser's path
-        backtracking_options: *dict*
-            Dictionary holding backtracking options for refractive cells, where keys are
-                ((center_x, center_y), (latest_pos_x, latest_pos_y), (direction_x, direction_y))
-                and values are [[latest_pos_x, latest_pos_y], [next_direction_x, next_direction_y]]
+        points: *list, list, int*
+            A double-nested list holding [x, y] coords of points on the board
+        n_cols: *int*
+            The number of columns of cells on the board
 
     **Returns**
 
-        next_pos: *list, int*
-            The coordinates of the next position in the laser path
-        next_direction: *list, int*
-            The next direction that the laser path will take
+        mask: *int*
+            Bitmask with bit y * (2 * n_cols + 1) + x set for every point
     """
-    next_relevant_cell_val = new_board[next_relevant_center_coords[0], next_relevant_center_coords[1]]
-
-    # case 1: the next relevant cell is empty or a hole
-    if next_relevant_cell_val == 0 or next_relevant_cell_val == 4:
-        next_pos = [latest_pos[0] + direction[0], latest_pos[1] + direction[1]]  # move normally by one step
-        next_direction = direction  # direction is unchanged
-
-    # case 2: the next relevant cell is a reflective cell, so change direction
-    elif next_relevant_cell_val == 1 or next_relevant_cell_val == 5:
-        next_pos = latest_pos  # position is unchanged
-        # if you're in a vertical slice between cells, just changing dx
-        if latest_pos[0] % 2 == 0:
-            next_direction = [-1 * direction[0], direction[1]]
-        else:
-            next_direction = [direction[0], -1 * direction[1]]
-
-    # case 3: the next relevant cell is a refractive cell, so initially pass through it but backtrack later and reflect
-    elif next_relevant_cell_val == 2 or next_relevant_cell_val == 6:
-        # first, check if we've encountered this before (at the same previous position and direction)
-        tmp_key = (tuple(next_relevant_center_coords), tuple(latest_pos), tuple(direction))
-        if tmp_key not in list(backtracking_options.keys()):
-            # create entry with the other next_pos and next_direction for when you backtrack here
-            if latest_pos[0] % 2 == 0:
-                next_direction = [-1 * direction[0], direction[1]]
-            else:
-                next_direction = [direction[0], -1 * direction[1]]
-            backtracking_options[tmp_key] = [latest_pos, next_direction]
-
-            # move normally through the refractive block like it's clear
-            next_pos = [latest_pos[0] + direction[0], latest_pos[1] + direction[1]]  # move normally by one step
-            next_direction = direction  # direction is unchanged
-
-        # this cell came back up because you backtracked, so take the other route if you haven't already
-        else:
-            if len(backtracking_options[tmp_key]) == 0:
-                # this is when you already backtracked to the alternate route
-                next_pos = None
-                next_direction = None
-            else:
-                next_pos = backtracking_options[tmp_key][0]
-                next_direction = backtracking_options[tmp_key][1]
-                # wipe the alternate route so you don't take it again
-                backtracking_options[tmp_key] = []
-
-    # case 4: the next relevant cell is an opaque cell, so the beam stops here
-    elif next_relevant_cell_val == 3 or next_relevant_cell_val == 7:
-        next_pos = None
-        next_direction = None
-
-    else:
-        return
-
-    return next_pos, next_direction
-
-
-@jit(nopython=True)
-def should_laser_path_end(new_board, next_relevant_center_coords):
-    """
-    Determine whether the next relevant cell implies that the laser path should end at this point.
-
-    **Parameters**
-
-        new_board: *list, list, int*
-            Double-nested list representing the current board state
-        next_relevant_center_coords: *list, int*
-            The coordinates of the next cell center in the path of the laser
+    width = 2 * n_cols + 1
+    mask = 0
+    for x, y in points:
+        mask |= 1 << (y * width + x)
+    return mask
 
-    **Returns**
-
-        *boolean*
-            True if the path should end at this point.
-    """
-    # just care whether the next cell is off the board OR it's an opaque cell
-    if not pos_check(new_board, next_relevant_center_coords) or new_board[next_relevant_center_coords[0],
-                                                                          next_relevant_center_coords[1]] == 3:
-        return True
-    else:
-        return False
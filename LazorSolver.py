@@ -1,17 +1,42 @@
-from Board import Board
+from Board import Board, points_to_mask
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
 import numpy as np
 import time
-from bffParser import openBFF
+from contextlib import contextmanager, nullcontext
+from backtrack_search import backtrack_search
+from constraint_search import constraint_search
+from PuzzlePack import load_puzzle_file, split_pack_entry, PACK_SUFFIX
+from PlacementEnumerator import PlacementEnumerator, ENUMERATION_ORDERS
+from PuzzleIndex import PuzzleIndex
+from PuzzleSymmetry import PuzzleSymmetry
+from SegmentCache import SegmentCache
+from SiteOrdering import SiteOrdering, SITE_HEURISTICS
+from SolutionCache import canonical_puzzle_hash
+from SearchCheckpoint import SearchCheckpoint, search_key
+from SolveBudget import SolveBudget
+from SolverStats import SolverStats
+
+# search methods understood by LazorSolver.solve
+SEARCH_METHODS = ('enumerate', 'backtrack', 'constraint')
 
 
 class LazorSolver:
     """
     A class to represent a Lazors puzzle solver, which is the high-level class that a user would instantiate.
 
+    Constructing a solver has no side effects. Each phase is an explicit call, and only render touches the filesystem:
+        solver = LazorSolver('bff/mad_1.bff')
+        solver.parse_bff()          # or solver.load_puzzle(grid, laserList, pointGoalList, blockList)
+        solver.precompute()         # optional, solve runs it when needed
+        result = solver.solve()     # SolveResult, no printing or file output
+        solver.render()             # opt-in PNG next to the .bff file
+    solve_file(file_ptr) runs all of them with progress messages, like the original script.
+
     **Attributes**
 
         file_ptr: *str*
-            A string pointing to the .bff file to solve
+            A string pointing to the .bff file to solve (None for puzzles loaded from parsed structures)
         empty_board: *list, list, int*
             A double-nested list representing the given puzzle board with none of the placeable blocks on it
         laser_pos_list: *list, list, int*
@@ -20,78 +45,221 @@ class LazorSolver:
             A double-nested list holding [vx, vy] directions of the laser sources
         pointGoalList: *list, list, int*
             A double-nested list holding [x, y] positions of the points that the laser must pass through
+        goal_mask: *int*
+            Bitmask of the points that the laser must pass through (see Board.points_to_mask)
+        puzzle_hash: *str*
+            Canonical hash of the parsed puzzle (see SolutionCache.canonical_puzzle_hash)
         blockList: *list, int*
             A list holding the blocks that must be placed using the following convention:
                 1 - reflective block
                 2 - refractive block
                 3 - opaque block
+        puzzle_index: *PuzzleIndex object*
+            Static analysis of the puzzle (relevant sites, reachable goals), built by precompute
+        ordering: *str or callable*
+            The heuristic ranking the sites the enumerator places blocks on (see SiteOrdering)
+        enumeration_order: *str*
+            The order the enumerator visits placements in (see PlacementEnumerator)
+        search_sites: *list, int*
+            Flat indexes of the sites the enumerator places blocks on, most promising first, built by precompute
+        symmetry: *PuzzleSymmetry object*
+            The reflections and rotations mapping the puzzle onto itself, built by precompute
+        use_symmetry: *bool*
+            Trace only one board per orbit of the puzzle's symmetry group
         solved_board: *Board object*
             A Board object representing the configuration of the board when the puzzle is solved
-        unique_boards: *list, Board object*
-            A list of the unique Board objects returned by the method to generate unique board configurations
+        timings: *dict, str, float*
+            Wall-clock seconds spent in each phase ('parse', 'precompute', 'solve', 'render') so far
+        boards_evaluated: *int*
+            The number of candidate boards whose laser path was computed during the last solve
+        processes: *int*
+            The number of worker processes used to solve (1 means solve serially in this process)
+        chunk_size: *int*
+            The number of candidate boards handed to a worker at a time when solving in parallel
+        batch_size: *int*
+            The number of candidate boards traced per call to the compiled batch evaluator
+        method: *str*
+            The search method used by solve:
+                'enumerate' - trace every unique board configuration (in batches, optionally in parallel)
+                'backtrack' - place blocks one at a time along the current beam paths, pruning dead branches
+                'constraint' - decide cells in the order the beam reaches them, propagating block counts and goal
+                               reachability after each decision (see constraint_search)
+        boards_pruned: *int*
+            The number of branches cut without being expanded during the last solve (backtracking and constraint
+            searches only)
+        segment_cache: *SegmentCache object*
+            Cache of beam segments reused across the boards traced by the backtracking search (None if disabled)
+        solution_cache: *SolutionCache object*
+            Persistent cache of solved placements, checked before searching (None if disabled)
+        stats: *SolverStats object*
+            Hot-path counters and per-phase timers collected across phases (None if instrumentation is off)
+        budget: *SolveBudget object*
+            The limits and best partial candidate of the last solve (None if it ran without a budget)
+        checkpoint: *SearchCheckpoint object*
+            The progress record of the last solve (None if it ran without a checkpoint)
+        verbose: *bool*
+            Print progress messages from each phase
 
     **Methods**
 
         parse_bff: parses a .bff file from a given file pointer
-            args - file_ptr (string)
+            args - file_ptr (string, optional)
+            returns - None
+        load_puzzle: loads an already-parsed puzzle
+            args - grid, laserList, pointGoalList, blockList (as returned by openBFF)
             returns - None
-        generate_possible_boards: generates all unique Board objects for the given blocks to place
+        precompute: builds the PuzzleIndex used to restrict the sites searched, ranks them with the SiteOrdering
+                    heuristic, and builds the PuzzleSymmetry used to skip boards equivalent to one already searched
             args - None
             returns - None
-        solve: combs through the unique boards to find one whose laser path goes through all required points
+        generate_possible_boards: lazily generates all unique Board objects for the given blocks to place
             args - None
+            yields - Board object
+        solve: searches for a board whose laser path goes through all required points
+            args - budget (SolveBudget, optional), checkpoint (SearchCheckpoint, optional)
+            returns - SolveResult object
+        solve_parallel: splits the unique boards into chunks and searches them on a pool of worker processes
+            args - None
+            returns - Board object (None if no solution exists)
+        render: saves the solved board as a visually-interpretable grid image
+            args - output_ptr (string, optional)
             returns - None
+        get_placement: lists the blocks placed in the solved board
+            args - None
+            returns - list of [row, col, block] (None if not solved)
     """
 
-    def __init__(self, file_ptr):
+    def __init__(self, file_ptr=None, processes=1, chunk_size=8192, batch_size=1024, method='enumerate',
+                 segment_cache_size=0, solution_cache=None, use_symmetry=True, stats=None, ordering='beam_path',
+                 enumeration_order='best_first', verbose=False):
         """
         LazorSolver class constructor
 
         **Parameters**
 
             file_ptr: *str*
-                A string pointing to the .bff file to solve
+                A string pointing to the .bff file to solve (omit it to load a parsed puzzle with load_puzzle)
+            processes: *int*
+                The number of worker processes to solve with (None uses every core, 1 solves serially)
+            chunk_size: *int*
+                The number of candidate boards handed to a worker at a time when solving in parallel
+            batch_size: *int*
+                The number of candidate boards traced per call to the compiled batch evaluator
+            method: *str*
+                The search method used by solve, one of SEARCH_METHODS
+            segment_cache_size: *int*
+                The maximum number of beam segments cached by the backtracking search (0 disables the cache)
+            solution_cache: *SolutionCache object*
+                Persistent cache of solved placements. A cached placement is verified with a single trace before it
+                is used, and new solutions are stored in it. This is the only way solve touches the filesystem.
+            use_symmetry: *bool*
+                Trace only one board per orbit when the puzzle maps onto itself under reflections or rotations
+            stats: *SolverStats object*
+                Collect counters and per-phase timers into this object, optionally profiling or sampling each
+                phase. Leave it out to run without any instrumentation.
+            ordering: *str or callable*
+                The heuristic ranking the sites the enumerator places blocks on, one of SiteOrdering.SITE_HEURISTICS
+                or a callable taking (site_ordering, site) and returning a sort key
+            enumeration_order: *str*
+                The order the enumerator visits placements in, one of PlacementEnumerator.ENUMERATION_ORDERS
+            verbose: *bool*
+                Print progress messages from each phase
 
         **Returns**
 
             None
         """
-        print(f'attempting to solve {file_ptr}...')
+        if method not in SEARCH_METHODS:
+            raise ValueError(f'unknown search method {method!r}, expected one of {SEARCH_METHODS}')
+        if not callable(ordering) and ordering not in SITE_HEURISTICS:
+            raise ValueError(f'unknown site heuristic {ordering!r}, expected one of {SITE_HEURISTICS} or a callable')
+        if enumeration_order not in ENUMERATION_ORDERS:
+            raise ValueError(f'unknown enumeration order {enumeration_order!r}, expected one of {ENUMERATION_ORDERS}')
         self.file_ptr = file_ptr
         self.empty_board = None
         self.laser_pos_list = []
         self.laser_dir_list = []
         self.pointGoalList = None
+        self.goal_mask = 0
         self.block_list = None
+        self.puzzle_index = None
+        self.search_sites = None
+        self.ordering = ordering
+        self.enumeration_order = enumeration_order
+        self.symmetry = None
+        self.use_symmetry = use_symmetry
         self.solved_board = None
-        self.unique_boards = []
-
-        self.parse_bff()
-        self.solve()
+        self.timings = {}
+        self.boards_evaluated = 0
+        self.boards_pruned = 0
+        self.processes = multiprocessing.cpu_count() if processes is None else processes
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.method = method
+        self.segment_cache_size = segment_cache_size
+        self.segment_cache = None
+        self.solution_cache = solution_cache
+        self.puzzle_hash = None
+        self.stats = stats
+        self.budget = None
+        self.checkpoint = None
+        self.verbose = verbose
 
-    def parse_bff(self):
+    def parse_bff(self, file_ptr=None):
         """
         Parse a given .bff file to extract the information needed to solve the puzzle.
 
         **Parameters**
 
+            file_ptr: *str*
+                A string pointing to the .bff file (or the puzzle of a pack, 'pack.lzpk#N') to parse (defaults to the
+                one given to the constructor)
+
+        **Returns**
+
             None
+        """
+        if file_ptr is not None:
+            self.file_ptr = file_ptr
+        if self.file_ptr is None:
+            raise ValueError('no .bff file to parse, pass file_ptr or use load_puzzle')
+        start = time.perf_counter()
+        self.log(f'parsing {self.file_ptr}...')
+        with self._phase('parse'):
+            self.load_puzzle(*load_puzzle_file(self.file_ptr))
+        self.timings['parse'] = time.perf_counter() - start
+
+    def load_puzzle(self, grid, laserList, pointGoalList, blockList):
+        """
+        Load an already-parsed puzzle, e.g. one kept in memory by a service (resets any previous solve).
+
+        **Parameters**
+
+            grid, laserList, pointGoalList, blockList:
+                The puzzle, in the format returned by bffParser.openBFF
 
         **Returns**
 
             None
         """
-        grid, laserList, pointGoalList, blockList = openBFF(self.file_ptr)
         self.empty_board = grid
         self.pointGoalList = pointGoalList
+        self.goal_mask = points_to_mask(pointGoalList, len(grid[0]))
         self.block_list = blockList
-        for laser in laserList:
-            self.laser_pos_list.append(laser[0:2])
-            self.laser_dir_list.append(laser[2:])
+        self.laser_pos_list = [laser[0:2] for laser in laserList]
+        self.laser_dir_list = [laser[2:] for laser in laserList]
+        self.puzzle_hash = canonical_puzzle_hash(grid, laserList, pointGoalList, blockList)
+        self.puzzle_index = None
+        self.search_sites = None
+        self.symmetry = None
+        self.segment_cache = None
+        self.solved_board = None
 
-    def generate_possible_boards(self):
+    def precompute(self):
         """
-        Generate all unique boards for the given empty board and blocks to place.
+        Analyse the parsed puzzle once before searching: find the free cells a beam can ever read (every other free
+        cell is interchangeable) and the goals that can be reached at all, rank the relevant cells with the ordering
+        heuristic, and find the reflections and rotations that map the puzzle onto itself.
 
         **Parameters**
 
@@ -101,86 +269,735 @@ class LazorSolver:
 
             None
         """
-        possible_configs = generate_possible_configs(self.empty_board, self.block_list)
-        for filled_board in possible_configs:
-            b = Board(filled_board, self.laser_pos_list, self.laser_dir_list, self.file_ptr)
-            self.unique_boards.append(b)
+        if self.empty_board is None:
+            self.parse_bff()
+        start = time.perf_counter()
+        with self._phase('precompute'):
+            self.puzzle_index = PuzzleIndex(self.empty_board, self.laser_pos_list, self.laser_dir_list,
+                                            self.pointGoalList, len(self.block_list))
+            self.search_sites = SiteOrdering(self.empty_board, self.laser_pos_list, self.laser_dir_list,
+                                             self.pointGoalList, self.puzzle_index).order(self.ordering)
+            self.symmetry = PuzzleSymmetry(self.empty_board, self.laser_pos_list, self.laser_dir_list,
+                                           self.pointGoalList, self.puzzle_index.relevant_sites)
+        if len(self.symmetry.symmetries) > 0:
+            self.log(f'found symmetries: {", ".join(self.symmetry.symmetries)}')
+        self.timings['precompute'] = time.perf_counter() - start
 
-    def solve(self):
+    def generate_possible_boards(self):
         """
-        Comb through all generated boards to find one whose laser path goes through the required points.
+        Lazily generate all unique boards for the given empty board and blocks to place.
 
         **Parameters**
 
             None
 
+        **Yields**
+
+            board: *Board object*
+                One unique board configuration, built only when the consumer asks for it
+        """
+        if self.puzzle_index is None:
+            self.precompute()
+        for filled_board in generate_possible_configs(self.empty_board, self.block_list,
+                                                      free_sites=self.search_sites, order=self.enumeration_order):
+            yield Board(filled_board, self.laser_pos_list, self.laser_dir_list, self.file_ptr)
+
+    def solve(self, budget=None, checkpoint=None):
+        """
+        Search for a board whose laser path goes through the required points, using the configured method.
+        Parses and precomputes first if that has not been done yet. Never prints (unless verbose) or writes files.
+
+        With a budget the search is anytime: it stops once the time or evaluation limit is reached or it is cancelled,
+        and the result then holds the best candidate found so far and how many goals its beam covers.
+
+        With a checkpoint (enumeration only) the ranges of boards covered, the counters, and the best partial
+        candidate are written to the checkpoint file as the search goes. A solve given the file of an earlier,
+        interrupted solve of the same puzzle only searches the boards that one did not cover.
+
+        **Parameters**
+
+            budget: *SolveBudget object*
+                Optional time and evaluation limits, cancellation, and progress reports (restarted by this call)
+            checkpoint: *SearchCheckpoint object*
+                Optional progress record to resume from and to keep up to date
+
+        **Returns**
+
+            result: *SolveResult object*
+                The placement, traced paths, timings, and search counters
+        """
+        if self.puzzle_index is None:
+            self.precompute()
+
+        start = time.perf_counter()
+        self.log('solving...')
+        self.solved_board = None
+        self.boards_evaluated = 0
+        self.boards_pruned = 0
+        self.budget = budget
+        if budget is not None:
+            budget.start(len(self.pointGoalList))
+        self.checkpoint = checkpoint
+        if checkpoint is not None:
+            self._begin_checkpoint()
+        with self._phase('solve'), self._saving_checkpoint():
+            filled_board = None
+            from_cache = False
+            if self.solution_cache is not None:
+                self.solved_board = self._check_cached_solution()
+                from_cache = self.solved_board is not None
+
+            if from_cache:
+                self.log('found cached solution')
+            elif not self.puzzle_index.solvable:
+                # some goal can never be reached, no need to search
+                pass
+            elif self.method == 'backtrack':
+                if self.segment_cache_size > 0 and self.segment_cache is None:
+                    self.segment_cache = SegmentCache(len(self.empty_board), len(self.empty_board[0]),
+                                                      self.segment_cache_size)
+                filled_board, self.boards_evaluated, self.boards_pruned = backtrack_search(
+                    self.empty_board, self.block_list, self.laser_pos_list, self.laser_dir_list, self.pointGoalList,
+                    self.segment_cache, self._search_symmetry(), self.stats, budget)
+            elif self.method == 'constraint':
+                filled_board, self.boards_evaluated, self.boards_pruned = constraint_search(
+                    self.empty_board, self.block_list, self.laser_pos_list, self.laser_dir_list, self.pointGoalList,
+                    self.stats, budget)
+            elif checkpoint is not None and checkpoint.status != 'running':
+                # an earlier run finished this search, the checkpoint holds its outcome
+                filled_board = checkpoint.solution
+            elif self.processes > 1:
+                self.solved_board = self.solve_parallel()
+            else:
+                # with a checkpoint, only the ranges it has not covered yet
+                ranges = [(0, None)] if checkpoint is None else checkpoint.uncovered()
+                for lo, hi in ranges:
+                    filled_board, n_evaluated = search_configs(self.empty_board, self.block_list,
+                                                               self.laser_pos_list, self.laser_dir_list,
+                                                               self.pointGoalList, lo, hi, self.batch_size,
+                                                               free_sites=self.search_sites,
+                                                               symmetry=self._search_symmetry(), stats=self.stats,
+                                                               budget=budget, order=self.enumeration_order,
+                                                               checkpoint=checkpoint)
+                    self.boards_evaluated += n_evaluated
+                    if filled_board is not None or (budget is not None and budget.stopped):
+                        break
+            if filled_board is not None:
+                self.solved_board = Board(filled_board, self.laser_pos_list, self.laser_dir_list, self.file_ptr)
+                self.solved_board.get_laser_path(attribute_lasers=True)
+            if self.solution_cache is not None and self.solved_board is not None and not from_cache:
+                self.solution_cache.put(self.puzzle_hash, self.get_placement())
+            if checkpoint is not None:
+                if self.solved_board is not None:
+                    checkpoint.finish(self.solved_board.board)
+                elif budget is not None and budget.stopped:
+                    checkpoint.save()
+                else:
+                    checkpoint.finish()
+        self.timings['solve'] = time.perf_counter() - start
+
+        if self.solved_board is None and budget is not None and budget.stopped:
+            self.log(f'stopped ({budget.stop_reason}) with {max(budget.best_score, 0)}/{budget.n_goals} goals covered')
+        elif self.solved_board is None:
+            self.log('*** could not find a solution ***')
+        else:
+            self.log(f'solved in {round(self.timings["solve"], 2)} seconds')
+        return SolveResult(self, from_cache)
+
+    def _begin_checkpoint(self):
+        """
+        Load the checkpoint of this search (or start it afresh), and carry the progress of an earlier run over to
+        the counters, the instrumentation, and the budget.
+        """
+        checkpoint = self.checkpoint
+        if self.method != 'enumerate':
+            raise ValueError(f"checkpoints need method='enumerate', the {self.method} search has no enumeration cursor")
+        n_configs = len(PlacementEnumerator(self.search_sites, self.block_list, self.enumeration_order))
+        checkpoint.begin(search_key(self.puzzle_hash, self.search_sites, self.block_list, self.enumeration_order),
+                         n_configs)
+        if not checkpoint.resumed:
+            return
+        self.log(f'resuming from {checkpoint.path} ({checkpoint.status}, {checkpoint.n_covered}/{n_configs} boards '
+                 f'covered)')
+        self.boards_evaluated = checkpoint.counters['boards_traced']
+        if self.stats is not None:
+            self.stats.merge(checkpoint.counters)
+        if self.budget is not None and checkpoint.best_board is not None:
+            self.budget.offer(checkpoint.best_score, checkpoint.best_board)
+
+    @contextmanager
+    def _saving_checkpoint(self):
+        """
+        Context manager writing the checkpoint if the search is interrupted by an exception (e.g. Ctrl-C).
+        """
+        try:
+            yield
+        except BaseException:
+            if self.checkpoint is not None:
+                self.checkpoint.save()
+            raise
+
+    def _phase(self, name):
+        """
+        Context manager timing a phase in the instrumentation (does nothing when instrumentation is off).
+        """
+        return nullcontext() if self.stats is None else self.stats.phase(name)
+
+    def _search_symmetry(self):
+        """
+        The PuzzleSymmetry handed to the search (None when disabled or when the puzzle has no symmetry).
+        """
+        if self.use_symmetry and len(self.symmetry) > 1:
+            return self.symmetry
+        return None
+
+    def _check_cached_solution(self):
+        """
+        Look the puzzle up in the solution cache and verify the cached placement with a single trace.
+        Returns the solved Board, or None (dropping the entry if it no longer solves the puzzle).
+        """
+        placement = self.solution_cache.get(self.puzzle_hash)
+        if placement is None:
+            return None
+        filled_board = [list(row) for row in self.empty_board]
+        for row, col, block in placement:
+            filled_board[row][col] = block
+        board = Board(filled_board, self.laser_pos_list, self.laser_dir_list, self.file_ptr)
+        board.get_laser_path(stats=self.stats)
+        self.boards_evaluated += 1
+        if not board.hits_goals(self.goal_mask):
+            self.solution_cache.invalidate(self.puzzle_hash)
+            return None
+        return board
+
+    def render(self, output_ptr=None):
+        """
+        Save the solved board as a visually-interpretable grid image.
+
+        **Parameters**
+
+            output_ptr: *str*
+                Path of the puzzle the image is named after ('<name>_solved.png' next to it). Defaults to the
+                .bff file that was parsed; a puzzle of a pack is named after the pack and its position
+                ('levels_17_solved.png' for 'levels.lzpk#17').
+
         **Returns**
 
             None
         """
+        if self.solved_board is None:
+            raise ValueError('nothing to render, the puzzle has not been solved')
+        output_ptr = self.file_ptr if output_ptr is None else output_ptr
+        if output_ptr is None:
+            raise ValueError('no output path to render to, pass output_ptr')
+        entry = split_pack_entry(output_ptr)
+        if entry is not None:
+            output_ptr = f'{entry[0][:-len(PACK_SUFFIX)]}_{entry[1]}.bff'
         start = time.perf_counter()
-        self.generate_possible_boards()
-        for board in self.unique_boards:
-            board.get_laser_path()
+        self.log('rendering solution board...')
+        with self._phase('render'):
+            self.solved_board.render_board(output_ptr, self.pointGoalList)
+        self.timings['render'] = time.perf_counter() - start
+
+    def log(self, message):
+        """
+        Print a progress message (only when verbose).
+
+        **Parameters**
+
+            message: *str*
+                The message to print
+
+        **Returns**
 
-            total_visited_pts = []
-            for val in list(board.laser_visited_pts.values()):
-                total_visited_pts += val
+            None
+        """
+        if self.verbose:
+            print(message)
+
+    def get_placement(self):
+        """
+        List the blocks placed in the solved board.
+
+        **Parameters**
+
+            None
 
-            if not np.any([pt not in total_visited_pts for pt in self.pointGoalList]):
-                print('found solution')
-                self.solved_board = board
-                break
+        **Returns**
 
-        end = time.perf_counter()
+            placement: *list, list, int*
+                [row, col, block] for every block placed (None if the puzzle was not solved)
+        """
         if self.solved_board is None:
-            print('*** could not find a solution ***')
+            return None
+        return self._placement_of(self.solved_board.board)
+
+    def _placement_of(self, filled_board):
+        """
+        [row, col, block] for every block placed on a filled board.
+        """
+        return [[i, j, cell] for i, (empty_row, row) in enumerate(zip(self.empty_board, filled_board))
+                for j, (empty_cell, cell) in enumerate(zip(empty_row, row)) if cell != empty_cell]
+
+    def solve_parallel(self):
+        """
+        Split the unique boards into index ranges and search them on a pool of worker processes. As soon as one
+        worker finds a solution (or the budget runs out), every other worker is told to stop and the chunks not yet
+        started are cancelled.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            solved_board: *Board object*
+                A Board object whose laser path goes through all required points (None if no solution exists)
+        """
+        free_sites = self.search_sites
+        symmetry = self._search_symmetry()
+        n_configs = len(PlacementEnumerator(free_sites, self.block_list, self.enumeration_order))
+        # with a checkpoint only the ranges it has not covered yet are searched
+        gaps = [(0, n_configs)] if self.checkpoint is None else self.checkpoint.uncovered()
+        chunk_bounds = ((lo, min(lo + self.chunk_size, gap_hi)) for gap_lo, gap_hi in gaps
+                        for lo in range(gap_lo, gap_hi, self.chunk_size))
+
+        # load the compiled kernels before forking, so the workers inherit them instead of each loading them again
+        from laser_kernels import warm_up
+        warm_up()
+        stop_event = multiprocessing.Event()
+        solved_board = None
+        budget = self.budget
+        timeout = None
+        allowances = {}  # evaluations set aside for each pending chunk, so the chunks never exceed the budget together
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=init_solve_worker,
+                                 initargs=(stop_event,)) as executor:
+            # keep a few chunks queued per worker rather than submitting the whole search space at once
+            pending = set()
+            max_pending = 4 * self.processes
+            while True:
+                while len(pending) < max_pending:
+                    # each chunk runs under what is left of the budget when it is queued
+                    budget_limits = None
+                    if budget is not None:
+                        allowance = budget.remaining_evaluations()
+                        if allowance is not None:
+                            allowance -= sum(allowances.values())
+                            if allowance <= 0:
+                                break
+                        budget_limits = (budget.remaining_time(), allowance)
+                    lo, hi = next(chunk_bounds, (None, None))
+                    if lo is None:
+                        break
+                    future = executor.submit(solve_chunk, self.empty_board, self.block_list, self.laser_pos_list,
+                                             self.laser_dir_list, self.pointGoalList, lo, hi, self.batch_size,
+                                             free_sites, symmetry, self.stats is not None, budget_limits,
+                                             self.enumeration_order, self.checkpoint is not None)
+                    pending.add(future)
+                    if budget_limits is not None and budget_limits[1] is not None:
+                        allowances[future] = min(budget_limits[1], hi - lo)
+                if len(pending) == 0:
+                    break
+
+                if budget is not None:
+                    # wake up regularly to report progress and check the limits even while no chunk completes
+                    remaining_time = budget.remaining_time()
+                    timeout = budget.progress_interval if remaining_time is None else \
+                        min(budget.progress_interval, remaining_time)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    allowances.pop(future, None)
+                    filled_board, n_evaluated, counters, best, progress = future.result()
+                    self._collect_chunk(n_evaluated, counters, best, progress)
+                    if filled_board is not None and solved_board is None:
+                        solved_board = Board(filled_board, self.laser_pos_list, self.laser_dir_list, self.file_ptr)
+                        solved_board.get_laser_path(attribute_lasers=True)
+                if budget is not None:
+                    budget.charge(0)
+
+                if solved_board is not None or (budget is not None and budget.stopped):
+                    # cancel everything: queued chunks never start, running chunks return at their next check
+                    stop_event.set()
+                    for future in pending:
+                        future.cancel()
+                    for future in pending:
+                        if not future.cancelled():
+                            filled_board, n_evaluated, counters, best, progress = future.result()
+                            self._collect_chunk(n_evaluated, counters, best, progress)
+                            if filled_board is not None and solved_board is None:
+                                solved_board = Board(filled_board, self.laser_pos_list, self.laser_dir_list,
+                                                     self.file_ptr)
+                                solved_board.get_laser_path(attribute_lasers=True)
+                    break
+
+        return solved_board
+
+    def _collect_chunk(self, n_evaluated, counters, best, progress):
+        """
+        Add the counters, best candidate, and progress returned by a solve_chunk worker task.
+        """
+        self.boards_evaluated += n_evaluated
+        if counters is not None:
+            self.stats.merge(counters)
+        if best is not None:
+            self.budget.charge(n_evaluated)
+            if best[1] is not None:
+                self.budget.offer(*best)
+        if progress is not None:
+            self.checkpoint.merge(progress)
+
+
+class SolveResult:
+    """
+    A class holding the outcome of one LazorSolver.solve call.
+
+    **Attributes**
+
+        solved: *bool*
+            True if a board whose laser path goes through all required points was found
+        board: *Board object*
+            The solved board (None if not solved)
+        placement: *list, list, int*
+            [row, col, block] for every block placed (None if not solved)
+        laser_paths: *dict*
+            The points each laser travels to on the solved board (see Board.laser_visited_pts, empty if not solved)
+        boards_evaluated: *int*
+            The number of candidate boards whose laser path was computed
+        boards_pruned: *int*
+            The number of branches cut without being expanded (backtracking and constraint searches only)
+        timings: *dict, str, float*
+            Wall-clock seconds spent in each phase up to and including this solve
+        method: *str*
+            The search method used
+        from_cache: *bool*
+            True if the placement came from the solution cache (verified by a single trace) instead of a search
+        symmetries: *list, str*
+            Names of the reflections and rotations mapping the puzzle onto itself (see PuzzleSymmetry)
+        stats: *dict*
+            Snapshot of the solver's instrumentation (see SolverStats.to_dict, None if instrumentation is off)
+        n_goals: *int*
+            The number of points the laser must pass through
+        score: *int*
+            The number of required points covered by the best board found (n_goals if solved, None if the search
+            ran without a budget and found nothing)
+        best_placement: *list, list, int*
+            [row, col, block] for every block placed in the best board found: the solution if solved, otherwise the
+            best partial candidate of the budget (None if there is none)
+        stop_reason: *str*
+            Why a budgeted search stopped early: 'time', 'evaluations', or 'cancelled' (None if it ran to the end,
+            so an unsolved result without a stop reason means the puzzle has no solution)
+
+    **Methods**
+
+        to_dict: JSON-serializable summary of the result
+            args - None
+            returns - dict
+    """
+
+    def __init__(self, solver, from_cache=False):
+        """
+        SolveResult class constructor
+
+        **Parameters**
+
+            solver: *LazorSolver object*
+                The solver whose last solve is summarized
+            from_cache: *bool*
+                True if the placement came from the solution cache
+
+        **Returns**
+
+            None
+        """
+        self.solved = solver.solved_board is not None
+        self.board = solver.solved_board
+        self.placement = solver.get_placement()
+        self.laser_paths = solver.solved_board.laser_visited_pts if self.solved else {}
+        self.boards_evaluated = solver.boards_evaluated
+        self.boards_pruned = solver.boards_pruned
+        self.timings = dict(solver.timings)
+        self.method = solver.method
+        self.from_cache = from_cache
+        self.symmetries = list(solver.symmetry.symmetries)
+        self.stats = None if solver.stats is None else solver.stats.to_dict()
+        budget = solver.budget
+        self.n_goals = len(solver.pointGoalList)
+        self.stop_reason = None if budget is None or self.solved else budget.stop_reason
+        if self.solved:
+            self.score = self.n_goals
+            self.best_placement = self.placement
+        elif budget is not None and budget.best_board is not None:
+            self.score = budget.best_score
+            self.best_placement = solver._placement_of(budget.best_board)
         else:
-            print(f'solved in {round(end - start, 2)} seconds')
-            print('rendering solution board in original .bff file directory...')
-            self.solved_board.render_board()
-            print('done.\n')
+            self.score = None if budget is None else 0
+            self.best_placement = None
+
+    def __repr__(self):
+        return f'SolveResult(solved={self.solved}, placement={self.placement}, ' \
+               f'boards_evaluated={self.boards_evaluated}, score={self.score}/{self.n_goals})'
+
+    def to_dict(self):
+        """
+        JSON-serializable summary of the result.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            *dict*
+                solved, placement, board, laser_paths (one [laser, points] pair per laser), boards_evaluated,
+                boards_pruned, timings, method, from_cache, symmetries, stats, n_goals, score, best_placement, and
+                stop_reason
+        """
+        return {
+            'solved': self.solved,
+            'placement': self.placement,
+            'board': self.board.board if self.solved else None,
+            'laser_paths': [[list(pos) + list(direction), pts] for (pos, direction), pts in self.laser_paths.items()],
+            'boards_evaluated': self.boards_evaluated,
+            'boards_pruned': self.boards_pruned,
+            'timings': self.timings,
+            'method': self.method,
+            'from_cache': self.from_cache,
+            'symmetries': self.symmetries,
+            'stats': self.stats,
+            'n_goals': self.n_goals,
+            'score': self.score,
+            'best_placement': self.best_placement,
+            'stop_reason': self.stop_reason,
+        }
 
 
-def generate_possible_configs(input_empty_board, blocks_to_place):
+def solve_file(file_ptr, verbose=True, render=True, budget=None, checkpoint=None, **solver_kwargs):
     """
-    Static method to generate boards in the simpler double-nested-list format to be converted to Board objects later.
+    Parse, solve, and (optionally) render one .bff file, printing progress along the way.
 
     **Parameters**
 
-        input_empty_board: *list, list, int*
+        file_ptr: *str*
+            A string pointing to the .bff file to solve
+        verbose: *bool*
+            Print progress messages
+        render: *bool*
+            Save an image of the solved board next to the .bff file
+        budget: *SolveBudget object*
+            Optional limits for the solve (see LazorSolver.solve)
+        checkpoint: *SearchCheckpoint object*
+            Optional progress record to resume from and to keep up to date (see LazorSolver.solve)
+        solver_kwargs:
+            Any other LazorSolver constructor argument (processes, method, ...)
+
+    **Returns**
+
+        result: *SolveResult object*
+            The outcome of the solve
+    """
+    solver = LazorSolver(file_ptr, verbose=verbose, **solver_kwargs)
+    solver.parse_bff()
+    solver.precompute()
+    result = solver.solve(budget, checkpoint)
+    if render and result.solved:
+        solver.render()
+    solver.log('done.\n')
+    return result
+
+
+# event shared with the worker processes of LazorSolver.solve_parallel, set once any worker finds a solution
+_stop_event = None
+
+
+def init_solve_worker(stop_event):
+    """
+    Initializer for the worker processes of LazorSolver.solve_parallel.
+
+    **Parameters**
+
+        stop_event: *multiprocessing.Event*
+            Event that is set once any worker has found a solution
+
+    **Returns**
+
+        None
+    """
+    global _stop_event
+    _stop_event = stop_event
+
+
+def solve_chunk(empty_board, block_list, laser_pos_list, laser_dir_list, point_goal_list, start, stop,
+                batch_size=1024, free_sites=None, symmetry=None, collect_stats=False, budget_limits=None,
+                order='best_first', track_progress=False):
+    """
+    Worker task: search the unique boards with index in [start, stop) for a solution.
+
+    **Parameters**
+
+        empty_board: *list, list, int*
             A double-nested list representing the empty board to solve (no free blocks placed)
-        blocks_to_place: *list, int*
+        block_list: *list, int*
             A list of all blocks to place following the integer mapping in the LazorSolver class
+        laser_pos_list: *list, list, int*
+            A double-nested list holding [x, y] coords of the laser sources
+        laser_dir_list: *list, list, int*
+            A double-nested list holding [vx, vy] directions of the laser sources
+        point_goal_list: *list, list, int*
+            A double-nested list holding [x, y] positions of the points that the laser must pass through
+        start: *int*
+            Index of the first board of the chunk
+        stop: *int*
+            Index one past the last board of the chunk
+        batch_size: *int*
+            The number of boards traced per call to the batch evaluator (the stop event is checked between batches)
+        free_sites: *list, int*
+            The flat indexes of the sites to place blocks on, in enumeration order (defaults to every free cell)
+        symmetry: *PuzzleSymmetry object*
+            Optional symmetry group of the puzzle; only the canonical board of each orbit is traced
+        collect_stats: *bool*
+            Collect instrumentation counters for the chunk
+        budget_limits: *tuple, float, int*
+            (time_limit, max_evaluations) left in the caller's SolveBudget. The chunk then runs under its own budget
+            with these limits and tracks its best partial candidate (None searches without a budget).
+        order: *str*
+            The enumeration order the indexes refer to (see PlacementEnumerator)
+        track_progress: *bool*
+            Record the index ranges covered and the best partial candidate of the chunk in an in-memory
+            SearchCheckpoint (for the caller's checkpoint)
 
     **Returns**
 
-        possible_configs: *list, list, int*
-            A list of double-nested lists representing the unique board configurations
+        filled_board: *list, list, int*
+            The solved board configuration (None if the chunk holds no solution or the search was stopped)
+        n_evaluated: *int*
+            The number of boards whose laser path was computed
+        counters: *dict, str, int*
+            The instrumentation counters of the chunk (None unless collect_stats)
+        best: *tuple, int, list*
+            (score, board) of the best candidate of the chunk (None unless budget_limits)
+        progress: *SearchCheckpoint object*
+            The progress of the chunk (None unless track_progress)
     """
-    not_free_block_types = [4, 5, 6, 7]
-    input_dims = []
-    input_dims.append(len([1 for l in input_empty_board]))
-    input_dims.append(len(input_empty_board[0]))
+    stats = SolverStats() if collect_stats else None
+    budget = None if budget_limits is None else SolveBudget(*budget_limits)
+    progress = SearchCheckpoint() if track_progress else None
+    filled_board, n_evaluated = search_configs(empty_board, block_list, laser_pos_list, laser_dir_list,
+                                               point_goal_list, start, stop, batch_size, _stop_event, free_sites,
+                                               symmetry, stats, budget, order, progress)
+    best = None if budget is None else (budget.best_score, budget.best_board)
+    return filled_board, n_evaluated, None if stats is None else stats.counters, best, progress
+
 
-    # convert to numpy array and flatten for the recursive function call
-    empty_board = np.array(input_empty_board)
-    empty_board = empty_board.flatten()
+def search_configs(empty_board, block_list, laser_pos_list, laser_dir_list, point_goal_list, start=0, stop=None,
+                   batch_size=1024, stop_event=None, free_sites=None, symmetry=None, stats=None, budget=None,
+                   order='best_first', checkpoint=None):
+    """
+    Search the unique boards with index in [start, stop) for a solution, tracing them in batches.
+
+    **Parameters**
+
+        empty_board: *list, list, int*
+            A double-nested list representing the empty board to solve (no free blocks placed)
+        block_list: *list, int*
+            A list of all blocks to place following the integer mapping in the LazorSolver class
+        laser_pos_list: *list, list, int*
+            A double-nested list holding [x, y] coords of the laser sources
+        laser_dir_list: *list, list, int*
+            A double-nested list holding [vx, vy] directions of the laser sources
+        point_goal_list: *list, list, int*
+            A double-nested list holding [x, y] positions of the points that the laser must pass through
+        start: *int*
+            Index of the first board to search
+        stop: *int*
+            Index one past the last board to search (defaults to the end of the search space)
+        batch_size: *int*
+            The number of boards traced per call to the batch evaluator
+        stop_event: *multiprocessing.Event*
+            Optional event checked between batches; the search gives up once it is set
+        free_sites: *list, int*
+            The flat indexes of the sites to place blocks on, in enumeration order (defaults to every free cell)
+        symmetry: *PuzzleSymmetry object*
+            Optional symmetry group of the puzzle; only the canonical board of each orbit is traced
+        stats: *SolverStats object*
+            Optional instrumentation, credited with the boards generated, dropped as symmetric copies, and traced,
+            and with the trace steps and refractive splits
+        budget: *SolveBudget object*
+            Optional limits, checked between batches. Each batch is then scored (goals covered per board) instead of
+            only checked, and its best board is offered to the budget as the best partial candidate.
+        order: *str*
+            The enumeration order (see PlacementEnumerator)
+        checkpoint: *SearchCheckpoint object*
+            Optional progress record, told which index ranges were covered after every batch. Each batch is then
+            scored too, and its best board is offered to the checkpoint.
+
+    **Returns**
 
-    free_site_idxs = [i for i, block in enumerate(empty_board) if block not in not_free_block_types]
-    possible_configs = recurse_generate_boards(empty_board, blocks_to_place, free_site_idxs, placed_sites=[])
-    # convert from 1D numpy arrays to 2D nested Python lists
-    possible_configs = [*set([tuple(arr) for arr in possible_configs])]
-    possible_configs = [np.array(arr) for arr in possible_configs]
-    possible_configs = [arr.reshape((input_dims[0], input_dims[1])) for arr in possible_configs]
-    possible_configs = [[list(arr) for arr in sublist] for sublist in possible_configs]
-    possible_configs = [list(arr) for arr in possible_configs]
-    return possible_configs
+        filled_board: *list, list, int*
+            The first solved board configuration (None if there is none or the search was stopped)
+        n_evaluated: *int*
+            The number of boards whose laser path was computed
+    """
+    # imported here so that importing this module does not import numba
+    from laser_kernels import evaluate_boards, score_boards
+    laser_pos = np.array(laser_pos_list, dtype=np.int64).reshape(-1, 2)
+    laser_dir = np.array(laser_dir_list, dtype=np.int64).reshape(-1, 2)
+    goals = np.array(point_goal_list, dtype=np.int64).reshape(-1, 2)
+
+    counters = None if stats is None else stats.trace_counters()
+    filled_board = None
+    n_evaluated = 0
+    lo = start
+    for grids in generate_config_batches(empty_board, block_list, batch_size, start, stop, free_sites, order):
+        if stop_event is not None and stop_event.is_set():
+            break
+        if budget is not None and budget.stopped:
+            break
+        n_generated = len(grids)
+        # the boards to trace: the canonical ones, cut to what is left of the budget
+        canonical = np.arange(n_generated) if symmetry is None else np.flatnonzero(symmetry.canonical_mask(grids))
+        kept = canonical
+        if budget is not None and budget.remaining_evaluations() is not None:
+            kept = canonical[:budget.remaining_evaluations()]
+        if len(kept) < n_generated:
+            grids = grids[kept]
+        if budget is None and checkpoint is None:
+            hits = evaluate_boards(grids, laser_pos, laser_dir, goals, counters)
+        else:
+            scores = score_boards(grids, laser_pos, laser_dir, goals, counters)
+            if len(scores) > 0:
+                for tracker in (budget, checkpoint):
+                    if tracker is not None:
+                        tracker.offer(scores.max(), grids[np.argmax(scores)])
+            if budget is not None:
+                budget.charge(len(grids))
+            hits = scores == len(goals)
+        n_evaluated += len(grids)
+        if stats is not None:
+            stats.add('configs_generated', n_generated)
+            stats.add('duplicates_dropped', n_generated - len(grids))
+        if checkpoint is not None:
+            if hits.any():
+                # the search ends in this batch: count its boards, there is nothing left to resume
+                checkpoint.cover(lo, lo, n_generated, n_generated - len(grids), len(grids))
+            else:
+                # the batch is covered up to its first canonical board left out by the budget
+                n_covered = n_generated if len(kept) == len(canonical) else int(canonical[len(kept)])
+                checkpoint.cover(lo, lo + n_covered, n_covered, n_covered - len(grids), len(grids))
+        if hits.any():
+            filled_board = grids[np.argmax(hits)].tolist()
+            break
+        lo += n_generated
+
+    if stats is not None:
+        stats.add('boards_traced', n_evaluated)
+        stats.add_trace_counters(counters)
+    return filled_board, n_evaluated
 
 
-def recurse_generate_boards(input_board, blocks_to_place, free_site_idxs, placed_sites):
+def generate_possible_configs(input_empty_board, blocks_to_place, start=0, stop=None, free_sites=None,
+                              order='best_first'):
     """
-    Recursive method to generate unique boards represented as double-nested lists of integers
+    Lazily generate boards in the simpler double-nested-list format to be converted to Board objects later.
 
     **Parameters**
 
@@ -188,51 +1005,107 @@ def recurse_generate_boards(input_board, blocks_to_place, free_site_idxs, placed
             A double-nested list representing the empty board to solve (no free blocks placed)
         blocks_to_place: *list, int*
             A list of all blocks to place following the integer mapping in the LazorSolver class
-        free_site_idxs: *list, int*
-            A list of all indexes in the input board where you are allowed to place blocks
-        placed_sites: *list, int*
-            A list of all indexes in the input board where you already placed a block
+        start: *int*
+            Index (in PlacementEnumerator order) of the first configuration to generate
+        stop: *int*
+            Index one past the last configuration to generate (defaults to the end of the search space)
+        free_sites: *list, int*
+            The flat indexes of the sites to place blocks on, in enumeration order (defaults to every free cell)
+        order: *str*
+            The enumeration order (see PlacementEnumerator)
+
+    **Yields**
+
+        filled_board: *list, list, int*
+            A double-nested list representing one unique board configuration
+    """
+    n_cols = len(input_empty_board[0])
+    empty_board = flatten_board(input_empty_board)
+    if free_sites is None:
+        free_sites = get_free_sites(empty_board)
+    enumerator = PlacementEnumerator(free_sites, blocks_to_place, order)
+    for placement in enumerator.iterate(start, stop):
+        flat_config = enumerator.apply(empty_board, placement)
+        # convert from flat list back to a double-nested list
+        yield [flat_config[r:r + n_cols] for r in range(0, len(flat_config), n_cols)]
+
+
+def generate_config_batches(input_empty_board, blocks_to_place, batch_size, start=0, stop=None, free_sites=None,
+                            order='best_first'):
+    """
+    Lazily generate boards as stacked numpy arrays, ready for the compiled batch evaluator.
+
+    **Parameters**
+
+        input_empty_board: *list, list, int*
+            A double-nested list representing the empty board to solve (no free blocks placed)
+        blocks_to_place: *list, int*
+            A list of all blocks to place following the integer mapping in the LazorSolver class
+        batch_size: *int*
+            The (maximum) number of boards per batch
+        start: *int*
+            Index (in PlacementEnumerator order) of the first configuration to generate
+        stop: *int*
+            Index one past the last configuration to generate (defaults to the end of the search space)
+        free_sites: *list, int*
+            The flat indexes of the sites to place blocks on, in enumeration order (defaults to every free cell)
+        order: *str*
+            The enumeration order (see PlacementEnumerator)
+
+    **Yields**
+
+        grids: *numpy.array<int8, 3D>*
+            A stack of board configurations indexed [board, row, col]
+    """
+    n_rows = len(input_empty_board)
+    n_cols = len(input_empty_board[0])
+    empty_board = flatten_board(input_empty_board)
+    if free_sites is None:
+        free_sites = get_free_sites(empty_board)
+    enumerator = PlacementEnumerator(free_sites, blocks_to_place, order)
+    stop = enumerator.size if stop is None else min(stop, enumerator.size)
+
+    empty_grid = np.array(empty_board, dtype=np.int8)
+    blocks = np.array(enumerator.block_list, dtype=np.int8)
+    for lo in range(start, stop, batch_size):
+        hi = min(lo + batch_size, stop)
+        # an explicit shape: with no blocks to place there is one empty placement, which -1 cannot infer
+        placements = np.array(list(enumerator.iterate(lo, hi)), dtype=np.int64).reshape(hi - lo, len(blocks))
+        grids = np.tile(empty_grid, (len(placements), 1))
+        grids[np.arange(len(placements))[:, None], placements] = blocks
+        yield grids.reshape(-1, n_rows, n_cols)
+
+
+def flatten_board(input_board):
+    """
+    Flatten a double-nested board into a single list (row-major order).
+
+    **Parameters**
+
+        input_board: *list, list, int*
+            A double-nested list representing a board
 
     **Returns**
 
-        list_of_returned_configs: *numpy.array<int, 1D>*
-            A list of 1-D numpy arrays of integers representing flattened boards
-    """
-    list_of_returned_configs = []  # should only hold complete, valid board configs
-    visited_blocks = []
-    placed_block_types = [1, 2, 3]
-
-    # base case: no more blocks to place, return input_board
-    if len(blocks_to_place) == 0:
-        list_of_returned_configs.append(list(input_board))
-        return list_of_returned_configs
-
-    for i, block in enumerate(blocks_to_place):  # for each unique block still left to place at this level
-        if block in visited_blocks:
-            continue
-
-        visited_blocks.append(block)
-
-        # for each free site where you can place this block in the input board
-        for j, site in enumerate(free_site_idxs):
-            # top-level filter: don't place any block of the same kind as the top level block in any site before
-            # its last appearance...already covered by previous loops
-            if len(placed_sites) > 0:
-                sites = [z for z, placed_block in enumerate(input_board) if
-                         placed_block in placed_block_types and block == placed_block]
-                if len(sites) > 0 and site < sites[-1]:
-                    continue
-
-            # recursive call with updated board and lists
-            updated_board = [row for row in input_board]
-            updated_board[site] = block  # place the block
-            updated_blocks_to_place = [block for block in blocks_to_place]
-            updated_blocks_to_place.pop(i)
-            updated_free_site_idxs = [site for site in free_site_idxs]
-            updated_free_site_idxs.pop(j)
-            updated_placed_sites = placed_sites + [site]
-            received_boards = recurse_generate_boards(updated_board, updated_blocks_to_place, updated_free_site_idxs, updated_placed_sites)
-
-            list_of_returned_configs += received_boards  # add received boards to list of boards to return
-
-    return list_of_returned_configs
+        flat_board: *list, int*
+            A flat list of the cells of the board
+    """
+    return [block for row in input_board for block in row]
+
+
+def get_free_sites(flat_board):
+    """
+    Get the indexes of a flat board where blocks may be placed.
+
+    **Parameters**
+
+        flat_board: *list, int*
+            A flat list representing the empty board to solve
+
+    **Returns**
+
+        free_site_idxs: *list, int*
+            A list of all indexes in the flat board where you are allowed to place blocks
+    """
+    not_free_block_types = [4, 5, 6, 7]
+    return [i for i, block in enumerate(flat_board) if block not in not_free_block_types]
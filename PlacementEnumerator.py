@@ -0,0 +1,564 @@
+from collections import Counter
+from math import factorial
+
+# orders understood by PlacementEnumerator
+ENUMERATION_ORDERS = ('best_first', 'lexicographic')
+
+
+class PlacementEnumerator:
+    """
+    A class to enumerate every distinct assignment of a multiset of blocks to a list of free sites.
+
+    Each block type is treated as a group of interchangeable blocks, so every distinct placement is produced exactly
+    once by construction and has a unique integer index: a search space can be sliced, resumed, or split across
+    workers. Two orders are available:
+        'best_first' - the set of occupied sites advances in colexicographic order, so every placement within the
+                       first m free sites comes before any placement using site m + 1. With the free sites ranked
+                       most promising first (see SiteOrdering), the best sites are exhausted before worse ones are
+                       touched. For each set of sites, the block types are then assigned in lexicographic order.
+        'lexicographic' - placements are ordered like a mixed-radix number: the first block type picks a
+                          combination of sites from all free sites, the next block type picks a combination from the
+                          sites that are left, and so on
+
+    **Attributes**
+
+        free_sites: *list, int*
+            A list of the (flat) board indexes where blocks may be placed, in enumeration order (best first)
+        order: *str*
+            The enumeration order, one of ENUMERATION_ORDERS
+        block_list: *list, int*
+            The blocks to place, sorted so that blocks of the same type are next to each other. A placement holds
+            one site per entry of this list.
+        block_types: *list, int*
+            The distinct block types, in enumeration order
+        block_counts: *list, int*
+            How many blocks of each type in block_types must be placed
+        size: *int*
+            The total number of distinct placements
+
+    **Methods**
+
+        iterate: yields the placements with index in [start, stop)
+            args - start (int), stop (int)
+            yields - placement (tuple, int)
+        rank: computes the index of a given placement
+            args - placement (tuple, int)
+            returns - index (int)
+        unrank: computes the placement at a given index
+            args - index (int)
+            returns - placement (tuple, int)
+        apply: writes a placement onto a flat board
+            args - flat_board (list, int), placement (tuple, int)
+            returns - filled flat board (list, int)
+    """
+
+    def __init__(self, free_sites, blocks_to_place, order='best_first'):
+        """
+        PlacementEnumerator class constructor
+
+        **Parameters**
+
+            free_sites: *list, int*
+                A list of the (flat) board indexes where blocks may be placed
+            blocks_to_place: *list, int*
+                A list of all blocks to place following the integer mapping in the LazorSolver class
+            order: *str*
+                The enumeration order, one of ENUMERATION_ORDERS
+
+        **Returns**
+
+            None
+        """
+        if order not in ENUMERATION_ORDERS:
+            raise ValueError(f'unknown enumeration order {order!r}, expected one of {ENUMERATION_ORDERS}')
+        self.free_sites = list(free_sites)
+        self.order = order
+        counts = Counter(blocks_to_place)
+        self.block_types = sorted(counts)
+        self.block_counts = [counts[block] for block in self.block_types]
+        self.block_list = [block for block, count in zip(self.block_types, self.block_counts) for _ in range(count)]
+
+        # pool sizes seen by each block type (sites left after the earlier types took theirs)
+        self._pool_sizes = []
+        n_left = len(self.free_sites)
+        for count in self.block_counts:
+            self._pool_sizes.append(n_left)
+            n_left -= count
+
+        # number of combinations available to each block type, and the mixed-radix weight of each type
+        self._group_sizes = [binomial(n, k) for n, k in zip(self._pool_sizes, self.block_counts)]
+        self._weights = [1] * len(self._group_sizes)
+        for i in range(len(self._group_sizes) - 2, -1, -1):
+            self._weights[i] = self._weights[i + 1] * self._group_sizes[i + 1]
+
+        self.size = 1
+        for group_size in self._group_sizes:
+            self.size *= group_size
+        # best-first order: number of distinct ways to assign the block types to one set of sites
+        self._n_assignments = multinomial(self.block_counts)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return self.iterate()
+
+    def iterate(self, start=0, stop=None):
+        """
+        Yield the placements whose index lies in [start, stop).
+
+        **Parameters**
+
+            start: *int*
+                Index of the first placement to yield
+            stop: *int*
+                Index one past the last placement to yield (defaults to the end of the search space)
+
+        **Yields**
+
+            placement: *tuple, int*
+                The site of each block in block_list
+        """
+        stop = self.size if stop is None else min(stop, self.size)
+        if start >= stop:
+            return
+        if self.order == 'best_first':
+            yield from self._iterate_best_first(start, stop)
+            return
+
+        combos = self._unrank_combos(start)
+        for _ in range(stop - start):
+            yield self._combos_to_placement(combos)
+
+            # odometer step: advance the last block type, carrying into earlier types when it wraps around
+            i = len(combos) - 1
+            while i >= 0 and not next_combination(combos[i], self._pool_sizes[i]):
+                combos[i] = list(range(len(combos[i])))
+                i -= 1
+
+    def rank(self, placement):
+        """
+        Compute the index of a given placement.
+
+        **Parameters**
+
+            placement: *tuple, int*
+                The site of each block in block_list (sites of the same block type may be in any order)
+
+        **Returns**
+
+            index: *int*
+                The index of the placement in the enumeration order
+        """
+        if self.order == 'best_first':
+            return self._rank_best_first(placement)
+        pool = list(self.free_sites)
+        index = 0
+        offset = 0
+        for i, count in enumerate(self.block_counts):
+            chosen = set(placement[offset:offset + count])
+            offset += count
+            combo = [j for j, site in enumerate(pool) if site in chosen]
+            if len(combo) != count:
+                raise ValueError(f'placement {placement} is not a valid placement for this enumerator')
+            index += rank_combination(combo, len(pool)) * self._weights[i]
+            pool = [site for site in pool if site not in chosen]
+        return index
+
+    def unrank(self, index):
+        """
+        Compute the placement at a given index.
+
+        **Parameters**
+
+            index: *int*
+                The index of the placement in the enumeration order
+
+        **Returns**
+
+            placement: *tuple, int*
+                The site of each block in block_list
+        """
+        if not 0 <= index < self.size:
+            raise IndexError(f'placement index {index} out of range for {self.size} placements')
+        if self.order == 'best_first':
+            subset, assignment = self._unrank_best_first(index)
+            return self._subset_to_placement(subset, assignment)
+        return self._combos_to_placement(self._unrank_combos(index))
+
+    def apply(self, flat_board, placement):
+        """
+        Write a placement onto a copy of a flat board.
+
+        **Parameters**
+
+            flat_board: *list, int*
+                A flat list representing the empty board
+            placement: *tuple, int*
+                The site of each block in block_list
+
+        **Returns**
+
+            filled_board: *list, int*
+                A flat list representing the board with every block placed
+        """
+        filled_board = list(flat_board)
+        for site, block in zip(placement, self.block_list):
+            filled_board[site] = block
+        return filled_board
+
+    def _iterate_best_first(self, start, stop):
+        """
+        Yield the best-first placements with index in [start, stop) (start < stop).
+        """
+        subset, assignment = self._unrank_best_first(start)
+        for _ in range(stop - start):
+            yield self._subset_to_placement(subset, assignment)
+            # next assignment of the block types; once they wrap around, move on to the next set of sites
+            if not next_permutation(assignment):
+                assignment.sort()
+                next_colex_combination(subset, len(self.free_sites))
+
+    def _rank_best_first(self, placement):
+        """
+        Index of a placement in best-first order: the rank of its set of sites, then of its block assignment.
+        """
+        position = {site: j for j, site in enumerate(self.free_sites)}
+        block_at = {}
+        for site, block in zip(placement, self.block_list):
+            if site not in position or position[site] in block_at:
+                raise ValueError(f'placement {placement} is not a valid placement for this enumerator')
+            block_at[position[site]] = block
+        if len(placement) != len(self.block_list):
+            raise ValueError(f'placement {placement} is not a valid placement for this enumerator')
+        subset = sorted(block_at)
+        assignment = [block_at[j] for j in subset]
+        return rank_colex_combination(subset) * self._n_assignments + rank_permutation(assignment)
+
+    def _unrank_best_first(self, index):
+        """
+        Split a best-first index into its set of sites (positions within free_sites) and block assignment.
+        """
+        subset_index, assignment_index = divmod(index, self._n_assignments)
+        return (unrank_colex_combination(subset_index, len(self.block_list)),
+                unrank_permutation(assignment_index, self.block_list))
+
+    def _subset_to_placement(self, subset, assignment):
+        """
+        Map a set of sites (positions within free_sites) and the block assigned to each to a placement.
+        """
+        return tuple(self.free_sites[j] for block in self.block_types
+                     for j, assigned in zip(subset, assignment) if assigned == block)
+
+    def _unrank_combos(self, index):
+        """
+        Split an index into the combination (as positions within its pool) chosen by each block type.
+        """
+        combos = []
+        for i, count in enumerate(self.block_counts):
+            group_index, index = divmod(index, self._weights[i])
+            combos.append(unrank_combination(group_index, self._pool_sizes[i], count))
+        return combos
+
+    def _combos_to_placement(self, combos):
+        """
+        Map the per-type combinations (positions within each pool) to actual board sites.
+        """
+        pool = self.free_sites
+        placement = []
+        for combo in combos:
+            placement += [pool[j] for j in combo]
+            taken = set(combo)
+            pool = [site for j, site in enumerate(pool) if j not in taken]
+        return tuple(placement)
+
+
+def binomial(n, k):
+    """
+    Number of ways to choose k items from n (0 when k is out of range).
+
+    **Parameters**
+
+        n: *int*
+            Number of items to choose from
+        k: *int*
+            Number of items chosen
+
+    **Returns**
+
+        *int*
+            n choose k
+    """
+    if k < 0 or k > n:
+        return 0
+    k = min(k, n - k)
+    result = 1
+    for i in range(k):
+        result = result * (n - i) // (i + 1)
+    return result
+
+
+def next_combination(combo, n):
+    """
+    Advance a sorted combination of range(n) to the next one in lexicographic order, in place.
+
+    **Parameters**
+
+        combo: *list, int*
+            A sorted list of distinct integers in range(n)
+        n: *int*
+            Size of the pool the combination is drawn from
+
+    **Returns**
+
+        *Boolean*
+            False if combo was already the last combination (combo is left unchanged)
+    """
+    k = len(combo)
+    i = k - 1
+    while i >= 0 and combo[i] == n - k + i:
+        i -= 1
+    if i < 0:
+        return False
+    combo[i] += 1
+    for j in range(i + 1, k):
+        combo[j] = combo[j - 1] + 1
+    return True
+
+
+def rank_combination(combo, n):
+    """
+    Lexicographic index of a sorted combination of range(n).
+
+    **Parameters**
+
+        combo: *list, int*
+            A sorted list of distinct integers in range(n)
+        n: *int*
+            Size of the pool the combination is drawn from
+
+    **Returns**
+
+        index: *int*
+            The lexicographic index of combo among all len(combo)-combinations of range(n)
+    """
+    k = len(combo)
+    index = 0
+    prev = -1
+    for i, c in enumerate(combo):
+        for j in range(prev + 1, c):
+            index += binomial(n - 1 - j, k - 1 - i)
+        prev = c
+    return index
+
+
+def unrank_combination(index, n, k):
+    """
+    Sorted combination of range(n) with a given lexicographic index.
+
+    **Parameters**
+
+        index: *int*
+            The lexicographic index of the combination
+        n: *int*
+            Size of the pool the combination is drawn from
+        k: *int*
+            Number of items in the combination
+
+    **Returns**
+
+        combo: *list, int*
+            A sorted list of k distinct integers in range(n)
+    """
+    combo = []
+    j = 0
+    for i in range(k):
+        # skip over every combination that starts with a smaller element at this position
+        while True:
+            n_skipped = binomial(n - 1 - j, k - 1 - i)
+            if index < n_skipped:
+                break
+            index -= n_skipped
+            j += 1
+        combo.append(j)
+        j += 1
+    return combo
+
+
+def multinomial(counts):
+    """
+    Number of distinct orderings of a multiset.
+
+    **Parameters**
+
+        counts: *list, int*
+            How many times each distinct item appears
+
+    **Returns**
+
+        *int*
+            sum(counts)! / prod(count!)
+    """
+    result = factorial(sum(counts))
+    for count in counts:
+        result //= factorial(count)
+    return result
+
+
+def next_colex_combination(combo, n):
+    """
+    Advance a sorted combination of range(n) to the next one in colexicographic order (every combination of
+    range(m) comes before any combination holding m), in place.
+
+    **Parameters**
+
+        combo: *list, int*
+            A sorted list of distinct integers in range(n)
+        n: *int*
+            Size of the pool the combination is drawn from
+
+    **Returns**
+
+        *Boolean*
+            False if combo was already the last combination (combo is left unchanged)
+    """
+    k = len(combo)
+    i = 0
+    while i < k - 1 and combo[i] + 1 == combo[i + 1]:
+        i += 1
+    if k == 0 or combo[i] + 1 >= n:
+        return False
+    combo[i] += 1
+    combo[:i] = range(i)
+    return True
+
+
+def rank_colex_combination(combo):
+    """
+    Colexicographic index of a sorted combination (it does not depend on the size of the pool).
+
+    **Parameters**
+
+        combo: *list, int*
+            A sorted list of distinct non-negative integers
+
+    **Returns**
+
+        index: *int*
+            The colexicographic index of combo among all len(combo)-combinations
+    """
+    return sum(binomial(c, i + 1) for i, c in enumerate(combo))
+
+
+def unrank_colex_combination(index, k):
+    """
+    Sorted combination of k integers with a given colexicographic index.
+
+    **Parameters**
+
+        index: *int*
+            The colexicographic index of the combination
+        k: *int*
+            Number of items in the combination
+
+    **Returns**
+
+        combo: *list, int*
+            A sorted list of k distinct non-negative integers
+    """
+    combo = [0] * k
+    for i in range(k - 1, -1, -1):
+        # largest element whose combinations of the lower positions still fit in the index
+        c = i
+        while binomial(c + 1, i + 1) <= index:
+            c += 1
+        combo[i] = c
+        index -= binomial(c, i + 1)
+    return combo
+
+
+def next_permutation(items):
+    """
+    Advance a sequence to the next distinct permutation in lexicographic order, in place.
+
+    **Parameters**
+
+        items: *list*
+            A list of comparable items (repeated items allowed)
+
+    **Returns**
+
+        *Boolean*
+            False if items was already the last permutation (items is left unchanged)
+    """
+    i = len(items) - 2
+    while i >= 0 and items[i] >= items[i + 1]:
+        i -= 1
+    if i < 0:
+        return False
+    j = len(items) - 1
+    while items[j] <= items[i]:
+        j -= 1
+    items[i], items[j] = items[j], items[i]
+    items[i + 1:] = reversed(items[i + 1:])
+    return True
+
+
+def rank_permutation(items):
+    """
+    Lexicographic index of a permutation among the distinct permutations of its multiset of items.
+
+    **Parameters**
+
+        items: *list*
+            A list of comparable items (repeated items allowed)
+
+    **Returns**
+
+        index: *int*
+            The lexicographic index of items
+    """
+    counts = Counter(items)
+    index = 0
+    for item in items:
+        for smaller in sorted(counts):
+            if smaller >= item:
+                break
+            if counts[smaller] > 0:
+                counts[smaller] -= 1
+                index += multinomial(list(counts.values()))
+                counts[smaller] += 1
+        counts[item] -= 1
+    return index
+
+
+def unrank_permutation(index, items):
+    """
+    Distinct permutation of a multiset of items with a given lexicographic index.
+
+    **Parameters**
+
+        index: *int*
+            The lexicographic index of the permutation
+        items: *list*
+            The multiset of items (in any order)
+
+    **Returns**
+
+        permutation: *list*
+            The permutation of items at that index
+    """
+    counts = Counter(items)
+    permutation = []
+    for _ in range(len(items)):
+        for item in sorted(counts):
+            if counts[item] == 0:
+                continue
+            counts[item] -= 1
+            n_skipped = multinomial(list(counts.values()))
+            if index < n_skipped:
+                permutation.append(item)
+                break
+            index -= n_skipped
+            counts[item] += 1
+    return permutation
@@ -0,0 +1,187 @@
+from collections import deque
+from beam_rules import next_relevant_cell, reflected_state, edge_cells
+from bffParser import FREE, HOLE, FIXED_REFLECTIVE, FIXED_REFRACTIVE
+
+
+class PuzzleIndex:
+    """
+    A class holding the static analysis of a puzzle, computed once after parsing and before any search.
+
+    The beam is traced over a relaxed board where every free cell may be either empty or a block, so the beam both
+    passes straight through it and reflects off it. Every beam of every real board is contained in that relaxed
+    trace, so free cells the relaxed trace never reads can never interact with a beam, and goals it never reaches
+    can never be hit.
+
+    **Attributes**
+
+        n_rows: *int*
+            The number of rows of cells on the board
+        n_cols: *int*
+            The number of columns of cells on the board
+        free_sites: *list, int*
+            Flat (row * n_cols + col) indexes of every free cell
+        relevant_sites: *list, int*
+            Flat indexes of the free cells some beam can read, most promising first (see site_score)
+        irrelevant_sites: *list, int*
+            Flat indexes of the free cells no beam can ever read
+        search_sites: *list, int*
+            The sites a search needs to consider: the relevant sites, then just enough irrelevant sites to hold every
+            block (irrelevant sites are interchangeable since no beam ever reads them)
+        reachable_pts: *set, tuple, int*
+            (x, y) coords of every point some beam can reach
+        goal_reachable: *dict, tuple, Boolean*
+            Whether each goal (x, y) can be reached by some beam
+        goal_sites: *dict, tuple, list, int*
+            For each goal (x, y), the relevant sites next to it. A beam reaches a goal by crossing one of the two
+            cells sharing its edge, so these are the free cells its coverage hinges on.
+        site_goals: *dict, int, list, tuple*
+            For each relevant site, the goals lying on its edges
+        site_reads: *dict, int, int*
+            For each relevant site, the number of relaxed beam states that read it
+
+    **Methods**
+
+        site_score: sort key ranking a site (goals next to it first, then how many beam states read it)
+            args - site (int)
+            returns - tuple
+        summary: human-readable description of the index for debugging slow puzzles
+            args - None
+            returns - str
+    """
+
+    def __init__(self, empty_board, laser_pos_list, laser_dir_list, point_goal_list, n_blocks):
+        """
+        PuzzleIndex class constructor
+
+        **Parameters**
+
+            empty_board: *list, list, int*
+                A double-nested list representing the empty board to solve (no free blocks placed)
+            laser_pos_list: *list, list, int*
+                A double-nested list holding [x, y] coords of the laser sources
+            laser_dir_list: *list, list, int*
+                A double-nested list holding [vx, vy] directions of the laser sources
+            point_goal_list: *list, list, int*
+                A double-nested list holding [x, y] positions of the points that the laser must pass through
+            n_blocks: *int*
+                The number of blocks to place
+
+        **Returns**
+
+            None
+        """
+        self.n_rows = len(empty_board)
+        self.n_cols = len(empty_board[0])
+        self.free_sites = [i * self.n_cols + j for i, row in enumerate(empty_board)
+                           for j, cell in enumerate(row) if cell == FREE]
+
+        self.reachable_pts, self.site_reads = self._relaxed_trace(empty_board, laser_pos_list, laser_dir_list)
+
+        goals = [tuple(pt) for pt in point_goal_list]
+        self.goal_reachable = {goal: goal in self.reachable_pts for goal in goals}
+        self.goal_sites = {goal: [site for site in self._edge_cells(goal) if site in self.site_reads]
+                           for goal in goals}
+        self.site_goals = {site: [] for site in self.site_reads}
+        for goal, sites in self.goal_sites.items():
+            for site in sites:
+                self.site_goals[site].append(goal)
+
+        self.relevant_sites = sorted(self.site_reads, key=self.site_score)
+        self.irrelevant_sites = [site for site in self.free_sites if site not in self.site_reads]
+        self.search_sites = self.relevant_sites + self.irrelevant_sites[:n_blocks]
+
+    def __repr__(self):
+        return f'PuzzleIndex({self.n_rows}x{self.n_cols}, {len(self.relevant_sites)}/{len(self.free_sites)} ' \
+               f'relevant sites, {sum(self.goal_reachable.values())}/{len(self.goal_reachable)} reachable goals)'
+
+    @property
+    def solvable(self):
+        """
+        False when some goal can never be reached, whatever the placement.
+        """
+        return all(self.goal_reachable.values())
+
+    def site_score(self, site):
+        """
+        Sort key ranking a site: sites next to more goals first, then sites read by more beam states, then by index.
+
+        **Parameters**
+
+            site: *int*
+                Flat index of a free cell
+
+        **Returns**
+
+            *tuple*
+                Sort key (smaller is more promising)
+        """
+        return -len(self.site_goals.get(site, [])), -self.site_reads.get(site, 0), site
+
+    def summary(self):
+        """
+        Human-readable description of the index, for debugging slow puzzles.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            *str*
+                One line per fact
+        """
+        lines = [repr(self)]
+        for goal, reachable in self.goal_reachable.items():
+            cells = [divmod(site, self.n_cols) for site in self.goal_sites[goal]]
+            lines.append(f'  goal {goal}: {"reachable" if reachable else "UNREACHABLE"}, next to free cells {cells}')
+        lines.append(f'  relevant cells (row, col), best first: '
+                     f'{[divmod(site, self.n_cols) for site in self.relevant_sites]}')
+        lines.append(f'  irrelevant cells: {[divmod(site, self.n_cols) for site in self.irrelevant_sites]}')
+        return '\n'.join(lines)
+
+    def _edge_cells(self, pt):
+        """
+        Flat indexes of the (up to two) cells sharing the edge a point lies on.
+        """
+        return [row * self.n_cols + col for row, col in edge_cells(pt[0], pt[1], self.n_rows, self.n_cols)]
+
+    def _relaxed_trace(self, empty_board, laser_pos_list, laser_dir_list):
+        """
+        Breadth-first search over beam states where every free cell both passes and reflects the beam.
+        Returns the reachable points and, for each free cell read, how many states read it.
+        """
+        reachable_pts = set()
+        site_reads = {}
+        seen = set()
+        queue = deque((pos[0], pos[1], direction[0], direction[1])
+                      for pos, direction in zip(laser_pos_list, laser_dir_list))
+        while len(queue) > 0:
+            state = queue.popleft()
+            if state in seen:
+                continue
+            seen.add(state)
+            x, y, dx, dy = state
+            if not (0 <= x <= 2 * self.n_cols and 0 <= y <= 2 * self.n_rows):
+                continue
+            reachable_pts.add((x, y))
+
+            row, col = next_relevant_cell(x, y, dx, dy)
+            if not (0 <= row < self.n_rows and 0 <= col < self.n_cols):
+                continue
+            cell = empty_board[row][col]
+
+            passed = (x + dx, y + dy, dx, dy)
+            reflected = reflected_state(x, y, dx, dy)
+            if cell == FREE:
+                site = row * self.n_cols + col
+                site_reads[site] = site_reads.get(site, 0) + 1
+                queue.append(passed)
+                queue.append(reflected)
+            elif cell == HOLE:
+                queue.append(passed)
+            elif cell == FIXED_REFLECTIVE:
+                queue.append(reflected)
+            elif cell == FIXED_REFRACTIVE:
+                queue.append(passed)
+                queue.append(reflected)
+        return reachable_pts, site_reads
@@ -0,0 +1,398 @@
+"""
+Compiled puzzle packs: many parsed puzzles in one binary file, loaded lazily through a memory map.
+
+A pack is laid out as
+
+    header   magic b'LZPK', format version, number of puzzles, byte offset of the index
+    records  one compiled puzzle after another
+    index    n_puzzles + 1 little-endian int64 byte offsets (record k spans offsets k to k + 1)
+
+and a compiled puzzle record as
+
+    counts   n_rows, n_cols, n_lasers, n_goals, the number of reflective, refractive, and opaque blocks, and the byte
+             length of the name (little-endian uint16 each)
+    name     utf-8 (the stem of the .bff file it was compiled from)
+    grid     n_rows * n_cols int8 cells, row-major, in the integer mapping of bffParser
+    lasers   n_lasers * 4 int16 (x, y, vx, vy)
+    goals    n_goals * 2 int16 (x, y)
+
+Opening a pack reads the header and maps the index; a puzzle is decoded only when it is asked for, so a worker can
+jump to puzzle N without touching the others. A puzzle inside a pack is referred to as 'path/to/pack.lzpk#N', which
+LazorSolver.parse_bff (through load_puzzle_file) and run.py accept wherever a .bff file is expected.
+
+    python PuzzlePack.py bff/ --output levels.lzpk    # compile every .bff file under bff/ into one pack
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+from bffParser import openBFF, REFLECTIVE, REFRACTIVE, OPAQUE
+
+PACK_MAGIC = b'LZPK'
+PACK_VERSION = 1
+PACK_SUFFIX = '.lzpk'
+
+# magic, version, reserved, n_puzzles, index offset
+_HEADER = struct.Struct('<4sHHIQ')
+# n_rows, n_cols, n_lasers, n_goals, n_reflective, n_refractive, n_opaque, name length
+_RECORD = struct.Struct('<8H')
+
+# packs opened by load_puzzle_file, kept open for the life of the process (e.g. a batch worker)
+_open_packs = {}
+
+
+class PuzzlePack:
+    """
+    A class giving random access to the puzzles of a pack file through a read-only memory map.
+
+    **Attributes**
+
+        path: *str*
+            Path of the pack file
+
+    **Methods**
+
+        name: the name a puzzle was stored under
+            args - n (int)
+            returns - str
+        index_of: the position of the first puzzle stored under a name
+            args - name (str)
+            returns - int
+        close: unmaps and closes the pack file
+            args - None
+            returns - None
+
+    Packs support len(pack), pack[n] (the puzzle in the format returned by bffParser.openBFF, so that
+    solver.load_puzzle(*pack[n]) works), iteration, and use as a context manager.
+    """
+
+    def __init__(self, path):
+        """
+        PuzzlePack class constructor
+
+        **Parameters**
+
+            path: *str*
+                Path of the pack file (see write_pack)
+
+        **Returns**
+
+            None
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f'{path} is not a puzzle pack (empty file)')
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f'{path} is not a puzzle pack (truncated header)')
+        magic, version, _, n_puzzles, index_offset = _HEADER.unpack_from(self._map, 0)
+        if magic != PACK_MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a puzzle pack (bad magic {magic!r})')
+        if version != PACK_VERSION:
+            self.close()
+            raise ValueError(f'{path} is a version {version} puzzle pack, expected version {PACK_VERSION}')
+        # a view on the mapped file: no offset is read until a puzzle asks for it
+        self._offsets = np.frombuffer(self._map, dtype='<i8', count=n_puzzles + 1, offset=index_offset)
+        self._names = None
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, n):
+        return decode_puzzle(self._map, self._record_offset(n))[1]
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f'PuzzlePack({self.path!r}, {len(self)} puzzles)'
+
+    def name(self, n):
+        """
+        The name a puzzle was stored under.
+
+        **Parameters**
+
+            n: *int*
+                Position of the puzzle in the pack
+
+        **Returns**
+
+            *str*
+                The name of the puzzle (the stem of the .bff file it was compiled from)
+        """
+        offset = self._record_offset(n)
+        name_length = _RECORD.unpack_from(self._map, offset)[7]
+        start = offset + _RECORD.size
+        return self._map[start:start + name_length].decode('utf-8')
+
+    def index_of(self, name):
+        """
+        The position of the first puzzle stored under a name (the names are read on the first call).
+
+        **Parameters**
+
+            name: *str*
+                The name of the puzzle
+
+        **Returns**
+
+            *int*
+                Position of the puzzle in the pack
+        """
+        if self._names is None:
+            self._names = {}
+            for n in range(len(self)):
+                self._names.setdefault(self.name(n), n)
+        if name not in self._names:
+            raise KeyError(f'no puzzle named {name!r} in {self.path}')
+        return self._names[name]
+
+    def close(self):
+        """
+        Unmap and close the pack file.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            None
+        """
+        # drop the index view first: a memory map cannot be closed while arrays still point into it
+        self._offsets = None
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def _record_offset(self, n):
+        """
+        Byte offset of the record of puzzle n (negative positions count from the end).
+        """
+        n_puzzles = len(self)
+        if not -n_puzzles <= n < n_puzzles:
+            raise IndexError(f'puzzle {n} out of range for a pack of {n_puzzles} puzzles')
+        return int(self._offsets[n % n_puzzles])
+
+
+def compile_puzzle(grid, laserList, pointGoalList, blockList, name=''):
+    """
+    Encode a parsed puzzle as a compiled puzzle record.
+
+    **Parameters**
+
+        grid, laserList, pointGoalList, blockList:
+            The puzzle, in the format returned by bffParser.openBFF
+        name: *str*
+            A name to store with the puzzle (e.g. the stem of its .bff file)
+
+    **Returns**
+
+        record: *bytes*
+            The compiled puzzle
+    """
+    name_bytes = name.encode('utf-8')
+    counts = _RECORD.pack(len(grid), len(grid[0]) if len(grid) > 0 else 0, len(laserList), len(pointGoalList),
+                          blockList.count(REFLECTIVE), blockList.count(REFRACTIVE), blockList.count(OPAQUE),
+                          len(name_bytes))
+    return b''.join([counts, name_bytes, np.array(grid, dtype=np.int8).tobytes(),
+                     np.array(laserList, dtype='<i2').reshape(-1, 4).tobytes(),
+                     np.array(pointGoalList, dtype='<i2').reshape(-1, 2).tobytes()])
+
+
+def decode_puzzle(buffer, offset=0):
+    """
+    Decode the compiled puzzle record starting at a given offset of a buffer.
+
+    **Parameters**
+
+        buffer: *bytes-like*
+            The buffer holding the record (e.g. the memory map of a pack)
+        offset: *int*
+            Byte offset of the record
+
+    **Returns**
+
+        name: *str*
+            The name stored with the puzzle
+        puzzle: *tuple*
+            (grid, laserList, pointGoalList, blockList), in the format returned by bffParser.openBFF. Only the number
+            of blocks of each type is stored, so blockList lists the reflective, then the refractive, then the opaque
+            blocks, whatever their order in the .bff file.
+    """
+    n_rows, n_cols, n_lasers, n_goals, n_reflective, n_refractive, n_opaque, name_length = \
+        _RECORD.unpack_from(buffer, offset)
+    offset += _RECORD.size
+    name = bytes(buffer[offset:offset + name_length]).decode('utf-8')
+    offset += name_length
+    grid = np.frombuffer(buffer, dtype=np.int8, count=n_rows * n_cols, offset=offset).reshape(n_rows, n_cols)
+    offset += n_rows * n_cols
+    lasers = np.frombuffer(buffer, dtype='<i2', count=4 * n_lasers, offset=offset).reshape(n_lasers, 4)
+    offset += 8 * n_lasers
+    goals = np.frombuffer(buffer, dtype='<i2', count=2 * n_goals, offset=offset).reshape(n_goals, 2)
+    blockList = [REFLECTIVE] * n_reflective + [REFRACTIVE] * n_refractive + [OPAQUE] * n_opaque
+    return name, (grid.tolist(), lasers.tolist(), goals.tolist(), blockList)
+
+
+def write_pack(path, puzzles):
+    """
+    Write puzzles to a pack file (replacing the file once the whole pack is written).
+
+    **Parameters**
+
+        path: *str*
+            Path of the pack file
+        puzzles: *iterable*
+            (name, (grid, laserList, pointGoalList, blockList)) pairs, in pack order
+
+    **Returns**
+
+        n_puzzles: *int*
+            The number of puzzles written
+    """
+    tmp_path = f'{path}.tmp'
+    offsets = []
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, 0, 0))
+        for name, puzzle in puzzles:
+            offsets.append(f.tell())
+            f.write(compile_puzzle(*puzzle, name=name))
+        index_offset = f.tell()
+        offsets.append(index_offset)
+        f.write(np.array(offsets, dtype='<i8').tobytes())
+        f.seek(0)
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(offsets) - 1, index_offset))
+    os.replace(tmp_path, path)
+    return len(offsets) - 1
+
+
+def bff_to_pack(bff_files, path):
+    """
+    Compile .bff files into a pack, each stored under the stem of its file name.
+
+    **Parameters**
+
+        bff_files: *list, str*
+            The .bff files, in pack order
+        path: *str*
+            Path of the pack file
+
+    **Returns**
+
+        n_puzzles: *int*
+            The number of puzzles written
+    """
+    return write_pack(path, ((os.path.splitext(os.path.basename(file_ptr))[0], openBFF(file_ptr))
+                             for file_ptr in bff_files))
+
+
+def pack_entry(path, n):
+    """
+    The reference to puzzle n of a pack, accepted wherever a .bff file is expected.
+
+    **Parameters**
+
+        path: *str*
+            Path of the pack file
+        n: *int*
+            Position of the puzzle in the pack
+
+    **Returns**
+
+        *str*
+            'path#n'
+    """
+    return f'{path}#{n}'
+
+
+def split_pack_entry(file_ptr):
+    """
+    Split a reference to a puzzle of a pack into the pack path and the puzzle position.
+
+    **Parameters**
+
+        file_ptr: *str*
+            A .bff file, or a puzzle of a pack ('path/to/pack.lzpk#N')
+
+    **Returns**
+
+        *tuple*
+            (path, n) for a puzzle of a pack, None for anything else
+    """
+    path, sep, n = file_ptr.rpartition('#')
+    if sep and path.endswith(PACK_SUFFIX) and n.lstrip('-').isdigit():
+        return path, int(n)
+    return None
+
+
+def load_puzzle_file(file_ptr):
+    """
+    Load a puzzle from a .bff file or from a pack ('path/to/pack.lzpk#N'). Packs stay mapped for the life of the
+    process, so loading many puzzles from one pack opens it only once.
+
+    **Parameters**
+
+        file_ptr: *str*
+            A .bff file, or a puzzle of a pack
+
+    **Returns**
+
+        grid, laserList, pointGoalList, blockList:
+            The puzzle, in the format returned by bffParser.openBFF
+    """
+    entry = split_pack_entry(file_ptr)
+    if entry is None:
+        return openBFF(file_ptr)
+    path, n = entry
+    pack = _open_packs.get(path)
+    if pack is None:
+        pack = _open_packs[path] = PuzzlePack(path)
+    return pack[n]
+
+
+def main(argv=None):
+    """
+    Compile .bff files (files, glob patterns, or directories) into a pack.
+
+    **Parameters**
+
+        argv: *list, str*
+            Command-line arguments (defaults to sys.argv[1:])
+
+    **Returns**
+
+        exit_code: *int*
+            0 once the pack is written
+    """
+    from run import find_puzzles
+    parser = argparse.ArgumentParser(description='Compile .bff puzzles into a pack file.')
+    parser.add_argument('paths', nargs='+', help='.bff files, glob patterns, or directories to compile')
+    parser.add_argument('-o', '--output', required=True,
+                        help=f'path of the pack file to write (e.g. levels{PACK_SUFFIX})')
+    args = parser.parse_args(argv)
+
+    bff_files = [file_ptr for file_ptr in find_puzzles(args.paths) if split_pack_entry(file_ptr) is None]
+    if len(bff_files) == 0:
+        parser.error(f'no .bff files found in {args.paths}')
+    n_puzzles = bff_to_pack(bff_files, args.output)
+    print(f'wrote {n_puzzles} puzzles to {args.output} ({os.path.getsize(args.output)} bytes)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import numpy as np
+
+# lattice transforms of the dihedral group, as functions of (x, y, dx, dy, width, height) where width and height are
+# the lattice extents (2 * n_cols, 2 * n_rows); the last four only map the board onto itself when it is square
+DIHEDRAL_TRANSFORMS = {
+    'identity': lambda x, y, dx, dy, w, h: (x, y, dx, dy),
+    'mirror_horizontal': lambda x, y, dx, dy, w, h: (w - x, y, -dx, dy),
+    'mirror_vertical': lambda x, y, dx, dy, w, h: (x, h - y, dx, -dy),
+    'rotate_180': lambda x, y, dx, dy, w, h: (w - x, h - y, -dx, -dy),
+    'transpose': lambda x, y, dx, dy, w, h: (y, x, dy, dx),
+    'anti_transpose': lambda x, y, dx, dy, w, h: (h - y, w - x, -dy, -dx),
+    'rotate_90': lambda x, y, dx, dy, w, h: (h - y, x, -dy, dx),
+    'rotate_270': lambda x, y, dx, dy, w, h: (y, w - x, dy, -dx),
+}
+SQUARE_ONLY_TRANSFORMS = ('transpose', 'anti_transpose', 'rotate_90', 'rotate_270')
+
+
+class PuzzleSymmetry:
+    """
+    A class holding the automorphism group of a puzzle: the board reflections and rotations that map the grid, the
+    lasers, and the goals onto themselves.
+
+    The tracing rules commute with every lattice reflection and rotation, so a transform in the group maps every
+    board onto a board whose beams are the mapped beams, and a solution onto a solution. Only one board per orbit
+    needs to be traced. The canonical representative is the orbit member whose relevant cells (see PuzzleIndex)
+    read smallest in row-major order; cells no beam can read are left out of the comparison since they never change
+    the outcome, and the search fills them in a fixed order.
+
+    **Attributes**
+
+        n_rows: *int*
+            The number of rows of cells on the board
+        n_cols: *int*
+            The number of columns of cells on the board
+        symmetries: *list, str*
+            Names of the transforms in the group other than the identity (see DIHEDRAL_TRANSFORMS)
+        cell_maps: *dict, str, numpy.array<int64, 1D>*
+            For each symmetry, the flat index of the cell each cell is mapped to
+        key_sites: *numpy.array<int64, 1D>*
+            Flat indexes of the cells compared when picking the canonical board of an orbit
+
+    **Methods**
+
+        canonical_mask: flags the boards of a batch that are the canonical representative of their orbit
+            args - grids (numpy.array<int8, 3D>)
+            returns - numpy.array<bool, 1D>
+        canonical_key: a key shared by every board of an orbit
+            args - grid (numpy.array<int8, 2D>)
+            returns - bytes
+    """
+
+    def __init__(self, empty_board, laser_pos_list, laser_dir_list, point_goal_list, key_sites=None):
+        """
+        PuzzleSymmetry class constructor
+
+        **Parameters**
+
+            empty_board: *list, list, int*
+                A double-nested list representing the empty board to solve (no free blocks placed)
+            laser_pos_list: *list, list, int*
+                A double-nested list holding [x, y] coords of the laser sources
+            laser_dir_list: *list, list, int*
+                A double-nested list holding [vx, vy] directions of the laser sources
+            point_goal_list: *list, list, int*
+                A double-nested list holding [x, y] positions of the points that the laser must pass through
+            key_sites: *list, int*
+                Flat indexes of the cells compared when picking the canonical board of an orbit. They must be
+                mapped onto themselves by every symmetry, like PuzzleIndex.relevant_sites (defaults to every cell)
+
+        **Returns**
+
+            None
+        """
+        self.n_rows = len(empty_board)
+        self.n_cols = len(empty_board[0])
+        n_cells = self.n_rows * self.n_cols
+        self.key_sites = np.arange(n_cells) if key_sites is None else np.array(sorted(key_sites), dtype=np.int64)
+
+        flat_board = [cell for row in empty_board for cell in row]
+        lasers = set(tuple(pos) + tuple(direction) for pos, direction in zip(laser_pos_list, laser_dir_list))
+        goals = set(tuple(pt) for pt in point_goal_list)
+
+        self.symmetries = []
+        self.cell_maps = {}
+        self._key_gathers = []
+        for name, transform in DIHEDRAL_TRANSFORMS.items():
+            if name == 'identity' or (name in SQUARE_ONLY_TRANSFORMS and self.n_rows != self.n_cols):
+                continue
+            cell_map = self._get_cell_map(transform)
+            if any(flat_board[cell_map[site]] != flat_board[site] for site in range(n_cells)):
+                continue
+            if set(self._apply(transform, *laser) for laser in lasers) != lasers:
+                continue
+            if set(self._apply(transform, x, y, 0, 0)[:2] for x, y in goals) != goals:
+                continue
+            self.symmetries.append(name)
+            self.cell_maps[name] = cell_map
+            # the mapped board holds cell s at cell_map[s], so its key cells are read back through the inverse map
+            inverse_map = np.empty(n_cells, dtype=np.int64)
+            inverse_map[cell_map] = np.arange(n_cells)
+            self._key_gathers.append(inverse_map[self.key_sites])
+
+    def __len__(self):
+        return len(self.symmetries) + 1
+
+    def __repr__(self):
+        return f'PuzzleSymmetry({self.n_rows}x{self.n_cols}, order {len(self)}: {self.symmetries})'
+
+    def canonical_mask(self, grids):
+        """
+        Flag the boards of a batch that are the canonical representative of their orbit (compared on key_sites).
+
+        **Parameters**
+
+            grids: *numpy.array<int8, 3D>*
+                A stack of board configurations indexed [board, row, col]
+
+        **Returns**
+
+            keep: *numpy.array<bool, 1D>*
+                True for every board no symmetry maps onto a smaller board
+        """
+        if len(self.key_sites) == 0:
+            return np.ones(len(grids), dtype=np.bool_)
+        flat = grids.reshape(len(grids), -1)
+        keys = flat[:, self.key_sites]
+        keep = np.ones(len(grids), dtype=np.bool_)
+        rows = np.arange(len(grids))
+        for gather in self._key_gathers:
+            images = flat[:, gather]
+            differs = images != keys
+            first = np.argmax(differs, axis=1)
+            keep &= ~(differs.any(axis=1) & (images[rows, first] < keys[rows, first]))
+        return keep
+
+    def canonical_key(self, grid):
+        """
+        A key shared by every board of an orbit: the smallest byte string among the board and its mapped copies.
+
+        **Parameters**
+
+            grid: *numpy.array<int8, 2D>*
+                A board configuration indexed [row, col]
+
+        **Returns**
+
+            key: *bytes*
+                The same for two boards exactly when a symmetry maps one onto the other
+        """
+        flat = grid.ravel()
+        key = flat.tobytes()
+        for cell_map in self.cell_maps.values():
+            image = np.empty_like(flat)
+            image[cell_map] = flat
+            key = min(key, image.tobytes())
+        return key
+
+    def _apply(self, transform, x, y, dx, dy):
+        """
+        Map a lattice state (x, y, dx, dy) through a transform of this board.
+        """
+        return transform(x, y, dx, dy, 2 * self.n_cols, 2 * self.n_rows)
+
+    def _get_cell_map(self, transform):
+        """
+        Flat index of the cell each cell is mapped to, found by mapping the cell centers.
+        """
+        cell_map = np.empty(self.n_rows * self.n_cols, dtype=np.int64)
+        for row in range(self.n_rows):
+            for col in range(self.n_cols):
+                x, y, _, _ = self._apply(transform, 2 * col + 1, 2 * row + 1, 0, 0)
+                cell_map[row * self.n_cols + col] = (y // 2) * self.n_cols + x // 2
+        return cell_map
@@ -0,0 +1,344 @@
+import hashlib
+import json
+import os
+import time
+
+# bump whenever the checkpoint layout changes, so an older file is rejected instead of misread
+CHECKPOINT_VERSION = 1
+
+# search counters kept by a checkpoint, keyed like SolverStats.counters
+CHECKPOINT_COUNTERS = ('configs_generated', 'duplicates_dropped', 'boards_traced')
+
+
+class SearchCheckpoint:
+    """
+    A class recording how far an enumeration search got, so a killed search can resume without evaluating any
+    candidate board again.
+
+    The boards of a search are numbered by their rank in PlacementEnumerator order. The checkpoint keeps the index
+    ranges already covered (every board in them was evaluated or skipped as a symmetric copy), the search counters,
+    and the best partial candidate, and writes them as a small JSON file at most every interval seconds (and when
+    the search ends). A search key ties the file to one puzzle and one enumeration (the puzzle hash, the ranked
+    search sites, the blocks, and the enumeration order), so a file is never applied to a different search.
+
+        checkpoint = SearchCheckpoint('yarn_5.checkpoint.json', interval=30)
+        result = solver.solve(checkpoint=checkpoint)     # run again after a crash to pick up where it stopped
+
+    A checkpoint without a path is kept in memory only (e.g. to record the progress of a worker chunk).
+
+    **Attributes**
+
+        path: *str*
+            Path of the checkpoint file (None to keep the checkpoint in memory)
+        interval: *float*
+            Minimum seconds between two writes while the search runs
+        search_key: *str*
+            Hex digest identifying the search the checkpoint belongs to
+        n_configs: *int*
+            The number of boards of the search
+        covered: *list, list, int*
+            Sorted, disjoint [lo, hi) index ranges already covered
+        counters: *dict, str, int*
+            configs_generated, duplicates_dropped, and boards_traced over every run of the search
+        best_score: *int*
+            The number of goals covered by the best candidate so far (-1 before any candidate)
+        best_board: *list, list, int*
+            The best candidate so far (None before any candidate)
+        status: *str*
+            'running', 'solved' (solution holds the solved board), or 'exhausted' (no board solves the puzzle)
+        solution: *list, list, int*
+            The solved board (None unless solved)
+        resumed: *bool*
+            Whether begin loaded the progress of an earlier run
+
+    **Methods**
+
+        begin: loads the checkpoint file of a search, or starts from scratch
+            args - search_key (str), n_configs (int)
+            returns - None
+        uncovered: the index ranges not covered yet
+            args - None
+            returns - list, tuple, int
+        cover: records an index range as covered with its counters
+            args - lo (int), hi (int), n_generated (int), n_dropped (int), n_evaluated (int)
+            returns - None
+        offer: keeps a candidate if it covers more goals than the best so far
+            args - score (int), board (list, list, int or numpy.array<int8, 2D>)
+            returns - None
+        merge: adds the progress recorded by another checkpoint of the same search (e.g. a worker's)
+            args - other (SearchCheckpoint)
+            returns - None
+        finish: records the end of the search and writes the file
+            args - solution (list, list, int, optional)
+            returns - None
+        save: writes the checkpoint file now
+            args - None
+            returns - None
+    """
+
+    def __init__(self, path=None, interval=60.0):
+        """
+        SearchCheckpoint class constructor
+
+        **Parameters**
+
+            path: *str*
+                Path of the checkpoint file (None to keep the checkpoint in memory)
+            interval: *float*
+                Minimum seconds between two writes while the search runs
+
+        **Returns**
+
+            None
+        """
+        self.path = path
+        self.interval = interval
+        self._reset(None, 0)
+
+    def __repr__(self):
+        return f'SearchCheckpoint({self.path!r}, {self.status}, {self.n_covered}/{self.n_configs} covered, ' \
+               f'best_score={self.best_score})'
+
+    @property
+    def n_covered(self):
+        """
+        The number of board indexes covered so far.
+        """
+        return sum(hi - lo for lo, hi in self.covered)
+
+    def begin(self, search_key, n_configs):
+        """
+        Load the checkpoint file of a search if there is one, or start the search from scratch.
+
+        **Parameters**
+
+            search_key: *str*
+                Hex digest identifying the search (see search_key)
+            n_configs: *int*
+                The number of boards of the search
+
+        **Returns**
+
+            None
+        """
+        self._reset(search_key, n_configs)
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            saved = json.load(f)
+        if saved.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f'{self.path} is a version {saved.get("version")} checkpoint, expected version '
+                             f'{CHECKPOINT_VERSION}')
+        if saved['search_key'] != search_key or saved['n_configs'] != n_configs:
+            raise ValueError(f'{self.path} belongs to a different puzzle or search, remove it to start over')
+        self.covered = [list(interval) for interval in saved['covered']]
+        self.counters.update(saved['counters'])
+        self.best_score = saved['best_score']
+        self.best_board = saved['best_board']
+        self.status = saved['status']
+        self.solution = saved['solution']
+        self.resumed = True
+
+    def uncovered(self):
+        """
+        The index ranges not covered yet, in index order.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            gaps: *list, tuple, int*
+                (lo, hi) index ranges still to search
+        """
+        gaps = []
+        lo = 0
+        for covered_lo, covered_hi in self.covered:
+            if covered_lo > lo:
+                gaps.append((lo, covered_lo))
+            lo = max(lo, covered_hi)
+        if lo < self.n_configs:
+            gaps.append((lo, self.n_configs))
+        return gaps
+
+    def cover(self, lo, hi, n_generated=0, n_dropped=0, n_evaluated=0):
+        """
+        Record the index range [lo, hi) as covered, then write the file if the interval has passed.
+
+        **Parameters**
+
+            lo: *int*
+                Index of the first board covered
+            hi: *int*
+                Index one past the last board covered
+            n_generated: *int*
+                The number of boards generated in the range
+            n_dropped: *int*
+                The number of boards skipped as symmetric copies
+            n_evaluated: *int*
+                The number of boards traced
+
+        **Returns**
+
+            None
+        """
+        if hi > lo:
+            self._add_interval(lo, hi)
+        self.counters['configs_generated'] += n_generated
+        self.counters['duplicates_dropped'] += n_dropped
+        self.counters['boards_traced'] += n_evaluated
+        if self.path is not None and time.perf_counter() - self._last_save >= self.interval:
+            self.save()
+
+    def offer(self, score, board):
+        """
+        Keep a candidate if its beam covers more goals than the best candidate so far.
+
+        **Parameters**
+
+            score: *int*
+                The number of goals the candidate's beam covers
+            board: *list, list, int or numpy.array<int8, 2D>*
+                The candidate board configuration (copied when kept)
+
+        **Returns**
+
+            None
+        """
+        if score > self.best_score:
+            self.best_score = int(score)
+            self.best_board = [[int(cell) for cell in row] for row in board]
+
+    def merge(self, other):
+        """
+        Add the progress recorded by another checkpoint of the same search, e.g. the in-memory checkpoint of a
+        worker chunk.
+
+        **Parameters**
+
+            other: *SearchCheckpoint object*
+                The checkpoint to merge
+
+        **Returns**
+
+            None
+        """
+        for lo, hi in other.covered:
+            self._add_interval(lo, hi)
+        for name in CHECKPOINT_COUNTERS:
+            self.counters[name] += other.counters[name]
+        if other.best_board is not None:
+            self.offer(other.best_score, other.best_board)
+        if self.path is not None and time.perf_counter() - self._last_save >= self.interval:
+            self.save()
+
+    def finish(self, solution=None):
+        """
+        Record the end of the search (solved when a solution is given, exhausted otherwise) and write the file.
+        A search stopped early should call save instead, so it can be resumed.
+
+        **Parameters**
+
+            solution: *list, list, int*
+                The solved board (None if no board solves the puzzle)
+
+        **Returns**
+
+            None
+        """
+        if solution is not None:
+            self.status = 'solved'
+            self.solution = [[int(cell) for cell in row] for row in solution]
+        else:
+            self.status = 'exhausted'
+        self.save()
+
+    def save(self):
+        """
+        Write the checkpoint file now (atomically: a crash while writing leaves the previous file intact).
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            None
+        """
+        self._last_save = time.perf_counter()
+        if self.path is None:
+            return
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'search_key': self.search_key,
+            'n_configs': self.n_configs,
+            'status': self.status,
+            'covered': self.covered,
+            'counters': self.counters,
+            'best_score': self.best_score,
+            'best_board': self.best_board,
+            'solution': self.solution,
+            'saved_at': time.time(),
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def _reset(self, search_key, n_configs):
+        """
+        Forget any progress and start a new search.
+        """
+        self.search_key = search_key
+        self.n_configs = n_configs
+        self.covered = []
+        self.counters = dict.fromkeys(CHECKPOINT_COUNTERS, 0)
+        self.best_score = -1
+        self.best_board = None
+        self.status = 'running'
+        self.solution = None
+        self.resumed = False
+        self._last_save = time.perf_counter()
+
+    def _add_interval(self, lo, hi):
+        """
+        Add [lo, hi) to the covered ranges, merging it with the ranges it touches.
+        """
+        merged = []
+        for covered_lo, covered_hi in self.covered:
+            if covered_hi < lo or covered_lo > hi:
+                merged.append([covered_lo, covered_hi])
+            else:
+                lo = min(lo, covered_lo)
+                hi = max(hi, covered_hi)
+        merged.append([lo, hi])
+        self.covered = sorted(merged)
+
+
+def search_key(puzzle_hash, search_sites, block_list, order):
+    """
+    Identify one enumeration search: the boards are numbered the same way only for the same puzzle, ranked search
+    sites, blocks, and enumeration order.
+
+    **Parameters**
+
+        puzzle_hash: *str*
+            Canonical hash of the puzzle (see SolutionCache.canonical_puzzle_hash)
+        search_sites: *list, int*
+            The flat indexes of the sites to place blocks on, in enumeration order
+        block_list: *list, int*
+            The blocks to place
+        order: *str*
+            The enumeration order (see PlacementEnumerator)
+
+    **Returns**
+
+        *str*
+            Hex SHA-256 digest
+    """
+    key = {'puzzle': puzzle_hash, 'sites': [int(site) for site in search_sites],
+           'blocks': sorted(int(block) for block in block_list), 'order': order}
+    return hashlib.sha256(json.dumps(key, separators=(',', ':')).encode()).hexdigest()
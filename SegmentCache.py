@@ -0,0 +1,292 @@
+from collections import OrderedDict, deque
+from beam_rules import next_relevant_cell, reflected_state
+from SolverStats import TRACE_STEPS, REFRACTIVE_SPLITS
+
+# block types that end a beam segment (every type other than free and hole)
+SEGMENT_END_BLOCK_TYPES = (1, 2, 3, 5, 6, 7)
+
+
+class SegmentCache:
+    """
+    A class to memoize beam segments between block interactions, shared across the boards of a puzzle traced one at a
+    time (the backtracking search, and Board.get_laser_path when given a cache). The enumeration search does not use
+    it: its compiled batch kernels trace a board faster than the interpreter can look segments up.
+
+    A segment starts at a beam state (position and direction) and follows the beam straight through free cells and
+    holes until the next relevant cell holds a block or lies off the board. It only depends on how far along the ray
+    the first block lies, so it is keyed on the start state plus the number of free cells before that block (the
+    type of the block is read from the board on every lookup). Boards that differ anywhere past the first block, or
+    off the ray, share the entry.
+
+    **Attributes**
+
+        n_rows: *int*
+            The number of rows of cells on the boards traced through this cache
+        n_cols: *int*
+            The number of columns of cells on the boards traced through this cache
+        max_size: *int*
+            The maximum number of segments kept; the least recently used segment is evicted beyond that
+        hits: *int*
+            The number of segment lookups answered from the cache
+        misses: *int*
+            The number of segment lookups that had to walk the beam
+        evictions: *int*
+            The number of segments dropped to stay within max_size
+
+    **Methods**
+
+        get_segment: returns the beam segment starting at a given state on a given board
+            args - state (tuple, int), block_masks (tuple, int)
+            returns - segment (tuple)
+        trace: computes the points visited by every laser source, segment by segment
+            args - block_masks (tuple, int), laser_pos (list, list, int), laser_dir (list, list, int),
+                   counters (numpy.array<int64, 1D>, optional), attribute_lasers (bool, optional)
+            returns - visited_pts (list, list, int), laser_idxs (list, int), touched_mask (int),
+                      branch_starts (list, bool)
+        clear: drops every cached segment and resets the counters
+            args - None
+            returns - None
+    """
+
+    def __init__(self, n_rows, n_cols, max_size=65536):
+        """
+        SegmentCache class constructor
+
+        **Parameters**
+
+            n_rows: *int*
+                The number of rows of cells on the boards traced through this cache
+            n_cols: *int*
+                The number of columns of cells on the boards traced through this cache
+            max_size: *int*
+                The maximum number of segments kept
+
+        **Returns**
+
+            None
+        """
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._segments = OrderedDict()
+        # bitmasks of the first 1, 2, ... cells along the straight ray from each state (board geometry only)
+        self._ray_prefixes = {}
+
+    def __len__(self):
+        return len(self._segments)
+
+    @property
+    def hit_rate(self):
+        """
+        Fraction of segment lookups answered from the cache.
+        """
+        n_lookups = self.hits + self.misses
+        return self.hits / n_lookups if n_lookups else 0.0
+
+    def clear(self):
+        """
+        Drop every cached segment and reset the counters.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            None
+        """
+        self._segments.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_segment(self, state, block_masks):
+        """
+        Get the beam segment starting at a given state.
+
+        **Parameters**
+
+            state: *tuple, int*
+                (x, y, dx, dy) position and direction of the beam at the start of the segment
+            block_masks: *tuple, int*
+                Occupancy bitmask of each block type, indexed by block type (see Board)
+
+        **Returns**
+
+            segment: *tuple*
+                (points, end_state, end_block, touched_mask) where points holds the (x, y) coords visited in order
+                (including the start), end_state is the (x, y, dx, dy) state at the last point, end_block is the
+                type of the block in the next relevant cell (-1 if it is off the board), and touched_mask is the
+                bitmask of the cells the segment read
+        """
+        prefixes = self._ray_prefixes.get(state)
+        if prefixes is None:
+            prefixes = self._ray_prefixes[state] = self._get_ray_prefixes(state)
+        blocked = 0
+        for block in SEGMENT_END_BLOCK_TYPES:
+            blocked |= block_masks[block]
+
+        # n_free: the number of cells crossed before the first block (binary search over the growing prefixes)
+        n_cells = len(prefixes)
+        if n_cells == 0 or prefixes[-1] & blocked == 0:
+            n_free = n_cells
+        else:
+            lo, hi = 0, n_cells - 1
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if prefixes[mid] & blocked:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            n_free = lo
+
+        key = (state, n_free)
+        segment = self._segments.get(key)
+        if segment is not None:
+            self.hits += 1
+            self._segments.move_to_end(key)
+        else:
+            self.misses += 1
+            segment = self._segments[key] = self._walk_segment(state, n_free, prefixes)
+            if len(self._segments) > self.max_size:
+                self._segments.popitem(last=False)
+                self.evictions += 1
+
+        points, end_state, touched_mask = segment
+        end_block = -1
+        if n_free < n_cells:
+            block_bit = prefixes[n_free] ^ (prefixes[n_free - 1] if n_free > 0 else 0)
+            end_block = next(block for block in SEGMENT_END_BLOCK_TYPES if block_masks[block] & block_bit)
+        return points, end_state, end_block, touched_mask
+
+    def trace(self, block_masks, laser_pos, laser_dir, counters=None, attribute_lasers=False):
+        """
+        Compute the points visited by every laser source, segment by segment. Follows the same rules as
+        laser_kernels.trace_laser_paths: branches are explored in the order they split off, and a branch ends when
+        the state starting its next segment was already visited, so cycles are cut exactly. Laser sources share their
+        visited states unless attribute_lasers is set. The points and cells visited are the same as the kernel's.
+
+        **Parameters**
+
+            block_masks: *tuple, int*
+                Occupancy bitmask of each block type, indexed by block type (see Board)
+            laser_pos: *list, list, int*
+                A double-nested list holding [x, y] coords of the laser sources
+            laser_dir: *list, list, int*
+                A double-nested list holding [vx, vy] directions of the laser sources
+            counters: *numpy.array<int64, 1D>*
+                Optional instrumentation counters (see SolverStats), incremented by the steps taken and the
+                refractive splits
+            attribute_lasers: *bool*
+                Trace every laser source to its end, so the points of each source form its complete path (by default
+                a source merging into the beam of an earlier one stops at the merge point)
+
+        **Returns**
+
+            visited_pts: *list, list, int*
+                [x, y] coords of the visited points, each branch in the order it was visited
+            laser_idxs: *list, int*
+                Index of the laser source that visited each point
+            touched_mask: *int*
+                Bitmask of every cell whose contents the beam depended on
+            branch_starts: *list, bool*
+                True for each point that starts a new run of beam steps (see laser_kernels.trace_laser_paths)
+        """
+        visited_pts = []
+        laser_idxs = []
+        branch_starts = []
+        touched_mask = 0
+        seen = set()  # segment start states visited (by the current laser source only with attribute_lasers)
+
+        for i, (pos, direction) in enumerate(zip(laser_pos, laser_dir)):
+            start = (pos[0], pos[1], direction[0], direction[1])
+            if attribute_lasers:
+                seen = set()
+            if not (0 <= pos[0] <= 2 * self.n_cols and 0 <= pos[1] <= 2 * self.n_rows) or start in seen:
+                continue
+            seen.add(start)
+            queue = deque([start])
+            n_steps = 0
+            first_pt = len(visited_pts)
+
+            while len(queue) > 0:
+                state = queue.popleft()
+                # the branch start is recorded again so each branch is a contiguous run of points
+                if len(visited_pts) == first_pt or visited_pts[-1] != [state[0], state[1]]:
+                    visited_pts.append([state[0], state[1]])
+                    laser_idxs.append(i)
+                    branch_starts.append(True)
+                while True:
+                    points, (x, y, dx, dy), end_block, segment_touched = self.get_segment(state, block_masks)
+                    touched_mask |= segment_touched
+                    n_steps += len(points) - 1
+                    for px, py in points[1:]:
+                        visited_pts.append([px, py])
+                        laser_idxs.append(i)
+                    branch_starts.extend([False] * (len(points) - 1))
+
+                    if end_block == -1 or end_block == 3 or end_block == 7:
+                        break
+                    # reflective: turn in place; refractive: queue the reflected branch and pass through
+                    flipped = reflected_state(x, y, dx, dy)
+                    n_steps += 1
+                    if end_block == 1 or end_block == 5:
+                        state = flipped
+                    else:
+                        if flipped not in seen:
+                            seen.add(flipped)
+                            queue.append(flipped)
+                            if counters is not None:
+                                counters[REFRACTIVE_SPLITS] += 1
+                        state = (x + dx, y + dy, dx, dy)
+                        visited_pts.append([x + dx, y + dy])
+                        laser_idxs.append(i)
+                        branch_starts.append(False)
+                    if state in seen:
+                        break
+                    seen.add(state)
+
+            if counters is not None:
+                counters[TRACE_STEPS] += n_steps
+
+        return visited_pts, laser_idxs, touched_mask, branch_starts
+
+    def _next_cell_bit(self, x, y, dx, dy):
+        """
+        Bit of the next relevant cell for a beam state (0 if that cell is off the board).
+        """
+        row, col = next_relevant_cell(x, y, dx, dy)
+        if 0 <= row < self.n_rows and 0 <= col < self.n_cols:
+            return 1 << (row * self.n_cols + col)
+        return 0
+
+    def _get_ray_prefixes(self, state):
+        """
+        Bitmasks of the first 1, 2, ... cells read by a beam going straight from a state until it leaves the board.
+        """
+        x, y, dx, dy = state
+        prefixes = []
+        ray_mask = 0
+        while True:
+            cell_bit = self._next_cell_bit(x, y, dx, dy)
+            if cell_bit == 0:
+                return tuple(prefixes)
+            ray_mask |= cell_bit
+            prefixes.append(ray_mask)
+            x += dx
+            y += dy
+
+    def _walk_segment(self, state, n_free, prefixes):
+        """
+        Build the segment from a state across n_free free cells or holes (the cell after them holds a block or lies
+        off the board): its points, its end state, and the bitmask of the cells it read.
+        """
+        x, y, dx, dy = state
+        points = tuple((x + k * dx, y + k * dy) for k in range(n_free + 1))
+        # a block ends the segment after being read; a beam leaving the board read every cell of the ray
+        n_read = min(n_free + 1, len(prefixes))
+        touched_mask = prefixes[n_read - 1] if n_read > 0 else 0
+        return points, (x + n_free * dx, y + n_free * dy, dx, dy), touched_mask
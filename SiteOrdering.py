@@ -0,0 +1,162 @@
+import numpy as np
+from bffParser import FREE
+
+# named heuristics understood by SiteOrdering.order (a callable taking (site_ordering, site) may be passed instead)
+SITE_HEURISTICS = ('index', 'static', 'goal_proximity', 'beam_path', 'laser_adjacency')
+
+
+class SiteOrdering:
+    """
+    A class ranking the relevant sites of a puzzle for the enumerator, most promising first. Combined with the
+    best-first enumeration order (see PlacementEnumerator), every placement within the first m ranked sites is traced
+    before any placement using a worse site.
+
+    Sites are ranked by a heuristic sort key computed from a few static features:
+        'index' - flat board index (row-major order)
+        'static' - PuzzleIndex.site_score: sites next to more goals first, then sites read by more relaxed beams
+        'goal_proximity' - sites closest to a goal the beam of the empty board misses first
+        'beam_path' - sites on the beam of the empty board first, then sites read by more relaxed beams
+        'laser_adjacency' - sites closest to a laser source first
+    Any callable taking (site_ordering, site) and returning a sort key (smaller is more promising) can be plugged in
+    instead of a name.
+
+    **Attributes**
+
+        puzzle_index: *PuzzleIndex object*
+            Static analysis of the puzzle (relevant sites, goals next to each site, relaxed beam reads)
+        beam_sites: *set, int*
+            Flat indexes of the free cells the beam of the empty board reads
+        goal_distance: *dict, int, int*
+            For each relevant site, the lattice distance from its center to the closest goal the beam of the empty
+            board misses (to the closest goal if it hits them all)
+        laser_distance: *dict, int, int*
+            For each relevant site, the lattice distance from its center to the closest laser source
+
+    **Methods**
+
+        sort_key: the sort key function of a heuristic
+            args - heuristic (str or callable)
+            returns - callable (site -> sort key)
+        order: the sites to search, ranked by a heuristic
+            args - heuristic (str or callable)
+            returns - list, int
+    """
+
+    def __init__(self, empty_board, laser_pos_list, laser_dir_list, point_goal_list, puzzle_index):
+        """
+        SiteOrdering class constructor
+
+        **Parameters**
+
+            empty_board: *list, list, int*
+                A double-nested list representing the empty board to solve (no free blocks placed)
+            laser_pos_list: *list, list, int*
+                A double-nested list holding [x, y] coords of the laser sources
+            laser_dir_list: *list, list, int*
+                A double-nested list holding [vx, vy] directions of the laser sources
+            point_goal_list: *list, list, int*
+                A double-nested list holding [x, y] positions of the points that the laser must pass through
+            puzzle_index: *PuzzleIndex object*
+                Static analysis of the same puzzle
+
+        **Returns**
+
+            None
+        """
+        self.puzzle_index = puzzle_index
+        n_cols = puzzle_index.n_cols
+        visited_pts, self.beam_sites = self._trace_empty_board(empty_board, laser_pos_list, laser_dir_list)
+
+        goals = [tuple(pt) for pt in point_goal_list]
+        missed_goals = [goal for goal in goals if goal not in visited_pts] or goals
+        self.goal_distance = {}
+        self.laser_distance = {}
+        for site in puzzle_index.relevant_sites:
+            row, col = divmod(site, n_cols)
+            center = (2 * col + 1, 2 * row + 1)
+            self.goal_distance[site] = min((lattice_distance(center, goal) for goal in missed_goals), default=0)
+            self.laser_distance[site] = min((lattice_distance(center, pos) for pos in laser_pos_list), default=0)
+
+    def __repr__(self):
+        return f'SiteOrdering({len(self.puzzle_index.relevant_sites)} relevant sites, ' \
+               f'{len(self.beam_sites)} on the beam of the empty board)'
+
+    def sort_key(self, heuristic):
+        """
+        The sort key function of a heuristic.
+
+        **Parameters**
+
+            heuristic: *str or callable*
+                One of SITE_HEURISTICS, or a callable taking (site_ordering, site) and returning a sort key
+
+        **Returns**
+
+            *callable*
+                Maps a site to its sort key (smaller is more promising)
+        """
+        if callable(heuristic):
+            return lambda site: heuristic(self, site)
+        reads = self.puzzle_index.site_reads
+        if heuristic == 'index':
+            return lambda site: site
+        elif heuristic == 'static':
+            return self.puzzle_index.site_score
+        elif heuristic == 'goal_proximity':
+            return lambda site: (self.goal_distance[site], -reads[site], site)
+        elif heuristic == 'beam_path':
+            return lambda site: (site not in self.beam_sites, -reads[site], site)
+        elif heuristic == 'laser_adjacency':
+            return lambda site: (self.laser_distance[site], -reads[site], site)
+        raise ValueError(f'unknown site heuristic {heuristic!r}, expected one of {SITE_HEURISTICS} or a callable')
+
+    def order(self, heuristic='beam_path'):
+        """
+        The sites to search, ranked by a heuristic: the relevant sites, most promising first, then the irrelevant
+        sites kept by the PuzzleIndex to hold leftover blocks.
+
+        **Parameters**
+
+            heuristic: *str or callable*
+                One of SITE_HEURISTICS, or a callable taking (site_ordering, site) and returning a sort key
+
+        **Returns**
+
+            search_sites: *list, int*
+                Flat indexes of the sites to place blocks on, in enumeration order
+        """
+        relevant_sites = self.puzzle_index.relevant_sites
+        ranked = sorted(relevant_sites, key=self.sort_key(heuristic))
+        return ranked + self.puzzle_index.search_sites[len(relevant_sites):]
+
+    def _trace_empty_board(self, empty_board, laser_pos_list, laser_dir_list):
+        """
+        Trace the beam of the empty board with the compiled kernel. Returns the points visited and the free cells
+        read.
+        """
+        from laser_kernels import trace_laser_paths
+        grid = np.array(empty_board, dtype=np.int8)
+        laser_pos = np.array(laser_pos_list, dtype=np.int64).reshape(-1, 2)
+        laser_dir = np.array(laser_dir_list, dtype=np.int64).reshape(-1, 2)
+        visited_pts, _, touched_cells, _ = trace_laser_paths(grid, laser_pos, laser_dir, None, False)
+        beam_sites = set(np.flatnonzero(touched_cells & (grid == FREE)).tolist())
+        return set(map(tuple, visited_pts.tolist())), beam_sites
+
+
+def lattice_distance(pt_a, pt_b):
+    """
+    Manhattan distance between two points of the half-cell lattice.
+
+    **Parameters**
+
+        pt_a: *tuple, int*
+            (x, y) coords of the first point
+        pt_b: *tuple, int*
+            (x, y) coords of the second point
+
+    **Returns**
+
+        *int*
+            |xa - xb| + |ya - yb|
+    """
+    return abs(pt_a[0] - pt_b[0]) + abs(pt_a[1] - pt_b[1])
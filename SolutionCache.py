@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from Board import TRACER_VERSION
+
+
+class SolutionCache:
+    """
+    A class to persist winning placements on disk (SQLite), keyed by a canonical hash of the parsed puzzle.
+
+    Entries are tagged with the tracer version that found them. Entries from any other version are dropped when the
+    cache is opened, so a change to the tracing rules never serves stale solutions. The cache keeps at most
+    max_entries solutions and evicts the least recently used ones beyond that.
+
+    **Attributes**
+
+        path: *str*
+            Path of the SQLite database file
+        max_entries: *int*
+            The maximum number of solutions kept
+        tracer_version: *str*
+            The tracer version entries must match to be served
+        hits: *int*
+            The number of lookups answered from the cache since it was opened
+        misses: *int*
+            The number of lookups that found nothing since it was opened
+
+    **Methods**
+
+        get: looks up the placement stored for a puzzle hash
+            args - puzzle_hash (str)
+            returns - placement (list, list, int) or None
+        put: stores the placement that solves a puzzle
+            args - puzzle_hash (str), placement (list, list, int)
+            returns - None
+        invalidate: drops one entry, or every entry
+            args - puzzle_hash (str, optional)
+            returns - None
+        close: closes the database
+            args - None
+            returns - None
+    """
+
+    def __init__(self, path='lazor_solutions.sqlite', max_entries=10000, tracer_version=TRACER_VERSION):
+        """
+        SolutionCache class constructor
+
+        **Parameters**
+
+            path: *str*
+                Path of the SQLite database file (created if missing)
+            max_entries: *int*
+                The maximum number of solutions kept
+            tracer_version: *str*
+                The tracer version entries must match to be served
+
+        **Returns**
+
+            None
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.tracer_version = tracer_version
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS solutions ('
+                             'puzzle_hash TEXT PRIMARY KEY, tracer_version TEXT NOT NULL, placement TEXT NOT NULL, '
+                             'created REAL NOT NULL, last_used REAL NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)')
+            self._db.execute('DELETE FROM solutions WHERE tracer_version != ?', (self.tracer_version,))
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, puzzle_hash):
+        """
+        Look up the placement stored for a puzzle.
+
+        **Parameters**
+
+            puzzle_hash: *str*
+                Canonical hash of the puzzle (see canonical_puzzle_hash)
+
+        **Returns**
+
+            placement: *list, list, int*
+                [row, col, block] for every block placed (None if the puzzle is not cached)
+        """
+        row = self._db.execute('SELECT placement FROM solutions WHERE puzzle_hash = ? AND tracer_version = ?',
+                               (puzzle_hash, self.tracer_version)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._db:
+            self._db.execute('UPDATE solutions SET last_used = ? WHERE puzzle_hash = ?', (time.time(), puzzle_hash))
+        return json.loads(row[0])
+
+    def put(self, puzzle_hash, placement):
+        """
+        Store the placement that solves a puzzle, evicting the least recently used entries beyond max_entries.
+
+        **Parameters**
+
+            puzzle_hash: *str*
+                Canonical hash of the puzzle (see canonical_puzzle_hash)
+            placement: *list, list, int*
+                [row, col, block] for every block placed
+
+        **Returns**
+
+            None
+        """
+        now = time.time()
+        with self._db:
+            self._db.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)',
+                             (puzzle_hash, self.tracer_version, json.dumps(placement), now, now))
+            self._db.execute('DELETE FROM solutions WHERE puzzle_hash NOT IN '
+                             '(SELECT puzzle_hash FROM solutions ORDER BY last_used DESC LIMIT ?)',
+                             (self.max_entries,))
+
+    def invalidate(self, puzzle_hash=None):
+        """
+        Drop the entry of one puzzle, or every entry.
+
+        **Parameters**
+
+            puzzle_hash: *str*
+                Canonical hash of the puzzle to drop (None drops everything)
+
+        **Returns**
+
+            None
+        """
+        with self._db:
+            if puzzle_hash is None:
+                self._db.execute('DELETE FROM solutions')
+            else:
+                self._db.execute('DELETE FROM solutions WHERE puzzle_hash = ?', (puzzle_hash,))
+
+    def close(self):
+        """
+        Close the database.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            None
+        """
+        self._db.close()
+
+
+def canonical_puzzle_hash(grid, laserList, pointGoalList, blockList):
+    """
+    Hash a parsed puzzle so that equivalent puzzles share a key: only the parsed content counts (not whitespace,
+    comments, or file names), and the order of the lasers, goals, and blocks does not matter.
+
+    **Parameters**
+
+        grid, laserList, pointGoalList, blockList:
+            The puzzle, in the format returned by bffParser.openBFF
+
+    **Returns**
+
+        puzzle_hash: *str*
+            Hex SHA-256 digest of the canonical puzzle
+    """
+    canonical = {
+        'grid': [[int(cell) for cell in row] for row in grid],
+        'lasers': sorted([int(v) for v in laser] for laser in laserList),
+        'goals': sorted([int(v) for v in pt] for pt in pointGoalList),
+        'blocks': sorted(int(block) for block in blockList),
+    }
+    return hashlib.sha256(json.dumps(canonical, separators=(',', ':')).encode()).hexdigest()
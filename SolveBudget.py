@@ -0,0 +1,217 @@
+import threading
+import time
+
+
+class SolveBudget:
+    """
+    A class bounding one LazorSolver.solve call: a time limit, a limit on the number of boards evaluated, cooperative
+    cancellation, and progress reports. While the search runs it keeps the best candidate seen so far, scored by the
+    number of goals its beam covers, so a search stopped early still returns its closest attempt.
+
+        budget = SolveBudget(time_limit=2.0, progress_callback=print)
+        result = solver.solve(budget)   # result.score, result.best_placement, result.stop_reason
+
+    **Attributes**
+
+        time_limit: *float*
+            Seconds the search may run (None for no limit)
+        max_evaluations: *int*
+            The number of boards the search may evaluate (None for no limit)
+        progress_callback: *callable*
+            Called as progress_callback(progress) at most every progress_interval seconds with a dict holding
+            elapsed, boards_evaluated, best_score, and n_goals. Returning False cancels the search.
+        progress_interval: *float*
+            Minimum seconds between two progress reports
+        n_evaluated: *int*
+            The number of boards evaluated so far
+        best_score: *int*
+            The number of goals covered by the best candidate so far (-1 before any candidate)
+        best_board: *list, list, int*
+            The best candidate so far (None before any candidate)
+        stop_reason: *str*
+            Why the search stopped early: 'time', 'evaluations', or 'cancelled' (None if it was not stopped)
+
+    **Methods**
+
+        start: resets the counters and starts the clock
+            args - n_goals (int)
+            returns - None
+        cancel: asks the search to stop at its next check (safe to call from another thread)
+            args - None
+            returns - None
+        charge: counts evaluated boards, reports progress, and checks the limits
+            args - n_evaluated (int)
+            returns - Boolean (False once the search must stop)
+        remaining_evaluations: how many more boards may be evaluated
+            args - None
+            returns - int (None for no limit)
+        remaining_time: how many more seconds the search may run
+            args - None
+            returns - float (None for no limit)
+        offer: keeps a candidate if it covers more goals than the best so far
+            args - score (int), board (list, list, int or numpy.array<int8, 2D>)
+            returns - None
+    """
+
+    def __init__(self, time_limit=None, max_evaluations=None, progress_callback=None, progress_interval=0.5):
+        """
+        SolveBudget class constructor
+
+        **Parameters**
+
+            time_limit: *float*
+                Seconds the search may run (None for no limit)
+            max_evaluations: *int*
+                The number of boards the search may evaluate (None for no limit)
+            progress_callback: *callable*
+                Optional progress hook, called with a dict (returning False cancels the search)
+            progress_interval: *float*
+                Minimum seconds between two progress reports
+
+        **Returns**
+
+            None
+        """
+        self.time_limit = time_limit
+        self.max_evaluations = max_evaluations
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self._cancel_event = threading.Event()
+        self.start()
+
+    def __repr__(self):
+        return f'SolveBudget(evaluated={self.n_evaluated}, best_score={self.best_score}/{self.n_goals}, ' \
+               f'stop_reason={self.stop_reason!r})'
+
+    @property
+    def elapsed(self):
+        """
+        Seconds since the budget was started.
+        """
+        return time.perf_counter() - self._start
+
+    @property
+    def stopped(self):
+        """
+        True once the search must stop (a limit was reached or the search was cancelled).
+        """
+        return self.stop_reason is not None
+
+    def start(self, n_goals=None):
+        """
+        Reset the counters and the best candidate, and start the clock.
+
+        **Parameters**
+
+            n_goals: *int*
+                The number of goals of the puzzle (reported in progress)
+
+        **Returns**
+
+            None
+        """
+        self.n_goals = n_goals
+        self.n_evaluated = 0
+        self.best_score = -1
+        self.best_board = None
+        self.stop_reason = None
+        self._cancel_event.clear()
+        self._start = time.perf_counter()
+        self._last_report = self._start
+
+    def cancel(self):
+        """
+        Ask the search to stop at its next check. Safe to call from another thread.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            None
+        """
+        self._cancel_event.set()
+
+    def charge(self, n_evaluated=0):
+        """
+        Count evaluated boards, report progress when due, and check the limits.
+
+        **Parameters**
+
+            n_evaluated: *int*
+                The number of boards evaluated since the last call
+
+        **Returns**
+
+            *Boolean*
+                False once the search must stop
+        """
+        self.n_evaluated += n_evaluated
+        now = time.perf_counter()
+        if self.progress_callback is not None and now - self._last_report >= self.progress_interval:
+            self._last_report = now
+            if self.progress_callback({'elapsed': now - self._start, 'boards_evaluated': self.n_evaluated,
+                                       'best_score': max(self.best_score, 0), 'n_goals': self.n_goals}) is False:
+                self.cancel()
+        if self.stop_reason is None:
+            if self._cancel_event.is_set():
+                self.stop_reason = 'cancelled'
+            elif self.time_limit is not None and now - self._start >= self.time_limit:
+                self.stop_reason = 'time'
+            elif self.max_evaluations is not None and self.n_evaluated >= self.max_evaluations:
+                self.stop_reason = 'evaluations'
+        return self.stop_reason is None
+
+    def remaining_evaluations(self):
+        """
+        How many more boards may be evaluated.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            *int*
+                The number of boards left in the budget (None for no limit)
+        """
+        if self.max_evaluations is None:
+            return None
+        return max(0, self.max_evaluations - self.n_evaluated)
+
+    def remaining_time(self):
+        """
+        How many more seconds the search may run.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            *float*
+                The seconds left in the budget (None for no limit)
+        """
+        if self.time_limit is None:
+            return None
+        return max(0.0, self.time_limit - self.elapsed)
+
+    def offer(self, score, board):
+        """
+        Keep a candidate if its beam covers more goals than the best candidate so far.
+
+        **Parameters**
+
+            score: *int*
+                The number of goals the candidate's beam covers
+            board: *list, list, int or numpy.array<int8, 2D>*
+                The candidate board configuration (copied when kept)
+
+        **Returns**
+
+            None
+        """
+        if score > self.best_score:
+            self.best_score = int(score)
+            self.best_board = [[int(cell) for cell in row] for row in board]
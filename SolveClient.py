@@ -0,0 +1,188 @@
+import itertools
+import json
+import socket
+
+
+class SolveServerError(Exception):
+    """
+    Raised by SolveClient when the server answers a request with an error.
+
+    **Attributes**
+
+        error_type: *str*
+            'invalid' (malformed request or puzzle), 'timeout', or 'failed' (the solver raised)
+        reply: *dict*
+            The whole reply of the server
+    """
+
+    def __init__(self, reply):
+        super().__init__(f"{reply.get('error_type')}: {reply.get('error')}")
+        self.error_type = reply.get('error_type')
+        self.reply = reply
+
+
+class SolveClient:
+    """
+    A class sending solve requests to a SolveServer over its Unix socket or TCP port, one request at a time.
+
+        with SolveClient(path='/tmp/lazor.sock') as client:
+            result = client.solve_file('bff/mad_1.bff', timeout=5)   # SolveResult.to_dict()
+
+    **Attributes**
+
+        address: *str or tuple*
+            The socket path, or the (host, port) pair, of the server
+
+    **Methods**
+
+        solve_bff: solves a puzzle given as .bff text
+            args - bff_text (str), timeout (float, optional), method (str, optional), **options
+            returns - dict (see SolveResult.to_dict)
+        solve_file: solves a .bff file, sending its text (the server needs no access to the file)
+            args - file_ptr (str), timeout (float, optional), method (str, optional), **options
+            returns - dict
+        solve_puzzle: solves a parsed puzzle
+            args - grid, laserList, pointGoalList, blockList (as returned by openBFF), timeout (float, optional),
+                   method (str, optional), **options
+            returns - dict
+        ping: asks the server for its counters
+            args - None
+            returns - dict
+        close: closes the connection
+            args - None
+            returns - None
+    """
+
+    def __init__(self, path=None, host='127.0.0.1', port=None, connect_timeout=5.0):
+        """
+        SolveClient class constructor: connects to the server.
+
+        **Parameters**
+
+            path: *str*
+                Path of the Unix socket of the server
+            host: *str*
+                Host of the server over TCP
+            port: *int*
+                TCP port of the server (used when no socket path is given)
+            connect_timeout: *float*
+                Seconds to wait for the connection
+
+        **Returns**
+
+            None
+        """
+        if path is None and port is None:
+            raise ValueError('pass the path of the Unix socket or the TCP port of the server')
+        if path is not None:
+            self.address = path
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.address = (host, port)
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.settimeout(connect_timeout)
+        self._sock.connect(self.address)
+        self._sock.settimeout(None)
+        self._reader = self._sock.makefile('rb')
+        self._ids = itertools.count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f'SolveClient({self.address!r})'
+
+    def solve_bff(self, bff_text, timeout=None, method='enumerate', **options):
+        """
+        Solve a puzzle given as .bff text.
+
+        **Parameters**
+
+            bff_text: *str*
+                The contents of a .bff file
+            timeout: *float*
+                Seconds the server may spend on the request (defaults to the server's timeout). Once it runs out
+                the search stops and the result holds its best partial placement.
+            method: *str*
+                The search method used by LazorSolver.solve
+            **options:
+                Extra LazorSolver arguments (see SolveServer.SOLVER_OPTIONS)
+
+        **Returns**
+
+            result: *dict*
+                The result of the solve (see SolveResult.to_dict)
+        """
+        return self._solve({'bff': bff_text}, timeout, method, options)
+
+    def solve_file(self, file_ptr, timeout=None, method='enumerate', **options):
+        """
+        Solve a .bff file, sending its text (see solve_bff for the parameters).
+        """
+        with open(file_ptr, 'r') as f:
+            return self.solve_bff(f.read(), timeout, method, **options)
+
+    def solve_puzzle(self, grid, laserList, pointGoalList, blockList, timeout=None, method='enumerate', **options):
+        """
+        Solve a parsed puzzle, in the format returned by bffParser.openBFF (see solve_bff for the other parameters).
+        """
+        puzzle = {'grid': grid, 'lasers': laserList, 'goals': pointGoalList, 'blocks': blockList}
+        return self._solve({'puzzle': puzzle}, timeout, method, options)
+
+    def ping(self):
+        """
+        Ask the server for its counters.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            reply: *dict*
+                counters, queued, processes, and uptime
+        """
+        return self._request({'op': 'ping'})
+
+    def close(self):
+        """
+        Close the connection.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            None
+        """
+        self._reader.close()
+        self._sock.close()
+
+    def _solve(self, request, timeout, method, options):
+        """
+        Send a solve request and return its result, raising SolveServerError on an error reply.
+        """
+        request['method'] = method
+        if timeout is not None:
+            request['timeout'] = timeout
+        if options:
+            request['options'] = options
+        return self._request(request)['result']
+
+    def _request(self, request):
+        """
+        Send one request and wait for its reply.
+        """
+        request['id'] = next(self._ids)
+        self._sock.sendall(json.dumps(request).encode() + b'\n')
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError(f'the solve server at {self.address!r} closed the connection')
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise SolveServerError(reply)
+        return reply
@@ -0,0 +1,572 @@
+"""
+Long-running local solve server: keeps a pool of worker processes with the compiled kernels loaded, so a solve
+request pays neither interpreter startup nor numpy/numba imports nor kernel loading.
+
+Clients connect over a Unix socket or localhost TCP and exchange newline-delimited JSON (see SolveClient). A request
+holds an 'id' (echoed back), the puzzle as .bff text ('bff') or parsed ('puzzle': grid, lasers, goals, blocks as
+returned by bffParser.openBFF), and optionally 'timeout' (seconds), 'method', and 'options' (extra LazorSolver
+arguments among SOLVER_OPTIONS). The server replies to each request, in the order the requests finish, with either
+
+    {"id": ..., "ok": true, "seconds": ..., "result": SolveResult.to_dict()}
+    {"id": ..., "ok": false, "error_type": "invalid" | "timeout" | "failed", "error": "..."}
+
+and answers {"op": "ping"} with its counters. Requests wait in a bounded queue: once it is full the server stops
+reading from the connections that are submitting, so clients are slowed down instead of piling up work. The timeout
+of a request covers its time in the queue and its search; the search itself is given the time left as a
+SolveBudget, so a worker stops at the deadline and the reply carries the best partial placement (stop_reason 'time').
+
+    python SolveServer.py --socket /tmp/lazor.sock --processes 4
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from bffParser import parseBFF, FREE, REFLECTIVE, OPAQUE, FIXED_OPAQUE
+from laser_kernels import warm_up
+from LazorSolver import LazorSolver, SEARCH_METHODS
+from PlacementEnumerator import ENUMERATION_ORDERS
+from SiteOrdering import SITE_HEURISTICS
+from SolutionCache import SolutionCache
+from SolveBudget import SolveBudget
+
+# LazorSolver arguments a request may set through 'options'
+SOLVER_OPTIONS = ('batch_size', 'segment_cache_size', 'use_symmetry', 'ordering', 'enumeration_order')
+
+# largest batch_size and segment_cache_size a request may ask for (both size memory a worker allocates)
+MAX_BATCH_SIZE = 1 << 16
+MAX_SEGMENT_CACHE_SIZE = 1 << 20
+
+# longest request line accepted (a .bff text or a parsed puzzle fits easily)
+MAX_REQUEST_BYTES = 1 << 24
+
+# extra seconds a worker gets past the deadline of a request to return its partial result
+TIMEOUT_GRACE = 1.0
+
+# solution cache of the worker process (None when the server runs without one)
+_worker_cache = None
+
+
+class SolveServer:
+    """
+    A class serving solve requests from a pool of pre-warmed worker processes on an asyncio event loop.
+
+        server = SolveServer(processes=4)
+        asyncio.run(server.serve(path='/tmp/lazor.sock'))
+
+    **Attributes**
+
+        processes: *int*
+            The number of worker processes
+        queue_size: *int*
+            The number of requests that may wait for a worker before the server stops reading new ones
+        default_timeout: *float*
+            Seconds a request may take (queue and search) when it does not set its own timeout
+        cache_path: *str*
+            Path of a SolutionCache database shared by the workers (None disables the cache)
+        counters: *dict*
+            requests, solved, unsolved, timeouts, failed, and invalid request counts since the server started
+
+    **Methods**
+
+        start: starts the workers and listens on a Unix socket or a TCP port
+            args - path (str, optional), host (str, optional), port (int, optional)
+            returns - None
+        serve: starts the server and serves until it is closed
+            args - path (str, optional), host (str, optional), port (int, optional)
+            returns - None
+        close: stops listening, cancels the waiting requests, and shuts the workers down
+            args - None
+            returns - None
+    """
+
+    def __init__(self, processes=None, queue_size=64, default_timeout=30.0, cache_path=None):
+        """
+        SolveServer class constructor
+
+        **Parameters**
+
+            processes: *int*
+                The number of worker processes (defaults to every core)
+            queue_size: *int*
+                The number of requests that may wait for a worker
+            default_timeout: *float*
+                Seconds a request may take when it does not set its own timeout
+            cache_path: *str*
+                Path of a SolutionCache database shared by the workers (None disables the cache)
+
+        **Returns**
+
+            None
+        """
+        self.processes = max(1, processes or os.cpu_count())
+        self.queue_size = queue_size
+        self.default_timeout = default_timeout
+        self.cache_path = cache_path
+        self.counters = dict.fromkeys(('requests', 'solved', 'unsolved', 'timeouts', 'failed', 'invalid'), 0)
+        self._executor = None
+        self._queue = None
+        self._dispatchers = []
+        self._server = None
+        self._start = None
+
+    def __repr__(self):
+        return f'SolveServer(processes={self.processes}, queue_size={self.queue_size}, {self.counters})'
+
+    async def start(self, path=None, host=None, port=None):
+        """
+        Start the worker processes (each loads the compiled kernels before the first request) and listen.
+
+        **Parameters**
+
+            path: *str*
+                Path of the Unix socket to listen on
+            host: *str*
+                Host to listen on over TCP (defaults to localhost when a port is given)
+            port: *int*
+                TCP port to listen on (used when no socket path is given)
+
+        **Returns**
+
+            None
+        """
+        if path is None and port is None:
+            raise ValueError('pass the path of a Unix socket or a TCP port to listen on')
+        # load the kernels before forking, so the workers inherit them instead of each loading them again
+        warm_up()
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=init_server_worker,
+                                             initargs=(self.cache_path,))
+        loop = asyncio.get_running_loop()
+        # one call per worker at once makes the pool start every process now rather than on the first requests
+        await asyncio.gather(*(loop.run_in_executor(self._executor, worker_ready) for _ in range(self.processes)))
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.processes)]
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=path,
+                                                           limit=MAX_REQUEST_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host=host or '127.0.0.1', port=port,
+                                                      limit=MAX_REQUEST_BYTES)
+        self._start = time.perf_counter()
+
+    @property
+    def addresses(self):
+        """
+        The addresses the server listens on (socket paths, or (host, port) pairs).
+        """
+        return [sock.getsockname() for sock in self._server.sockets] if self._server is not None else []
+
+    async def serve(self, path=None, host=None, port=None):
+        """
+        Start the server and serve requests until it is closed (or the task is cancelled).
+
+        **Parameters**
+
+            path, host, port:
+                Where to listen (see start)
+
+        **Returns**
+
+            None
+        """
+        await self.start(path, host, port)
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.close()
+
+    async def close(self):
+        """
+        Stop listening, cancel the requests still waiting for a worker, and shut the workers down.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            None
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, reply = self._queue.get_nowait()
+                if not reply.done():
+                    reply.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Read the requests of one connection line by line, and write each reply as soon as it is ready.
+        """
+        write_lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                admitted = asyncio.Event()
+                task = asyncio.create_task(self._handle_request(line, writer, write_lock, admitted))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                # the next line is read once this request is in the queue: a full queue stops reading (backpressure)
+                await admitted.wait()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_request(self, line, writer, write_lock, admitted):
+        """
+        Validate one request, queue it for a worker, and write its reply. Sets admitted once the request is queued
+        (or answered without a worker).
+        """
+        start = time.perf_counter()
+        self.counters['requests'] += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request must be a JSON object')
+            request_id = request.get('id')
+            if request.get('op') == 'ping':
+                reply = {'id': request_id, 'ok': True, 'counters': dict(self.counters),
+                         'queued': self._queue.qsize(), 'processes': self.processes,
+                         'uptime': time.perf_counter() - self._start}
+            else:
+                reply = await self._solve(request, start, admitted)
+        except (ValueError, TypeError, KeyError) as e:
+            self.counters['invalid'] += 1
+            reply = {'id': request_id, 'ok': False, 'error_type': 'invalid', 'error': f'{type(e).__name__}: {e}'}
+        except Exception as e:
+            # whatever goes wrong, the client gets a reply instead of waiting on its connection forever
+            self.counters['failed'] += 1
+            reply = {'id': request_id, 'ok': False, 'error_type': 'failed', 'error': f'{type(e).__name__}: {e}'}
+        finally:
+            admitted.set()
+
+        async with write_lock:
+            try:
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def _solve(self, request, start, admitted):
+        """
+        Queue a solve request and wait for its reply, within the request's timeout.
+        """
+        task = solve_task_from_request(request)
+        timeout = float(request.get('timeout', self.default_timeout))
+        deadline = start + timeout
+        reply = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put(((task, deadline), reply)), timeout=timeout)
+            admitted.set()
+            return await asyncio.wait_for(asyncio.shield(reply), timeout=max(0.0, deadline - time.perf_counter())
+                                          + TIMEOUT_GRACE)
+        except asyncio.TimeoutError:
+            # settle the reply, so the dispatcher neither counts the request again nor reports its late result
+            reply.cancel()
+            self.counters['timeouts'] += 1
+            return {'id': request.get('id'), 'ok': False, 'error_type': 'timeout',
+                    'error': f'no reply within {timeout} seconds'}
+
+    async def _dispatch(self):
+        """
+        Feed queued requests to the worker pool, one at a time (there are as many dispatchers as workers).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            (task, deadline), reply = await self._queue.get()
+            try:
+                remaining = deadline - time.perf_counter()
+                if reply.done():
+                    continue
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    reply.set_result({'id': task['id'], 'ok': False, 'error_type': 'timeout',
+                                      'error': 'timed out waiting for a worker'})
+                    continue
+                try:
+                    record = await loop.run_in_executor(self._executor, solve_task, task, remaining)
+                except Exception as e:
+                    record = {'id': task['id'], 'ok': False, 'error_type': 'failed',
+                              'error': f'{type(e).__name__}: {e}'}
+                # a request that timed out while it ran was already answered (and counted) by _solve
+                if reply.done():
+                    continue
+                if record['ok']:
+                    self.counters['solved' if record['result']['solved'] else 'unsolved'] += 1
+                else:
+                    self.counters['failed'] += 1
+                reply.set_result(record)
+            finally:
+                self._queue.task_done()
+
+
+def solve_task_from_request(request):
+    """
+    Check a solve request and turn it into the task sent to a worker (the puzzle is parsed here, so a malformed
+    puzzle is reported without using a worker).
+
+    **Parameters**
+
+        request: *dict*
+            The decoded request (see the module docstring)
+
+    **Returns**
+
+        task: *dict*
+            id, puzzle (grid, laserList, pointGoalList, blockList), method, and options
+    """
+    if 'bff' in request:
+        if not isinstance(request['bff'], str):
+            raise ValueError(f"'bff' must be the text of a .bff file, not {type(request['bff']).__name__}")
+        try:
+            puzzle = parseBFF(request['bff'])
+        except Exception as e:
+            raise ValueError(f'malformed .bff text ({type(e).__name__}: {e})') from e
+    elif 'puzzle' in request:
+        parsed = request['puzzle']
+        if not isinstance(parsed, dict):
+            raise ValueError(f"'puzzle' must be an object, not {type(parsed).__name__}")
+        for field, depth in (('grid', 2), ('lasers', 2), ('goals', 2), ('blocks', 1)):
+            if not is_nested_list(parsed.get(field), depth):
+                raise ValueError(f"'puzzle' needs a '{field}' field holding " +
+                                 ('a list of lists' if depth == 2 else 'a list'))
+        puzzle = ([list(map(int, row)) for row in parsed['grid']],
+                  [list(map(int, laser)) for laser in parsed['lasers']],
+                  [list(map(int, pt)) for pt in parsed['goals']],
+                  [int(block) for block in parsed['blocks']])
+    else:
+        raise ValueError("a solve request needs a 'bff' text or a parsed 'puzzle'")
+    check_puzzle(*puzzle)
+
+    timeout = request.get('timeout')
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+                                or not timeout > 0):
+        raise ValueError(f"'timeout' must be a positive number of seconds, not {timeout!r}")
+    method = request.get('method', 'enumerate')
+    if not isinstance(method, str) or method not in SEARCH_METHODS:
+        raise ValueError(f'unknown search method {method!r}, expected one of {SEARCH_METHODS}')
+    options = request.get('options', {})
+    if not isinstance(options, dict):
+        raise ValueError(f"'options' must be an object, not {type(options).__name__}")
+    check_options(options)
+    return {'id': request.get('id'), 'puzzle': puzzle, 'method': method, 'options': options}
+
+
+def check_puzzle(grid, laserList, pointGoalList, blockList):
+    """
+    Check that a parsed puzzle can be traced: a rectangular grid of known cells, and lasers and goals on its lattice.
+    Raises ValueError otherwise.
+
+    **Parameters**
+
+        grid, laserList, pointGoalList, blockList:
+            The puzzle, in the format returned by bffParser.openBFF
+
+    **Returns**
+
+        None
+    """
+    if len(grid) == 0 or len(grid[0]) == 0:
+        raise ValueError('the puzzle has an empty grid')
+    if any(len(row) != len(grid[0]) for row in grid):
+        raise ValueError('the rows of the grid differ in length')
+    if any(not FREE <= cell <= FIXED_OPAQUE for row in grid for cell in row):
+        raise ValueError(f'grid cells must be between {FREE} and {FIXED_OPAQUE}')
+    width, height = 2 * len(grid[0]), 2 * len(grid)
+    for laser in laserList:
+        if len(laser) != 4:
+            raise ValueError(f'a laser is [x, y, vx, vy], not {laser}')
+        x, y, vx, vy = laser
+        if not (0 <= x <= width and 0 <= y <= height) or vx not in (-1, 1) or vy not in (-1, 1):
+            raise ValueError(f'laser {laser} does not start on the grid with a diagonal direction')
+    for pt in pointGoalList:
+        if len(pt) != 2:
+            raise ValueError(f'a goal is [x, y], not {pt}')
+        if not (0 <= pt[0] <= width and 0 <= pt[1] <= height):
+            raise ValueError(f'goal {pt} is off the grid')
+    if any(not REFLECTIVE <= block <= OPAQUE for block in blockList):
+        raise ValueError(f'blocks to place must be between {REFLECTIVE} and {OPAQUE}')
+
+
+def check_options(options):
+    """
+    Check the solver options of a request (see SOLVER_OPTIONS), raising ValueError on an unknown option or a value
+    the solver would reject or could not afford.
+
+    **Parameters**
+
+        options: *dict*
+            The options of the request
+
+    **Returns**
+
+        None
+    """
+    unknown = set(options) - set(SOLVER_OPTIONS)
+    if unknown:
+        raise ValueError(f'unsupported solver options {sorted(unknown)}, expected some of {SOLVER_OPTIONS}')
+    for name, low, high in (('batch_size', 1, MAX_BATCH_SIZE), ('segment_cache_size', 0, MAX_SEGMENT_CACHE_SIZE)):
+        if name in options:
+            value = options[name]
+            if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+                raise ValueError(f'{name} must be an integer between {low} and {high}, not {value!r}')
+    if 'use_symmetry' in options and not isinstance(options['use_symmetry'], bool):
+        raise ValueError(f"use_symmetry must be true or false, not {options['use_symmetry']!r}")
+    if 'ordering' in options and options['ordering'] not in SITE_HEURISTICS:
+        raise ValueError(f"unknown site heuristic {options['ordering']!r}, expected one of {SITE_HEURISTICS}")
+    if 'enumeration_order' in options and options['enumeration_order'] not in ENUMERATION_ORDERS:
+        raise ValueError(f"unknown enumeration order {options['enumeration_order']!r}, expected one of "
+                         f'{ENUMERATION_ORDERS}')
+
+
+def is_nested_list(value, depth):
+    """
+    Whether a decoded JSON value is a list (depth 1) or a list of lists (depth 2).
+
+    **Parameters**
+
+        value: *object*
+            The decoded value
+        depth: *int*
+            1 for a list, 2 for a list of lists
+
+    **Returns**
+
+        *bool*
+    """
+    if not isinstance(value, list):
+        return False
+    return depth == 1 or all(isinstance(item, list) for item in value)
+
+
+def init_server_worker(cache_path):
+    """
+    Initializer for the worker processes of SolveServer: load the compiled kernels and open the solution cache.
+
+    **Parameters**
+
+        cache_path: *str*
+            Path of the SolutionCache database (None for no cache)
+
+    **Returns**
+
+        None
+    """
+    global _worker_cache
+    warm_up()
+    _worker_cache = None if cache_path is None else SolutionCache(cache_path)
+
+
+def worker_ready():
+    """
+    Worker task returning once the worker process is up (used to start every worker ahead of the first request).
+
+    **Parameters**
+
+        None
+
+    **Returns**
+
+        *int*
+            The process id of the worker
+    """
+    return os.getpid()
+
+
+def solve_task(task, time_limit):
+    """
+    Worker task: solve one puzzle within a time limit.
+
+    **Parameters**
+
+        task: *dict*
+            The task built by solve_task_from_request
+        time_limit: *float*
+            Seconds the search may run before it stops with its best partial placement
+
+    **Returns**
+
+        record: *dict*
+            id, ok, seconds, and result (see SolveResult.to_dict)
+    """
+    start = time.perf_counter()
+    solver = LazorSolver(method=task['method'], solution_cache=_worker_cache, **task['options'])
+    solver.load_puzzle(*task['puzzle'])
+    solver.precompute()
+    result = solver.solve(SolveBudget(time_limit=time_limit))
+    return {'id': task['id'], 'ok': True, 'seconds': round(time.perf_counter() - start, 6),
+            'result': result.to_dict()}
+
+
+def main(argv=None):
+    """
+    Parse the command line and serve solve requests until interrupted.
+
+    **Parameters**
+
+        argv: *list, str*
+            Command-line arguments (defaults to sys.argv[1:])
+
+    **Returns**
+
+        exit_code: *int*
+            0 once the server has shut down
+    """
+    parser = argparse.ArgumentParser(description='Serve Lazors solve requests from pre-warmed worker processes.')
+    listen = parser.add_mutually_exclusive_group(required=True)
+    listen.add_argument('--socket', metavar='PATH', help='Unix socket to listen on')
+    listen.add_argument('--port', type=int, help='localhost TCP port to listen on')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on with --port (default: 127.0.0.1)')
+    parser.add_argument('-p', '--processes', type=int, default=os.cpu_count(),
+                        help='number of worker processes (default: every core)')
+    parser.add_argument('--queue-size', type=int, default=64,
+                        help='requests that may wait for a worker before the server stops reading (default: 64)')
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help='seconds a request may take when it sets no timeout (default: 30)')
+    parser.add_argument('--cache', metavar='PATH', help='SQLite solution cache shared by the workers')
+    args = parser.parse_args(argv)
+
+    server = SolveServer(args.processes, args.queue_size, args.timeout, args.cache)
+    try:
+        asyncio.run(server.serve(path=args.socket, host=args.host, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+# counters collected by the solver, in report order
+STAT_COUNTERS = ('configs_generated', 'duplicates_dropped', 'boards_traced', 'trace_steps', 'refractive_splits',
+                 'branches_pruned')
+# layout of the counters array filled by the compiled tracing kernels (see laser_kernels.trace_laser_paths)
+TRACE_STEPS = 0
+REFRACTIVE_SPLITS = 1
+N_TRACE_COUNTERS = 2
+
+
+class SolverStats:
+    """
+    A class collecting hot-path counters and per-phase timers for LazorSolver, with optional hooks for cProfile and
+    a sampling callback.
+
+    Instrumentation is off unless a SolverStats object is handed to the solver: every call site checks for None once
+    per phase or batch, and the compiled kernels drop their counting code entirely when no counters array is given.
+
+    **Attributes**
+
+        counters: *dict, str, int*
+            The counters of STAT_COUNTERS:
+                configs_generated - candidate boards (or backtracking placements) produced by the search
+                duplicates_dropped - candidates skipped as copies of one already searched (symmetry, transpositions)
+                boards_traced - boards whose laser path was computed
+                trace_steps - beam steps taken by the tracing kernels
+                refractive_splits - beams split in two by refractive blocks
+                branches_pruned - backtracking branches cut without being expanded (duplicates included)
+        phase_seconds: *dict, str, float*
+            Wall-clock seconds spent in each phase, summed over every time the phase ran
+        phase_calls: *dict, str, int*
+            The number of times each phase ran
+        profiler: *cProfile.Profile object*
+            Profiler enabled while a phase runs (None if profiling is off)
+        sample_callback: *callable*
+            Called as sample_callback(phase, frame) from a background thread every sample_interval seconds while a
+            phase runs, with the name of the innermost phase and the current frame of the solving thread
+        sample_interval: *float*
+            Seconds between two calls of sample_callback
+
+    **Methods**
+
+        add: adds to a counter
+            args - name (str), n (int)
+            returns - None
+        phase: context manager timing a phase (and profiling or sampling it)
+            args - name (str)
+            returns - context manager
+        trace_counters: a fresh counters array for the compiled tracing kernels
+            args - None
+            returns - numpy.array<int64, 1D>
+        add_trace_counters: adds a counters array filled by the kernels
+            args - trace_counters (numpy.array<int64, 1D>)
+            returns - None
+        merge: adds counters collected elsewhere (e.g. by a worker process)
+            args - counters (dict, str, int)
+            returns - None
+        to_dict: JSON-serializable snapshot
+            args - None
+            returns - dict
+        report: human-readable summary (with the top profiled functions if profiling)
+            args - n_functions (int)
+            returns - str
+    """
+
+    def __init__(self, profile=False, sample_callback=None, sample_interval=0.01):
+        """
+        SolverStats class constructor
+
+        **Parameters**
+
+            profile: *bool or cProfile.Profile object*
+                Profile every phase with cProfile (True creates a profiler, or pass one to share it)
+            sample_callback: *callable*
+                Optional sampling hook, called as sample_callback(phase, frame) while a phase runs
+            sample_interval: *float*
+                Seconds between two calls of sample_callback
+
+        **Returns**
+
+            None
+        """
+        self.counters = {name: 0 for name in STAT_COUNTERS}
+        self.phase_seconds = {}
+        self.phase_calls = {}
+        if profile is True:
+            self.profiler = cProfile.Profile()
+        else:
+            self.profiler = profile or None
+        self.sample_callback = sample_callback
+        self.sample_interval = sample_interval
+        self._phase_stack = []
+
+    def __repr__(self):
+        counters = ', '.join(f'{name}={value}' for name, value in self.counters.items())
+        return f'SolverStats({counters})'
+
+    def add(self, name, n=1):
+        """
+        Add to a counter.
+
+        **Parameters**
+
+            name: *str*
+                One of STAT_COUNTERS
+            n: *int*
+                The amount to add
+
+        **Returns**
+
+            None
+        """
+        self.counters[name] += int(n)
+
+    def trace_counters(self):
+        """
+        A fresh counters array for the compiled tracing kernels (indexed by TRACE_STEPS and REFRACTIVE_SPLITS).
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            trace_counters: *numpy.array<int64, 1D>*
+                Zeroed counters
+        """
+        return np.zeros(N_TRACE_COUNTERS, dtype=np.int64)
+
+    def add_trace_counters(self, trace_counters):
+        """
+        Add a counters array filled by the compiled tracing kernels.
+
+        **Parameters**
+
+            trace_counters: *numpy.array<int64, 1D>*
+                Counters indexed by TRACE_STEPS and REFRACTIVE_SPLITS
+
+        **Returns**
+
+            None
+        """
+        self.counters['trace_steps'] += int(trace_counters[TRACE_STEPS])
+        self.counters['refractive_splits'] += int(trace_counters[REFRACTIVE_SPLITS])
+
+    def merge(self, counters):
+        """
+        Add counters collected elsewhere, e.g. by a worker process.
+
+        **Parameters**
+
+            counters: *dict, str, int*
+                Counters keyed like self.counters
+
+        **Returns**
+
+            None
+        """
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase. The profiler and the sampling thread only run while the outermost phase is open.
+
+        **Parameters**
+
+            name: *str*
+                Name of the phase ('parse', 'precompute', 'solve', 'render', ...)
+
+        **Returns**
+
+            *context manager*
+        """
+        outermost = len(self._phase_stack) == 0
+        self._phase_stack.append(name)
+        sampler = None
+        if outermost:
+            if self.profiler is not None:
+                self.profiler.enable()
+            if self.sample_callback is not None:
+                sampler = self._start_sampler(threading.get_ident())
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            if outermost:
+                if sampler is not None:
+                    sampler[0].set()
+                    sampler[1].join()
+                if self.profiler is not None:
+                    self.profiler.disable()
+            self._phase_stack.pop()
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + elapsed
+            self.phase_calls[name] = self.phase_calls.get(name, 0) + 1
+
+    def to_dict(self):
+        """
+        JSON-serializable snapshot of the counters and timers.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            *dict*
+                counters, phase_seconds, and phase_calls
+        """
+        return {'counters': dict(self.counters), 'phase_seconds': dict(self.phase_seconds),
+                'phase_calls': dict(self.phase_calls)}
+
+    def report(self, n_functions=15):
+        """
+        Human-readable summary of the counters and timers, followed by the functions with the most cumulative time
+        if profiling.
+
+        **Parameters**
+
+            n_functions: *int*
+                The number of profiled functions listed
+
+        **Returns**
+
+            *str*
+                The report
+        """
+        lines = ['counters:']
+        lines += [f'  {name:<20} {value:>14,}' for name, value in self.counters.items()]
+        lines.append('phases:')
+        lines += [f'  {name:<20} {seconds:>12.4f} s  ({self.phase_calls[name]} call(s))'
+                  for name, seconds in self.phase_seconds.items()]
+        if self.profiler is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(n_functions)
+            lines.append(stream.getvalue())
+        return '\n'.join(lines)
+
+    def _start_sampler(self, thread_id):
+        """
+        Start the background thread calling sample_callback; returns its (stop event, thread).
+        """
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.sample_interval):
+                frame = sys._current_frames().get(thread_id)
+                if frame is not None and len(self._phase_stack) > 0:
+                    self.sample_callback(self._phase_stack[-1], frame)
+
+        thread = threading.Thread(target=sample, name='SolverStats sampler', daemon=True)
+        thread.start()
+        return stop, thread
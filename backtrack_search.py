@@ -0,0 +1,267 @@
+"""
+Backtracking search for Lazors solutions: instead of generating every complete configuration and tracing it,
+blocks are placed one at a time on cells the current beam actually touches, re-tracing after each placement.
+
+A block on a cell the beam never reads cannot change the beam, so any solution can be reduced to the blocks the
+final beam touches, and those can always be placed in an order where each one touches the beam of the board built
+so far. Searching only those placements is therefore complete, and prunes every subtree whose next block would sit
+somewhere the laser never reaches.
+"""
+import numpy as np
+from beam_rules import edge_cells, cell_edge_points
+from Board import Board, points_to_mask
+
+# cells a beam can travel through the interior of: free (left empty), hole, refractive (placed or fixed)
+TRAVERSABLE_BLOCK_TYPES = (0, 2, 4, 6)
+
+
+def backtrack_search(empty_board, block_list, laser_pos_list, laser_dir_list, point_goal_list, segment_cache=None,
+                     symmetry=None, stats=None, budget=None):
+    """
+    Search for a solution by placing blocks one at a time along the current beam paths.
+
+    **Parameters**
+
+        empty_board: *list, list, int*
+            A double-nested list representing the empty board to solve (no free blocks placed)
+        block_list: *list, int*
+            A list of all blocks to place following the integer mapping in the LazorSolver class
+        laser_pos_list: *list, list, int*
+            A double-nested list holding [x, y] coords of the laser sources
+        laser_dir_list: *list, list, int*
+            A double-nested list holding [vx, vy] directions of the laser sources
+        point_goal_list: *list, list, int*
+            A double-nested list holding [x, y] positions of the points that the laser must pass through
+        segment_cache: *SegmentCache object*
+            Optional cache of beam segments. Consecutive partial boards differ in a single cell, so most of each
+            re-trace is served from the cache. Without it every partial board is traced by the compiled kernel.
+        symmetry: *PuzzleSymmetry object*
+            Optional symmetry group of the puzzle. Partial boards are recorded in the transposition table by their
+            orbit, so a board is not expanded once a mirrored or rotated copy of it has been.
+        stats: *SolverStats object*
+            Optional instrumentation, credited with the placements tried, boards traced, trace steps, refractive
+            splits, duplicates, and pruned branches
+        budget: *SolveBudget object*
+            Optional limits, charged one evaluation per partial board traced. Every partial board whose leftover
+            blocks fit on cells its beam does not touch is offered as a candidate, scored by the goals it covers.
+
+    **Returns**
+
+        filled_board: *list, list, int*
+            The solved board configuration (None if no solution exists)
+        n_traced: *int*
+            The number of partial boards whose laser path was computed
+        n_pruned: *int*
+            The number of branches cut without being expanded because no solution can follow them (boards already
+            expanded are not counted)
+    """
+    search = BacktrackSearch(empty_board, block_list, laser_pos_list, laser_dir_list, point_goal_list,
+                             segment_cache, symmetry, stats, budget)
+    filled_board = search.run()
+    return filled_board, search.n_traced, search.n_pruned
+
+
+class BacktrackSearch:
+    """
+    A class holding the state of one backtracking search over block placements.
+
+    **Attributes**
+
+        grid: *numpy.array<int8, 2D>*
+            The board being built, indexed [row, col]
+        block_masks: *tuple, int*
+            Occupancy bitmask of each block type for the board being built (kept in sync with grid)
+        remaining: *dict, int, int*
+            How many blocks of each type are still left to place
+        n_traced: *int*
+            The number of partial boards whose laser path was computed
+        n_pruned: *int*
+            The number of branches cut without being expanded because no solution can follow them
+        n_duplicates: *int*
+            The number of branches cut because the board (or a symmetric copy) was already expanded
+
+    **Methods**
+
+        run: runs the search
+            args - None
+            returns - filled_board (list, list, int)
+    """
+
+    def __init__(self, empty_board, block_list, laser_pos_list, laser_dir_list, point_goal_list,
+                 segment_cache=None, symmetry=None, stats=None, budget=None):
+        """
+        BacktrackSearch class constructor
+
+        **Parameters**
+
+            See backtrack_search.
+
+        **Returns**
+
+            None
+        """
+        self.grid = np.array(empty_board, dtype=np.int8)
+        self.free_mask = self.grid == 0
+        self.remaining = {}
+        for block in block_list:
+            self.remaining[block] = self.remaining.get(block, 0) + 1
+        self.laser_pos_list = laser_pos_list
+        self.laser_dir_list = laser_dir_list
+        self.laser_pos = np.array(laser_pos_list, dtype=np.int64).reshape(-1, 2)
+        self.laser_dir = np.array(laser_dir_list, dtype=np.int64).reshape(-1, 2)
+        self.goals = [tuple(pt) for pt in point_goal_list]
+        self.goal_mask = points_to_mask(point_goal_list, self.grid.shape[1])
+        self.laser_starts = set(tuple(pos) for pos in laser_pos_list)
+        self.segment_cache = segment_cache
+        self.symmetry = symmetry
+        self.stats = stats
+        self.budget = budget
+        self.block_masks = Board(empty_board, laser_pos_list, laser_dir_list, None).block_masks
+        self.n_traced = 0
+        self.n_pruned = 0
+        self.n_duplicates = 0
+        self._seen = set()  # transposition table: boards already expanded (reached through a different order)
+
+    def run(self):
+        """
+        Run the search.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            filled_board: *list, list, int*
+                The solved board configuration (None if no solution exists)
+        """
+        if any(self._goal_blocked(goal) for goal in self.goals):
+            return None
+        solved = self._expand()
+        if self.stats is not None:
+            self.stats.add('boards_traced', self.n_traced)
+            self.stats.add('duplicates_dropped', self.n_duplicates)
+            self.stats.add('branches_pruned', self.n_pruned)
+        if solved:
+            return self.grid.tolist()
+        return None
+
+    def _expand(self):
+        """
+        Trace the current board, then try every remaining block on every free cell the beam touches.
+        Returns True (leaving the solution in self.grid) once a solution is found.
+        """
+        n_rows, n_cols = self.grid.shape
+        counters = None if self.stats is None else self.stats.trace_counters()
+        if self.segment_cache is not None:
+            visited_pts, _, touched_mask, _ = self.segment_cache.trace(self.block_masks, self.laser_pos_list,
+                                                                       self.laser_dir_list, counters)
+            touched_cells = np.array([(touched_mask >> k) & 1 for k in range(n_rows * n_cols)], dtype=np.bool_)
+            touched_cells = touched_cells.reshape(n_rows, n_cols)
+        else:
+            from laser_kernels import trace_laser_paths
+            visited_pts, _, touched_cells, _ = trace_laser_paths(self.grid, self.laser_pos, self.laser_dir,
+                                                                 counters, False)
+            visited_pts = visited_pts.tolist()
+        self.n_traced += 1
+        if self.budget is not None:
+            self.budget.charge(1)
+        if counters is not None:
+            self.stats.add_trace_counters(counters)
+        visited_mask = points_to_mask(visited_pts, n_cols)
+        n_remaining = sum(self.remaining.values())
+
+        # every goal is hit: blocks left over can go on any free cell the beam doesn't touch
+        if visited_mask & self.goal_mask == self.goal_mask:
+            spare_sites = np.argwhere(self.free_mask & (self.grid == 0) & ~touched_cells)
+            if len(spare_sites) >= n_remaining:
+                self._place_leftovers(self.grid, spare_sites)
+                return True
+
+        if self.budget is not None:
+            score = bin(visited_mask & self.goal_mask).count('1')
+            if score > self.budget.best_score:
+                spare_sites = np.argwhere(self.free_mask & (self.grid == 0) & ~touched_cells)
+                if len(spare_sites) >= n_remaining:
+                    candidate = self.grid.copy()
+                    self._place_leftovers(candidate, spare_sites)
+                    self.budget.offer(score, candidate)
+            if self.budget.stopped:
+                return False
+
+        if n_remaining == 0:
+            return False
+
+        candidate_sites = np.argwhere(self.free_mask & (self.grid == 0) & touched_cells)
+        if len(candidate_sites) == 0:
+            self.n_pruned += 1
+            return False
+
+        for row, col in candidate_sites.tolist():
+            for block in sorted(self.remaining):
+                if self.remaining[block] == 0:
+                    continue
+                self.grid[row, col] = block
+                if self.stats is not None:
+                    self.stats.add('configs_generated')
+                key = self.grid.tobytes() if self.symmetry is None else self.symmetry.canonical_key(self.grid)
+                if key in self._seen:
+                    self.n_duplicates += 1
+                    self.grid[row, col] = 0
+                    continue
+                if any(self._goal_blocked(goal) for goal in self._adjacent_goals(row, col)):
+                    self.n_pruned += 1
+                    self.grid[row, col] = 0
+                    continue
+                self._seen.add(key)
+
+                self._set_block_mask(row, col, block)
+                self.remaining[block] -= 1
+                if self._expand():
+                    return True
+                self.remaining[block] += 1
+                self.grid[row, col] = 0
+                self._set_block_mask(row, col, block)
+                if self.budget is not None and self.budget.stopped:
+                    return False
+
+        return False
+
+    def _place_leftovers(self, grid, spare_sites):
+        """
+        Put the blocks still left to place on the given spare cells of a grid.
+        """
+        k = 0
+        for block, count in self.remaining.items():
+            for _ in range(count):
+                grid[spare_sites[k][0], spare_sites[k][1]] = block
+                k += 1
+
+    def _set_block_mask(self, row, col, block):
+        """
+        Toggle a cell between free and the given block in the per-type occupancy bitmasks.
+        """
+        cell_bit = 1 << (row * self.grid.shape[1] + col)
+        block_masks = list(self.block_masks)
+        block_masks[0] ^= cell_bit
+        block_masks[block] ^= cell_bit
+        self.block_masks = tuple(block_masks)
+
+    def _adjacent_goals(self, row, col):
+        """
+        Goals lying on an edge of the given cell.
+        """
+        edge_pts = cell_edge_points(row, col)
+        return [goal for goal in self.goals if goal in edge_pts]
+
+    def _goal_blocked(self, goal):
+        """
+        Whether a goal can no longer be reached by any beam. A beam reaches a point on a cell edge by crossing the
+        interior of one of the two cells sharing that edge, so once neither of them can be crossed (and no laser
+        starts there) the goal is lost for good, since placed blocks are never moved within a branch.
+        """
+        if goal in self.laser_starts:
+            return False
+        n_rows, n_cols = self.grid.shape
+        return not any(self.grid[row, col] in TRAVERSABLE_BLOCK_TYPES
+                       for row, col in edge_cells(goal[0], goal[1], n_rows, n_cols))
@@ -0,0 +1,97 @@
+"""
+Geometry of a beam on the half-cell lattice, shared by every interpreted tracer (PuzzleIndex, SegmentCache, and the
+backtracking and constraint searches).
+
+Cells are 2 lattice units wide, so a point with an even x lies on a vertical cell edge and a point with an odd x on a
+horizontal one. A beam moves diagonally from edge point to edge point, and the cell it is about to enter (the next
+relevant cell) decides its next step. laser_kernels compiles the same rules into the tracing kernels; a change here
+must be made there too, and TRACER_VERSION bumped (see Board).
+"""
+
+
+def next_relevant_cell(x, y, dx, dy):
+    """
+    Get the (row, col) index of the next relevant cell (the cell whose contents decide the next step of the laser).
+
+    **Parameters**
+
+        x, y: *int*
+            The latest position of the laser's path, on the grid where each cell is 2 units wide
+        dx, dy: *int*
+            The latest direction of the laser's path
+
+    **Returns**
+
+        row, col: *int*
+            The index of the next relevant cell in the board (may be off the board)
+    """
+    # case 1: latest position is within a vertical slice between cells
+    if x % 2 == 0:
+        return y // 2, (x // 2 if dx > 0 else x // 2 - 1)
+    # case 2: latest position is within a horizontal slice between cells
+    return (y // 2 if dy > 0 else y // 2 - 1), x // 2
+
+
+def reflected_state(x, y, dx, dy):
+    """
+    The beam state after reflecting off the next relevant cell: the position is unchanged, dx flips on a vertical
+    cell edge and dy on a horizontal one.
+
+    **Parameters**
+
+        x, y: *int*
+            The position of the beam
+        dx, dy: *int*
+            The direction of the beam
+
+    **Returns**
+
+        *tuple, int*
+            (x, y, dx, dy) of the reflected beam
+    """
+    if x % 2 == 0:
+        return x, y, -dx, dy
+    return x, y, dx, -dy
+
+
+def edge_cells(x, y, n_rows, n_cols):
+    """
+    The (up to two) cells sharing the edge a point lies on. A beam reaches the point only by crossing the interior of
+    one of them (or by starting there).
+
+    **Parameters**
+
+        x, y: *int*
+            The point, on the grid where each cell is 2 units wide
+        n_rows: *int*
+            The number of rows of cells on the board
+        n_cols: *int*
+            The number of columns of cells on the board
+
+    **Returns**
+
+        cells: *list, tuple, int*
+            (row, col) of each neighboring cell on the board
+    """
+    if x % 2 == 0:
+        cells = [(y // 2, x // 2 - 1), (y // 2, x // 2)]
+    else:
+        cells = [(y // 2 - 1, x // 2), (y // 2, x // 2)]
+    return [(row, col) for row, col in cells if 0 <= row < n_rows and 0 <= col < n_cols]
+
+
+def cell_edge_points(row, col):
+    """
+    The midpoints of the four edges of a cell, where a beam enters or leaves it.
+
+    **Parameters**
+
+        row, col: *int*
+            The index of the cell
+
+    **Returns**
+
+        *tuple, tuple, int*
+            (x, y) of the left, right, top, and bottom edge midpoints
+    """
+    return (2 * col, 2 * row + 1), (2 * col + 2, 2 * row + 1), (2 * col + 1, 2 * row), (2 * col + 1, 2 * row + 2)
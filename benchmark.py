@@ -0,0 +1,363 @@
+"""
+Benchmark harness: time each phase of the solver over the bundled puzzles and synthetic larger boards, and compare
+the results against a stored baseline to catch regressions.
+
+Every puzzle is run once untimed first, so numba compile time is excluded, then timed over several repeats. The
+phases are measured separately:
+    parse       - bffParser.openBFF
+    precompute  - PuzzleIndex and PuzzleSymmetry
+    enumerate   - building candidate boards in batches (no tracing), up to --max-boards boards
+    trace       - evaluate_boards over those same batches
+    solve       - LazorSolver.solve end to end with the chosen method
+    render      - drawing the solved board in memory (no file written)
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json      # exits 1 if boards evaluated per second dropped
+    python benchmark.py --compare-orderings        # boards evaluated before the solution, per search ordering
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from laser_kernels import trace_laser_paths, evaluate_boards
+from bffParser import openBFF
+from LazorSolver import LazorSolver, SEARCH_METHODS, generate_config_batches
+from PlacementEnumerator import ENUMERATION_ORDERS
+from render_board import draw_board
+from run import find_puzzles
+from SiteOrdering import SITE_HEURISTICS
+
+# (n_rows, n_cols, n_blocks) of the synthetic boards added to the bundled corpus
+SYNTHETIC_SIZES = ((5, 5, 4), (6, 6, 4), (7, 7, 4))
+# percentiles reported for every phase
+PERCENTILES = (10, 50, 90)
+# search ordering (site heuristic, enumeration order) used before heuristic ordering, the reference of the comparison
+BASELINE_ORDERING = ('static', 'lexicographic')
+
+
+def write_synthetic_bff(path, n_rows, n_cols, n_blocks, seed=0):
+    """
+    Write a random solvable puzzle: a few holes and fixed blocks, one laser entering from the top edge, and goals
+    picked from the beam of a random placement of reflective blocks (so that placement solves it).
+
+    **Parameters**
+
+        path: *str*
+            Where to write the .bff file
+        n_rows: *int*
+            The number of rows of cells on the board
+        n_cols: *int*
+            The number of columns of cells on the board
+        n_blocks: *int*
+            The number of reflective blocks to place
+        seed: *int*
+            Seed of the random generator
+
+    **Returns**
+
+        None
+    """
+    rng = np.random.default_rng(seed)
+    while True:
+        grid = rng.choice([0, 4, 5, 7], size=(n_rows, n_cols), p=[0.85, 0.07, 0.04, 0.04]).astype(np.int8)
+        laser = [2 * int(rng.integers(n_cols)) + 1, 0, int(rng.choice([-1, 1])), 1]
+        free_sites = np.flatnonzero(grid.ravel() == 0)
+        solution = grid.copy().ravel()
+        solution[rng.choice(free_sites, n_blocks, replace=False)] = 1
+        visited_pts, _, _, _ = trace_laser_paths(solution.reshape(n_rows, n_cols), np.array([laser[:2]]),
+                                                 np.array([laser[2:]]))
+        candidates = [tuple(pt) for pt in visited_pts.tolist()[1:]]
+        candidates = list(dict.fromkeys(candidates))
+        if len(candidates) >= 3:
+            break
+    goals = [candidates[k] for k in sorted(rng.choice(len(candidates), 3, replace=False))]
+
+    symbols = {0: 'o', 4: 'x', 5: 'A', 7: 'B'}
+    lines = ['GRID START']
+    lines += [' '.join(symbols[int(cell)] for cell in row) for row in grid]
+    lines += ['GRID STOP', '', f'A {n_blocks}', '', 'L ' + ' '.join(map(str, laser)), '']
+    lines += [f'P {x} {y}' for x, y in goals]
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def summarize(samples):
+    """
+    Summarize repeated timings.
+
+    **Parameters**
+
+        samples: *list, float*
+            Wall-clock seconds of each repeat
+
+    **Returns**
+
+        summary: *dict, str, float*
+            p10, p50 (median), and p90 in milliseconds
+    """
+    values = np.percentile(samples, PERCENTILES)
+    return {f'p{p}_ms': round(1000 * float(v), 4) for p, v in zip(PERCENTILES, values)}
+
+
+def time_phases(file_ptr, method='enumerate', max_boards=50000, batch_size=1024):
+    """
+    Run every phase once on a puzzle and time each of them.
+
+    **Parameters**
+
+        file_ptr: *str*
+            A string pointing to the .bff file to benchmark
+        method: *str*
+            The search method timed in the solve phase
+        max_boards: *int*
+            The number of candidate boards built and traced by the enumerate and trace phases
+        batch_size: *int*
+            The number of boards per batch in the enumerate and trace phases
+
+    **Returns**
+
+        seconds: *dict, str, float*
+            Wall-clock seconds spent in each phase
+        counts: *dict, str, int*
+            boards_traced (enumerate and trace phases), boards_evaluated (solve phase), and solved
+    """
+    seconds = {}
+    start = time.perf_counter()
+    grid, laser_list, point_goal_list, block_list = openBFF(file_ptr)
+    seconds['parse'] = time.perf_counter() - start
+
+    solver = LazorSolver(method=method, batch_size=batch_size)
+    solver.load_puzzle(grid, laser_list, point_goal_list, block_list)
+    start = time.perf_counter()
+    solver.precompute()
+    seconds['precompute'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batches = list(generate_config_batches(solver.empty_board, solver.block_list, batch_size, 0, max_boards,
+                                           solver.search_sites, solver.enumeration_order))
+    seconds['enumerate'] = time.perf_counter() - start
+
+    laser_pos = np.array(solver.laser_pos_list, dtype=np.int64).reshape(-1, 2)
+    laser_dir = np.array(solver.laser_dir_list, dtype=np.int64).reshape(-1, 2)
+    goals = np.array(solver.pointGoalList, dtype=np.int64).reshape(-1, 2)
+    start = time.perf_counter()
+    for grids in batches:
+        evaluate_boards(grids, laser_pos, laser_dir, goals)
+    seconds['trace'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = solver.solve()
+    seconds['solve'] = time.perf_counter() - start
+
+    seconds['render'] = 0.0
+    if result.solved:
+        board = result.board
+        laser_list = [pos + board.laser_dir[i] for i, pos in enumerate(board.laser_pos)]
+        start = time.perf_counter()
+        draw_board(board.board, laser_list, 100, point_goal_list, board.laser_branches)
+        seconds['render'] = time.perf_counter() - start
+
+    counts = {'boards_traced': sum(len(grids) for grids in batches), 'boards_evaluated': result.boards_evaluated,
+              'solved': result.solved}
+    return seconds, counts
+
+
+def benchmark_puzzle(file_ptr, repeats=5, warmup=1, **phase_kwargs):
+    """
+    Benchmark one puzzle: warm up (JIT compilation), then time every phase over several repeats.
+
+    **Parameters**
+
+        file_ptr: *str*
+            A string pointing to the .bff file to benchmark
+        repeats: *int*
+            The number of timed runs
+        warmup: *int*
+            The number of untimed runs before them
+        phase_kwargs:
+            Passed on to time_phases (method, max_boards, batch_size)
+
+    **Returns**
+
+        record: *dict*
+            puzzle, solved, boards_traced, boards_evaluated, per-phase percentiles, trace_boards_per_second, and
+            solve_boards_per_second (both from the median times)
+    """
+    for _ in range(warmup):
+        time_phases(file_ptr, **phase_kwargs)
+    samples = {}
+    for _ in range(repeats):
+        seconds, counts = time_phases(file_ptr, **phase_kwargs)
+        for phase, value in seconds.items():
+            samples.setdefault(phase, []).append(value)
+
+    phases = {phase: summarize(values) for phase, values in samples.items()}
+    trace_median = float(np.median(samples['trace']))
+    solve_median = float(np.median(samples['solve']))
+    return {
+        'puzzle': os.path.basename(file_ptr),
+        'solved': counts['solved'],
+        'boards_traced': counts['boards_traced'],
+        'boards_evaluated': counts['boards_evaluated'],
+        'phases': phases,
+        'trace_boards_per_second': round(counts['boards_traced'] / trace_median, 1) if trace_median > 0 else None,
+        'solve_boards_per_second': round(counts['boards_evaluated'] / solve_median, 1) if solve_median > 0 else None,
+    }
+
+
+def compare_orderings(puzzle_files, batch_size=1):
+    """
+    Count the boards the enumerator evaluates before finding the solution under every search ordering.
+
+    **Parameters**
+
+        puzzle_files: *list, str*
+            The .bff files to solve
+        batch_size: *int*
+            The number of boards traced per batch (1 counts exactly the boards up to and including the solution)
+
+    **Returns**
+
+        report: *dict*
+            baseline (the ordering used before heuristic ordering), boards_evaluated (per puzzle, per ordering),
+            mean_boards_evaluated (per ordering), and relative_to_baseline (mean per ordering over the baseline mean)
+    """
+    orderings = [(heuristic, order) for order in ENUMERATION_ORDERS for heuristic in SITE_HEURISTICS]
+    boards_evaluated = {}
+    for file_ptr in puzzle_files:
+        counts = {}
+        for heuristic, order in orderings:
+            solver = LazorSolver(file_ptr, batch_size=batch_size, ordering=heuristic, enumeration_order=order)
+            counts[f'{heuristic}/{order}'] = solver.solve().boards_evaluated
+        boards_evaluated[os.path.basename(file_ptr)] = counts
+        print(f'compared orderings on {os.path.basename(file_ptr)}', file=sys.stderr)
+
+    means = {f'{heuristic}/{order}': float(np.mean([counts[f'{heuristic}/{order}']
+                                                    for counts in boards_evaluated.values()]))
+             for heuristic, order in orderings}
+    baseline = '/'.join(BASELINE_ORDERING)
+    return {
+        'baseline': baseline,
+        'boards_evaluated': boards_evaluated,
+        'mean_boards_evaluated': means,
+        'relative_to_baseline': {name: round(mean / means[baseline], 4) if means[baseline] > 0 else None
+                                 for name, mean in means.items()},
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Flag puzzles whose boards evaluated per second dropped by more than the tolerance relative to a baseline run.
+
+    **Parameters**
+
+        results: *dict*
+            The output of this benchmark (see main)
+        baseline: *dict*
+            A stored output of an earlier run
+        tolerance: *float*
+            Allowed relative slowdown before a puzzle is flagged
+
+    **Returns**
+
+        regressions: *list, str*
+            One human-readable line per regression (empty if there is none)
+    """
+    previous = {record['puzzle']: record for record in baseline['results']}
+    regressions = []
+    for record in results['results']:
+        old = previous.get(record['puzzle'])
+        if old is None:
+            continue
+        for metric in ('trace_boards_per_second', 'solve_boards_per_second'):
+            if old.get(metric) and record.get(metric) and record[metric] < (1 - tolerance) * old[metric]:
+                regressions.append(f'{record["puzzle"]}: {metric} {old[metric]:.0f} -> {record[metric]:.0f} '
+                                   f'({record[metric] / old[metric] - 1:+.0%})')
+    return regressions
+
+
+def main(argv=None):
+    """
+    Benchmark the bundled puzzles plus synthetic boards, print (or save) the JSON results, and optionally compare
+    them against a baseline.
+
+    **Parameters**
+
+        argv: *list, str*
+            Command-line arguments (defaults to sys.argv[1:])
+
+    **Returns**
+
+        exit_code: *int*
+            1 if a regression against the baseline was found, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the Lazors solver phase by phase.')
+    parser.add_argument('paths', nargs='*', default=['bff'],
+                        help='.bff files, glob patterns, or directories to benchmark (default: bff)')
+    parser.add_argument('-r', '--repeats', type=int, default=5, help='timed runs per puzzle (default: 5)')
+    parser.add_argument('-w', '--warmup', type=int, default=1, help='untimed runs per puzzle first (default: 1)')
+    parser.add_argument('-m', '--method', choices=SEARCH_METHODS, default='enumerate',
+                        help='search method timed in the solve phase (default: enumerate)')
+    parser.add_argument('--max-boards', type=int, default=50000,
+                        help='boards built and traced by the enumerate and trace phases (default: 50000)')
+    parser.add_argument('--no-synthetic', action='store_true', help='skip the synthetic boards')
+    parser.add_argument('-o', '--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative drop in boards per second flagged as a regression (default: 0.2)')
+    parser.add_argument('--compare-orderings', action='store_true',
+                        help='instead of timing, report the boards evaluated before the solution per search ordering')
+    args = parser.parse_args(argv)
+
+    phase_kwargs = {'method': args.method, 'max_boards': args.max_boards}
+    records = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        puzzle_files = find_puzzles(args.paths)
+        if not args.no_synthetic:
+            for n_rows, n_cols, n_blocks in SYNTHETIC_SIZES:
+                path = os.path.join(tmp_dir, f'synthetic_{n_rows}x{n_cols}_{n_blocks}.bff')
+                write_synthetic_bff(path, n_rows, n_cols, n_blocks)
+                puzzle_files.append(path)
+        if args.compare_orderings:
+            report = compare_orderings(puzzle_files)
+            print(json.dumps(report, indent=2))
+            return 0
+        for file_ptr in puzzle_files:
+            records.append(benchmark_puzzle(file_ptr, args.repeats, args.warmup, **phase_kwargs))
+            print(f'benchmarked {os.path.basename(file_ptr)}', file=sys.stderr)
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'method': args.method,
+            'repeats': args.repeats,
+            'warmup': args.warmup,
+            'max_boards': args.max_boards,
+        },
+        'results': records,
+    }
+    if args.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'regression: {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -75,10 +75,26 @@ def openBFF(filePointer: str):
     """
 
     # open the file
-    file = open(filePointer, 'r').read()
+    with open(filePointer, 'r') as f:
+        return parseBFF(f.read())
 
+
+def parseBFF(fileText: str):
+    """
+    This method parses the text of a .BFF file (e.g. one received over a socket instead of read from disk).
+
+    **Parameters**
+
+        fileText: *str*
+            String holding the whole contents of a bff file
+
+    **Returns**
+
+        grid, laserList, pointGoalList, blockList:
+            The parsed puzzle (see openBFF)
+    """
     # strip leading spaces and newlines, then split on new lines and assign each line as an element of a string list
-    lineSplitFile = file.strip().splitlines()
+    lineSplitFile = fileText.strip().splitlines()
 
     # the line preceding the one where grid start was identified
     startGridLine = 1+lineSplitFile.index("GRID START")
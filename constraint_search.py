@@ -0,0 +1,304 @@
+"""
+Constraint-propagation search for Lazors solutions.
+
+Every free cell is a variable whose domain is {empty} plus the block types still available, and every goal is a
+requirement that some beam crosses it. Cells are decided lazily, in the order the beam reaches them: the beam is
+traced under the current partial assignment with the exact rules of the compiled kernel until it reads an undecided
+cell, and the search branches on that cell only. Cells the beam never reads are never decided, and any blocks left
+over at the end go on them (their contents cannot change the beam).
+
+After each decision, constraints are propagated before going deeper:
+    - block counts: the blocks still to place must fit on the cells left undecided
+    - goal reachability: every goal not yet hit must be reachable by a relaxed beam that both passes through and
+      reflects off every undecided cell (an over-approximation of every completion of the assignment)
+A branch is cut as soon as either fails, so whole families of placements are rejected without being traced.
+"""
+from collections import deque
+from beam_rules import next_relevant_cell, reflected_state
+from bffParser import FREE, REFLECTIVE, REFRACTIVE, OPAQUE, HOLE, FIXED_REFLECTIVE, FIXED_REFRACTIVE, FIXED_OPAQUE
+
+# value of a free cell the search has not decided yet
+UNDECIDED = -1
+
+
+def constraint_search(empty_board, block_list, laser_pos_list, laser_dir_list, point_goal_list, stats=None,
+                      budget=None):
+    """
+    Search for a solution by deciding cells in the order the beam reaches them, propagating the block-count and
+    goal-reachability constraints after each decision.
+
+    **Parameters**
+
+        empty_board: *list, list, int*
+            A double-nested list representing the empty board to solve (no free blocks placed)
+        block_list: *list, int*
+            A list of all blocks to place following the integer mapping in the LazorSolver class
+        laser_pos_list: *list, list, int*
+            A double-nested list holding [x, y] coords of the laser sources
+        laser_dir_list: *list, list, int*
+            A double-nested list holding [vx, vy] directions of the laser sources
+        point_goal_list: *list, list, int*
+            A double-nested list holding [x, y] positions of the points that the laser must pass through
+        stats: *SolverStats object*
+            Optional instrumentation, credited with the decisions tried, partial boards traced, trace steps,
+            refractive splits, and pruned branches
+        budget: *SolveBudget object*
+            Optional limits, charged one evaluation per partial assignment traced. Every fully decided beam whose
+            leftover blocks fit is offered as a candidate, scored by the goals it covers.
+
+    **Returns**
+
+        filled_board: *list, list, int*
+            The solved board configuration (None if no solution exists)
+        n_traced: *int*
+            The number of partial assignments whose beam was traced
+        n_pruned: *int*
+            The number of decisions cut by propagation without being expanded
+    """
+    search = ConstraintSearch(empty_board, block_list, laser_pos_list, laser_dir_list, point_goal_list, stats,
+                              budget)
+    filled_board = search.run()
+    return filled_board, search.n_traced, search.n_pruned
+
+
+class ConstraintSearch:
+    """
+    A class holding the state of one constraint-propagation search.
+
+    **Attributes**
+
+        n_rows: *int*
+            The number of rows of cells on the board
+        n_cols: *int*
+            The number of columns of cells on the board
+        cells: *list, int*
+            Flat (row * n_cols + col) board under the current partial assignment, UNDECIDED for undecided free cells
+        remaining: *dict, int, int*
+            How many blocks of each type are still left to place
+        n_undecided: *int*
+            The number of free cells not decided yet
+        n_traced: *int*
+            The number of partial assignments whose beam was traced
+        n_pruned: *int*
+            The number of decisions cut by propagation without being expanded
+
+    **Methods**
+
+        run: runs the search
+            args - None
+            returns - filled_board (list, list, int)
+    """
+
+    def __init__(self, empty_board, block_list, laser_pos_list, laser_dir_list, point_goal_list, stats=None,
+                 budget=None):
+        """
+        ConstraintSearch class constructor
+
+        **Parameters**
+
+            See constraint_search.
+
+        **Returns**
+
+            None
+        """
+        self.n_rows = len(empty_board)
+        self.n_cols = len(empty_board[0])
+        self.cells = [UNDECIDED if cell == FREE else cell for row in empty_board for cell in row]
+        self.n_undecided = self.cells.count(UNDECIDED)
+        self.remaining = {}
+        for block in block_list:
+            self.remaining[block] = self.remaining.get(block, 0) + 1
+        self.lasers = [(pos[0], pos[1], direction[0], direction[1])
+                       for pos, direction in zip(laser_pos_list, laser_dir_list)]
+        self.goals = set(tuple(pt) for pt in point_goal_list)
+        self.stats = stats
+        self.budget = budget
+        self.n_traced = 0
+        self.n_pruned = 0
+
+    def run(self):
+        """
+        Run the search.
+
+        **Parameters**
+
+            None
+
+        **Returns**
+
+            filled_board: *list, list, int*
+                The solved board configuration (None if no solution exists)
+        """
+        solved = self._goals_reachable(set()) and self._search()
+        if self.stats is not None:
+            self.stats.add('boards_traced', self.n_traced)
+            self.stats.add('branches_pruned', self.n_pruned)
+        if not solved:
+            return None
+        return [self.cells[r * self.n_cols:(r + 1) * self.n_cols] for r in range(self.n_rows)]
+
+    def _search(self):
+        """
+        Trace the beam under the current assignment and branch on the first undecided cell it reads.
+        Returns True (leaving the solution in self.cells) once a solution is found.
+        """
+        visited, site = self._trace()
+        if self.budget is not None:
+            self.budget.charge(1)
+        if site is None:
+            # the beam is fully decided: it must hit every goal, and leftover blocks go on cells it never read
+            if sum(self.remaining.values()) > self.n_undecided:
+                return False
+            if self.goals <= visited:
+                self.cells = self._completed_cells()
+                return True
+            if self.budget is not None:
+                score = len(self.goals & visited)
+                if score > self.budget.best_score:
+                    cells = self._completed_cells()
+                    self.budget.offer(score, [cells[r * self.n_cols:(r + 1) * self.n_cols]
+                                              for r in range(self.n_rows)])
+            return False
+        if self.budget is not None and self.budget.stopped:
+            return False
+
+        options = [block for block in sorted(self.remaining) if self.remaining[block] > 0] + [FREE]
+        self.n_undecided -= 1
+        for value in options:
+            if self.stats is not None:
+                self.stats.add('configs_generated')
+            self.cells[site] = value
+            if value != FREE:
+                self.remaining[value] -= 1
+            # propagate: the blocks still to place must fit, and every goal must stay reachable
+            if sum(self.remaining.values()) <= self.n_undecided and self._goals_reachable(visited):
+                if self._search():
+                    return True
+            else:
+                self.n_pruned += 1
+            if value != FREE:
+                self.remaining[value] += 1
+            if self.budget is not None and self.budget.stopped:
+                break
+        self.cells[site] = UNDECIDED
+        self.n_undecided += 1
+        return False
+
+    def _completed_cells(self):
+        """
+        Copy of the current cells with the undecided ones left empty, except for the blocks still left to place.
+        """
+        cells = [FREE if cell == UNDECIDED else cell for cell in self.cells]
+        undecided_sites = [k for k, cell in enumerate(self.cells) if cell == UNDECIDED]
+        leftover = [block for block, count in sorted(self.remaining.items()) for _ in range(count)]
+        for k, block in zip(undecided_sites, leftover):
+            cells[k] = block
+        return cells
+
+    def _next_site(self, x, y, dx, dy):
+        """
+        Flat index of the next relevant cell for a beam state (None if that cell is off the board).
+        """
+        row, col = next_relevant_cell(x, y, dx, dy)
+        if 0 <= row < self.n_rows and 0 <= col < self.n_cols:
+            return row * self.n_cols + col
+        return None
+
+    def _trace(self):
+        """
+        Trace every laser under the current assignment with the rules of the compiled kernel (branches in the order
+        they split off, each ending when it re-enters a state visited by any laser), stopping at the first
+        undecided cell read. Returns the points visited so far and the flat index of that cell (None if the beam
+        never reads an undecided cell).
+        """
+        self.n_traced += 1
+        visited = set()
+        n_splits = 0
+        n_steps = 0
+        undecided_site = None
+        seen = set()
+        for laser in self.lasers:
+            x, y = laser[0], laser[1]
+            if not (0 <= x <= 2 * self.n_cols and 0 <= y <= 2 * self.n_rows) or laser in seen:
+                continue
+            seen.add(laser)
+            queue = deque([laser])
+            while len(queue) > 0 and undecided_site is None:
+                x, y, dx, dy = queue.popleft()
+                while True:
+                    visited.add((x, y))
+                    site = self._next_site(x, y, dx, dy)
+                    if site is None:
+                        break
+                    cell = self.cells[site]
+                    if cell == UNDECIDED:
+                        undecided_site = site
+                        break
+                    if cell == OPAQUE or cell == FIXED_OPAQUE:
+                        break
+                    elif cell == REFLECTIVE or cell == FIXED_REFLECTIVE:
+                        x, y, dx, dy = reflected_state(x, y, dx, dy)
+                    elif cell == REFRACTIVE or cell == FIXED_REFRACTIVE:
+                        reflected = reflected_state(x, y, dx, dy)
+                        if reflected not in seen:
+                            seen.add(reflected)
+                            queue.append(reflected)
+                            n_splits += 1
+                        x += dx
+                        y += dy
+                    else:
+                        x += dx
+                        y += dy
+                    n_steps += 1
+                    if (x, y, dx, dy) in seen:
+                        visited.add((x, y))
+                        break
+                    seen.add((x, y, dx, dy))
+            if undecided_site is not None:
+                break
+        if self.stats is not None:
+            self.stats.add('trace_steps', n_steps)
+            self.stats.add('refractive_splits', n_splits)
+        return visited, undecided_site
+
+    def _goals_reachable(self, visited):
+        """
+        Whether every goal is either already visited or reachable by the relaxed beam, where each undecided cell
+        both passes and reflects the beam (only passes it once no reflective or refractive block is left).
+        """
+        missing = self.goals - visited
+        if len(missing) == 0:
+            return True
+        can_turn = self.remaining.get(REFLECTIVE, 0) + self.remaining.get(REFRACTIVE, 0) > 0
+        seen = set()
+        queue = deque(self.lasers)
+        while len(queue) > 0:
+            state = queue.popleft()
+            if state in seen:
+                continue
+            seen.add(state)
+            x, y, dx, dy = state
+            if not (0 <= x <= 2 * self.n_cols and 0 <= y <= 2 * self.n_rows):
+                continue
+            missing.discard((x, y))
+            if len(missing) == 0:
+                return True
+            site = self._next_site(x, y, dx, dy)
+            if site is None:
+                continue
+            cell = self.cells[site]
+            passed = (x + dx, y + dy, dx, dy)
+            reflected = reflected_state(x, y, dx, dy)
+            if cell == UNDECIDED:
+                queue.append(passed)
+                if can_turn:
+                    queue.append(reflected)
+            elif cell == FREE or cell == HOLE:
+                queue.append(passed)
+            elif cell == REFLECTIVE or cell == FIXED_REFLECTIVE:
+                queue.append(reflected)
+            elif cell == REFRACTIVE or cell == FIXED_REFRACTIVE:
+                queue.append(passed)
+                queue.append(reflected)
+        return False
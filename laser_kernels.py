@@ -0,0 +1,404 @@
+"""
+Compiled tracing kernels, kept apart from Board so that importing the solver does not import numba. Nothing here is
+loaded until a board is first traced.
+
+The kernels are compiled with cache=True: the machine code is written next to this file (or to NUMBA_CACHE_DIR when
+that is not writable) the first time each specialization is compiled, and later processes load it from disk instead
+of compiling again. warm_up compiles (or loads) every specialization the solver uses up front, e.g. before forking
+batch workers.
+
+Beams are traced with exact cycle detection rather than a step cap: every beam state (lattice point and one of the
+four diagonal directions) is recorded in a visited table, and a beam stops the moment it re-enters a known state.
+The cost of a trace is therefore bounded by the number of distinct beam states, 4 * (2 * n_cols + 1) * (2 * n_rows + 1),
+and the traced path is complete on boards of any size.
+"""
+import numpy as np
+import time
+from numba import jit
+from numba.core.errors import NumbaPendingDeprecationWarning
+from SolverStats import TRACE_STEPS, REFRACTIVE_SPLITS, N_TRACE_COUNTERS
+import warnings
+
+warnings.simplefilter('ignore', category=NumbaPendingDeprecationWarning)
+
+
+@jit(nopython=True, cache=True)
+def get_next_relevant_cell(x, y, dx, dy):
+    """
+    Get the (row, col) index of the next relevant cell (the cell whose contents decide the next step of the laser).
+    Compiled twin of beam_rules.next_relevant_cell: the kernels keep their own copy so numba's on-disk cache, which
+    only tracks this file, never serves machine code built from an older version of the rules.
+
+    **Parameters**
+
+        x, y: *int*
+            The latest position of the laser's path, on the grid where each cell is 2 units wide
+        dx, dy: *int*
+            The latest direction of the laser's path
+
+    **Returns**
+
+        row, col: *int*
+            The index of the next relevant cell in the board (may be off the board)
+    """
+    # case 1: latest position is within a vertical slice between cells
+    if x % 2 == 0:
+        if dx > 0:
+            return y // 2, x // 2
+        return y // 2, x // 2 - 1
+    # case 2: latest position is within a horizontal slice between cells
+    if dy > 0:
+        return y // 2, x // 2
+    return y // 2 - 1, x // 2
+
+
+@jit(nopython=True, cache=True)
+def direction_index(dx, dy):
+    """
+    Index (0 to 3) of a diagonal direction in the visited-state table.
+
+    **Parameters**
+
+        dx, dy: *int*
+            The direction of the beam (each -1 or 1)
+
+    **Returns**
+
+        *int*
+            (dx + 1) + (dy + 1) // 2
+    """
+    return (dx + 1) + (dy + 1) // 2
+
+
+@jit(nopython=True, cache=True)
+def trace_beams(grid, laser_pos, laser_dir, seen, stamp, queue, visited_pts, laser_idxs, touched_cells,
+                attribute_lasers, counters=None, branch_starts=None):
+    """
+    Compiled tracing core shared by every kernel: follow every laser source through a board into caller-provided
+    buffers, so batch kernels can reuse them from one board to the next.
+
+    A state is visited when its entry in the visited-state table equals the current stamp. Stamps only grow, so the
+    table never needs clearing. By default every laser source shares one stamp: a state expanded by one source is
+    never expanded again by another, and a source merging into an earlier beam stops at the merge point. With
+    attribute_lasers each source takes its own stamp and is traced to its end, so the points of every source form its
+    complete path (for rendering, at the cost of walking merged beams once per source).
+
+    **Parameters**
+
+        grid: *numpy.array<int8, 2D>*
+            The board cells indexed [row, col], following the integer mapping in the Board class
+        laser_pos: *numpy.array<int64, 2D>*
+            [x, y] coords of the laser sources, one row per source
+        laser_dir: *numpy.array<int64, 2D>*
+            [vx, vy] directions of the laser sources, one row per source
+        seen: *numpy.array<int64, 3D>*
+            Visited-state table indexed [x, y, direction_index], holding the stamp of the last laser to visit
+        stamp: *int*
+            The first stamp to use (greater than every stamp already in seen)
+        queue: *numpy.array<int64, 2D>*
+            Work queue of branch start states, one row of [x, y, dx, dy] per beam state
+        visited_pts: *numpy.array<int64, 2D>*
+            Receives the [x, y] coords of the visited points (two rows per laser source and beam state)
+        laser_idxs: *numpy.array<int64, 1D>*
+            Receives the index of the laser source that visited each point
+        touched_cells: *numpy.array<bool, 2D>*
+            Set to True for each cell (indexed [row, col]) whose contents the beam depended on
+        attribute_lasers: *bool*
+            Whether every laser source is traced to its end with its own stamp (instead of one shared stamp)
+        counters: *numpy.array<int64, 1D>*
+            Optional instrumentation counters (see SolverStats), incremented by the steps taken and the refractive
+            splits. When omitted the counting code is compiled out.
+        branch_starts: *numpy.array<bool, 1D>*
+            Optional, receives True for each visited point that starts a new run of beam steps (the first point of a
+            laser source or of a branch) and False for the others. When omitted the marking code is compiled out.
+
+    **Returns**
+
+        n_visited: *int*
+            The number of entries written to visited_pts and laser_idxs
+        stamp: *int*
+            The next unused stamp
+    """
+    n_rows, n_cols = grid.shape
+    n_visited = 0
+
+    for i in range(laser_pos.shape[0]):
+        x = laser_pos[i, 0]
+        y = laser_pos[i, 1]
+        d = direction_index(laser_dir[i, 0], laser_dir[i, 1])
+        if not (0 <= x <= 2 * n_cols and 0 <= y <= 2 * n_rows) or seen[x, y, d] == stamp:
+            # off the board, or a source sharing its start state with an earlier one
+            if attribute_lasers:
+                stamp += 1
+            continue
+        seen[x, y, d] = stamp
+        queue[0, 0] = x
+        queue[0, 1] = y
+        queue[0, 2] = laser_dir[i, 0]
+        queue[0, 3] = laser_dir[i, 1]
+        head = 0
+        tail = 1
+        n_steps = 0
+        first_pt = n_visited
+
+        # branches split off by refractive blocks are explored breadth-first, each one followed to its end
+        while head < tail:
+            x = queue[head, 0]
+            y = queue[head, 1]
+            dx = queue[head, 2]
+            dy = queue[head, 3]
+            head += 1
+
+            # the branch start is recorded again so each branch is a contiguous run of points
+            if n_visited == first_pt or visited_pts[n_visited - 1, 0] != x or visited_pts[n_visited - 1, 1] != y:
+                visited_pts[n_visited, 0] = x
+                visited_pts[n_visited, 1] = y
+                laser_idxs[n_visited] = i
+                if branch_starts is not None:
+                    branch_starts[n_visited] = True
+                n_visited += 1
+
+            # follow this branch until it leaves the board, hits an opaque block, or re-enters a visited state
+            while True:
+                row, col = get_next_relevant_cell(x, y, dx, dy)
+                if not (0 <= row < n_rows and 0 <= col < n_cols):
+                    break
+                cell = grid[row, col]
+                touched_cells[row, col] = True
+
+                if cell == 3 or cell == 7:
+                    # opaque: the beam stops here
+                    break
+                elif cell == 1 or cell == 5:
+                    # reflective: position is unchanged, flip dx in a vertical slice and dy in a horizontal one
+                    if x % 2 == 0:
+                        dx = -dx
+                    else:
+                        dy = -dy
+                elif cell == 2 or cell == 6:
+                    # refractive: queue the reflected branch (unless already visited), then pass through
+                    rdx = -dx if x % 2 == 0 else dx
+                    rdy = dy if x % 2 == 0 else -dy
+                    d = direction_index(rdx, rdy)
+                    if seen[x, y, d] != stamp:
+                        seen[x, y, d] = stamp
+                        queue[tail, 0] = x
+                        queue[tail, 1] = y
+                        queue[tail, 2] = rdx
+                        queue[tail, 3] = rdy
+                        tail += 1
+                        if counters is not None:
+                            counters[REFRACTIVE_SPLITS] += 1
+                    x += dx
+                    y += dy
+                else:
+                    # free cell or hole: move normally by one step
+                    x += dx
+                    y += dy
+                n_steps += 1
+
+                # reflections turn the beam without moving it, so only record a point when the beam moved
+                if visited_pts[n_visited - 1, 0] != x or visited_pts[n_visited - 1, 1] != y:
+                    visited_pts[n_visited, 0] = x
+                    visited_pts[n_visited, 1] = y
+                    laser_idxs[n_visited] = i
+                    if branch_starts is not None:
+                        branch_starts[n_visited] = False
+                    n_visited += 1
+
+                # the point is recorded even when the state was visited, so the path drawn reaches it
+                d = direction_index(dx, dy)
+                if seen[x, y, d] == stamp:
+                    # a cycle, or a state another branch already covers
+                    break
+                seen[x, y, d] = stamp
+
+        if counters is not None:
+            counters[TRACE_STEPS] += n_steps
+        if attribute_lasers:
+            stamp += 1
+
+    if not attribute_lasers:
+        stamp += 1
+    return n_visited, stamp
+
+
+@jit(nopython=True, cache=True)
+def trace_laser_paths(grid, laser_pos, laser_dir, counters=None, attribute_lasers=False):
+    """
+    Compiled tracing kernel: compute the points visited by every laser source through a board.
+
+    Refractive blocks split the beam; the reflected branch is queued and explored once the branches queued before it
+    end, so a whole trace runs without returning to the interpreter. Every branch ends when it leaves the board, hits
+    an opaque block, or re-enters a beam state already visited. Laser sources share their visited states unless
+    attribute_lasers is set (see trace_beams).
+
+    **Parameters**
+
+        grid: *numpy.array<int8, 2D>*
+            The board cells indexed [row, col], following the integer mapping in the Board class
+        laser_pos: *numpy.array<int64, 2D>*
+            [x, y] coords of the laser sources, one row per source
+        laser_dir: *numpy.array<int64, 2D>*
+            [vx, vy] directions of the laser sources, one row per source
+        counters: *numpy.array<int64, 1D>*
+            Optional instrumentation counters (see SolverStats), incremented by the steps taken and the refractive
+            splits. When omitted the counting code is compiled out.
+        attribute_lasers: *bool*
+            Trace every laser source to its end, so the points of each source form its complete path (by default a
+            source merging into the beam of an earlier one stops at the merge point)
+
+    **Returns**
+
+        visited_pts: *numpy.array<int64, 2D>*
+            [x, y] coords of the visited points, each branch in the order it was visited
+        laser_idxs: *numpy.array<int64, 1D>*
+            Index of the laser source that visited each point
+        touched_cells: *numpy.array<bool, 2D>*
+            True for each cell (indexed [row, col]) whose contents the beam depended on
+        branch_starts: *numpy.array<bool, 1D>*
+            True for each point that starts a new run of beam steps (the points of a run are one step apart, while a
+            run may start anywhere, even diagonally next to where the previous run ended)
+    """
+    n_rows, n_cols = grid.shape
+    n_states = 4 * (2 * n_cols + 1) * (2 * n_rows + 1)
+    seen = np.zeros((2 * n_cols + 1, 2 * n_rows + 1, 4), dtype=np.int64)
+    queue = np.empty((n_states, 4), dtype=np.int64)
+    # each branch records its start and its last point besides one point per state it marks, and every branch start
+    # is itself a marked state, so a laser records at most 2 * n_states points
+    visited_pts = np.empty((2 * laser_pos.shape[0] * n_states, 2), dtype=np.int64)
+    laser_idxs = np.empty(2 * laser_pos.shape[0] * n_states, dtype=np.int64)
+    touched_cells = np.zeros((n_rows, n_cols), dtype=np.bool_)
+    branch_starts = np.empty(2 * laser_pos.shape[0] * n_states, dtype=np.bool_)
+
+    n_visited, _ = trace_beams(grid, laser_pos, laser_dir, seen, 1, queue, visited_pts, laser_idxs, touched_cells,
+                               attribute_lasers, counters, branch_starts)
+    return visited_pts[:n_visited], laser_idxs[:n_visited], touched_cells, branch_starts[:n_visited]
+
+
+@jit(nopython=True, cache=True)
+def evaluate_boards(grids, laser_pos, laser_dir, goals, counters=None):
+    """
+    Compiled batch evaluator: trace a whole stack of candidate boards and check which ones solve the puzzle.
+    The tracing buffers are allocated once per batch and the lasers of a board share their visited states; a goal is
+    hit when some state at its point carries a stamp of that board.
+
+    **Parameters**
+
+        grids: *numpy.array<int8, 3D>*
+            A stack of board configurations indexed [board, row, col]
+        laser_pos: *numpy.array<int64, 2D>*
+            [x, y] coords of the laser sources, one row per source
+        laser_dir: *numpy.array<int64, 2D>*
+            [vx, vy] directions of the laser sources, one row per source
+        goals: *numpy.array<int64, 2D>*
+            [x, y] coords of the points that the laser must pass through, one row per point
+        counters: *numpy.array<int64, 1D>*
+            Optional instrumentation counters, passed on to trace_beams
+
+    **Returns**
+
+        hits: *numpy.array<bool, 1D>*
+            True for each board whose laser path goes through all required points
+    """
+    n_boards, n_rows, n_cols = grids.shape
+    n_states = 4 * (2 * n_cols + 1) * (2 * n_rows + 1)
+    hits = np.zeros(n_boards, dtype=np.bool_)
+    seen = np.zeros((2 * n_cols + 1, 2 * n_rows + 1, 4), dtype=np.int64)
+    queue = np.empty((n_states, 4), dtype=np.int64)
+    visited_pts = np.empty((2 * laser_pos.shape[0] * n_states, 2), dtype=np.int64)
+    laser_idxs = np.empty(2 * laser_pos.shape[0] * n_states, dtype=np.int64)
+    touched_cells = np.zeros((n_rows, n_cols), dtype=np.bool_)
+    stamp = 1
+
+    for b in range(n_boards):
+        first_stamp = stamp
+        _, stamp = trace_beams(grids[b], laser_pos, laser_dir, seen, stamp, queue, visited_pts, laser_idxs,
+                               touched_cells, False, counters)
+
+        all_hit = True
+        for g in range(goals.shape[0]):
+            x = goals[g, 0]
+            y = goals[g, 1]
+            if not (0 <= x <= 2 * n_cols and 0 <= y <= 2 * n_rows) or (
+                    seen[x, y, 0] < first_stamp and seen[x, y, 1] < first_stamp and
+                    seen[x, y, 2] < first_stamp and seen[x, y, 3] < first_stamp):
+                all_hit = False
+                break
+        hits[b] = all_hit
+
+    return hits
+
+
+@jit(nopython=True, cache=True)
+def score_boards(grids, laser_pos, laser_dir, goals, counters=None):
+    """
+    Compiled batch scorer: trace a whole stack of candidate boards and count the required points each one covers.
+    Slower than evaluate_boards (no early exit on the first missed point), used when the best partial candidate of a
+    budgeted search is tracked.
+
+    **Parameters**
+
+        See evaluate_boards.
+
+    **Returns**
+
+        scores: *numpy.array<int64, 1D>*
+            The number of required points the laser path of each board goes through
+    """
+    n_boards, n_rows, n_cols = grids.shape
+    n_states = 4 * (2 * n_cols + 1) * (2 * n_rows + 1)
+    scores = np.zeros(n_boards, dtype=np.int64)
+    seen = np.zeros((2 * n_cols + 1, 2 * n_rows + 1, 4), dtype=np.int64)
+    queue = np.empty((n_states, 4), dtype=np.int64)
+    visited_pts = np.empty((2 * laser_pos.shape[0] * n_states, 2), dtype=np.int64)
+    laser_idxs = np.empty(2 * laser_pos.shape[0] * n_states, dtype=np.int64)
+    touched_cells = np.zeros((n_rows, n_cols), dtype=np.bool_)
+    stamp = 1
+
+    for b in range(n_boards):
+        first_stamp = stamp
+        _, stamp = trace_beams(grids[b], laser_pos, laser_dir, seen, stamp, queue, visited_pts, laser_idxs,
+                               touched_cells, False, counters)
+
+        for g in range(goals.shape[0]):
+            x = goals[g, 0]
+            y = goals[g, 1]
+            if 0 <= x <= 2 * n_cols and 0 <= y <= 2 * n_rows and (
+                    seen[x, y, 0] >= first_stamp or seen[x, y, 1] >= first_stamp or
+                    seen[x, y, 2] >= first_stamp or seen[x, y, 3] >= first_stamp):
+                scores[b] += 1
+
+    return scores
+
+
+def warm_up():
+    """
+    Compile (or load from the on-disk cache) every kernel specialization used by the solver by tracing a tiny board,
+    with and without instrumentation counters.
+
+    **Parameters**
+
+        None
+
+    **Returns**
+
+        None
+    """
+    grids = np.array([[[0, 2], [1, 3]]], dtype=np.int8)
+    laser_pos = np.array([[0, 1]], dtype=np.int64)
+    laser_dir = np.array([[1, 1]], dtype=np.int64)
+    goals = np.array([[1, 2]], dtype=np.int64)
+    # the solver always passes counters, either None or an array (an omitted argument is another specialization)
+    for counters in (None, np.zeros(N_TRACE_COUNTERS, dtype=np.int64)):
+        for attribute_lasers in (False, True):
+            trace_laser_paths(grids[0], laser_pos, laser_dir, counters, attribute_lasers)
+        evaluate_boards(grids, laser_pos, laser_dir, goals, counters)
+        score_boards(grids, laser_pos, laser_dir, goals, counters)
+
+
+if __name__ == '__main__':
+    # fill the on-disk cache ahead of time, e.g. when deploying
+    start = time.perf_counter()
+    warm_up()
+    print(f'kernels ready in {time.perf_counter() - start:.2f} seconds')
@@ -6,6 +6,12 @@ Created on Tue Mar 28 06:04:43 2023
 @author: Maranda McDonald
 """
 from PIL import Image, ImageDraw
+import numpy as np
+import statistics
+import time
+
+GRID_LINE_COLOR = (0, 0, 0)
+BEAM_COLOR = (255, 0, 0)
 
 
 def get_colors():
@@ -40,7 +46,7 @@ def get_colors():
     }
 
 
-def render_board(grid, laserList, filename, dimensions=100):
+def render_board(grid, laserList, filename, dimensions=100, pointGoalList=None, laserPaths=None):
     """
     Given a fully configured board and the associated .bff file name, produce a visually-interpretable rendering
     of the board configuration.
@@ -62,74 +68,155 @@ def render_board(grid, laserList, filename, dimensions=100):
             List of integer lists specifying the origin coordinates and trajectory of each laser beam. Each
             interior list represents one laser 'emitter'. The length of the outside/containing list holding
             the inside lists may be arbitrarily long but length of every inside list is exactly 4 elements.
-            The first element of the inside list is the x orgin, the followed by the y origin, followed by 
+            The first element of the inside list is the x orgin, the followed by the y origin, followed by
             +/-1 for the x direction, then +/-1 for the y direction. Coordinate 0,0 is the top left.
 
             [[x_origin,y_origin,+-1,+-1]...]
 
+        filename: *str*
+            TThe desired name of the final .png file
+
+        dimensions: *int*
+            The dimensions of the board, where dimesnions=100 is a 100 x 100 pixel board
+
         pointGoalList: *list, list, int*
             List of integer lists containing the coordinates of goal points that must have a laser pass
             through them. Each individual 2 element list contained within the outer list represents the
             x and y coordinate of a single point. There may be multiple points and so the number of lists
             contained in the outer list can be arbitrarily large, however each of these inner lists is
-            exactly 2 elements. Coordinate 0,0 is the top left.
+            exactly 2 elements. Coordinate 0,0 is the top left. Optional, drawn as circles.
 
             [[x_coordinate,y_coordinate]...]
-    
-        filename: *str*
-            TThe desired name of the final .png file
-            
-        dimensions: *int*
-            The dimensions of the board, where dimesnions=100 is a 100 x 100 pixel board
+
+        laserPaths: *list, list, list, int*
+            Runs of visited [x, y] points, each in the order the beam visited them with consecutive points one step
+            apart (as in Board.laser_branches). Optional, each run drawn as a polyline of beam segments.
 
     ** Returns **
 
         A rendered image of the board containing blocks, lasers and holes. Saves as a .png
     """
+    img = draw_board(grid, laserList, dimensions, pointGoalList, laserPaths)
 
+    # To name the image file
+    # This will say "solved", even though any board can be sent to this function
+    filename_new = '.'.join(filename.split(".")[0:-1])
+    filename_new += "_solved.png"
+
+    img.save("%s" % filename_new)
+
+
+def draw_board(grid, laserList, dimensions=100, pointGoalList=None, laserPaths=None):
+    """
+    Draw the board in memory (see render_board for the parameters).
+
+    The cells are built as one numpy array (a color lookup per cell, scaled up with np.repeat) and converted
+    to an image in one shot; grid lines, beams, goals, and lasers all go through a single ImageDraw.
+
+    **Returns**
+
+        img: *PIL.Image*
+            The rendered board
+    """
     nSizex = len(grid[0])
     nSizey = len(grid)
     dimx = nSizex * dimensions
     dimy = nSizey * dimensions
-    colors = get_colors()
 
-    img = Image.new("RGB", (dimx, dimy), color=0)
+    # color lookup table indexed by block type
+    colors = get_colors()
+    lut = np.zeros((max(colors) + 1, 3), dtype=np.uint8)
+    for block, color in colors.items():
+        lut[block] = color
 
     # Define the size of the board
-    for jy in range(nSizey):
-        for jx in range(nSizex):
-            x = jx * dimensions
-            y = jy * dimensions
-
-            for i in range(dimensions):
-                for j in range(dimensions):
-                    img.putpixel((x + i, y + j),
-                                 colors[grid[jy][jx]])
+    pixels = lut[np.asarray(grid, dtype=np.intp)]
+    pixels = np.repeat(np.repeat(pixels, dimensions, axis=0), dimensions, axis=1)
+    img = Image.fromarray(np.ascontiguousarray(pixels), mode="RGB")
+    draw = ImageDraw.Draw(img)
+
     # To color y
     for i in range(nSizey - 1):
         y = (i + 1) * dimensions
-        shape = [(0, y), (dimx, y)]
-        img_new = ImageDraw.Draw(img)
-        img_new.line(shape, fill=0 in colors.keys(), width=5)
-    
+        draw.line([(0, y), (dimx, y)], fill=GRID_LINE_COLOR, width=5)
+
     # To color x
     for i in range(nSizex - 1):
         x = (i + 1) * dimensions
-        shape = [(x, 0), (x, dimy)]
-        img_new = ImageDraw.Draw(img)
-        img_new.line(shape, fill=0 in colors.keys(), width=5)
-    
+        draw.line([(x, 0), (x, dimy)], fill=GRID_LINE_COLOR, width=5)
+
+    # To color the traced beams, one segment between each pair of consecutive neighboring points of a run. Runs are
+    # drawn apart, since a branch may start right next to where the previous one ended without the beam crossing
+    # between them; a jump between non-neighbors inside a run is skipped as well.
+    half = dimensions / 2
+    for path in laserPaths or []:
+        for (x0, y0), (x1, y1) in zip(path[:-1], path[1:]):
+            if abs(x1 - x0) == 1 and abs(y1 - y0) == 1:
+                draw.line([(x0 * half, y0 * half), (x1 * half, y1 * half)], fill=BEAM_COLOR, width=4)
+
+    # To color the goal points
+    for x, y in pointGoalList or []:
+        draw.ellipse([x * half - 8, y * half - 8, x * half + 8, y * half + 8], fill=(255, 255, 255),
+                     outline=(255, 0, 0), width=3)
+
     # To color the lasers
-    for i in range(len(laserList)):
-        lazor_info = laserList[i]
+    for lazor_info in laserList:
         lazor_pos = (lazor_info[0], lazor_info[1])
-        img_new = ImageDraw.Draw(img)
-        img_new.ellipse([lazor_pos[0] * dimensions / 2 - 10, lazor_pos[1] * dimensions / 2 - 10,
-                         lazor_pos[0] * dimensions / 2 + 10, lazor_pos[1] * dimensions / 2 + 10], fill=(255, 0, 0))
+        draw.ellipse([lazor_pos[0] * half - 10, lazor_pos[1] * half - 10,
+                      lazor_pos[0] * half + 10, lazor_pos[1] * half + 10], fill=(255, 0, 0))
 
-    # To name the image file
-    # This will say "solved", even though any board can be sent to this function
-    filename_new = '.'.join(filename.split(".")[0:-1])
-    filename_new += "_solved.png"
+    return img
 
-    img.save("%s" % filename_new)
+
+def benchmark_render(sizes=(3, 5, 8, 12, 20), repeats=5, dimensions=100):
+    """
+    Time draw_board against the former per-pixel putpixel fill on random boards of increasing size.
+
+    **Parameters**
+
+        sizes: *tuple, int*
+            Side lengths (in cells) of the square boards to render
+        repeats: *int*
+            Number of timed renders per size (the median is reported)
+        dimensions: *int*
+            Pixels per cell
+
+    **Returns**
+
+        timings: *list, dict*
+            One {'size', 'draw_board_ms', 'putpixel_fill_ms'} record per size
+    """
+    rng = np.random.default_rng(0)
+    colors = get_colors()
+    timings = []
+    for size in sizes:
+        grid = rng.integers(0, 8, size=(size, size)).tolist()
+        lasers = [[0, 1, 1, 1]]
+        paths = [[[k, k + 1] for k in range(2 * size)]]
+        goals = [[2 * size - 1, 2 * size]]
+
+        draw_times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            draw_board(grid, lasers, dimensions, goals, paths)
+            draw_times.append(time.perf_counter() - start)
+
+        # the cell fill of the original implementation, one putpixel call per pixel (timed once, it is slow)
+        img = Image.new("RGB", (size * dimensions, size * dimensions), color=0)
+        start = time.perf_counter()
+        for jy in range(size):
+            for jx in range(size):
+                for i in range(dimensions):
+                    for j in range(dimensions):
+                        img.putpixel((jx * dimensions + i, jy * dimensions + j), colors[grid[jy][jx]])
+        putpixel_time = time.perf_counter() - start
+
+        timings.append({'size': size, 'draw_board_ms': round(1000 * statistics.median(draw_times), 3),
+                        'putpixel_fill_ms': round(1000 * putpixel_time, 3)})
+    return timings
+
+
+if __name__ == '__main__':
+    for record in benchmark_render():
+        print(f"{record['size']:>3} x {record['size']:<3} draw_board {record['draw_board_ms']:>9.2f} ms    "
+              f"putpixel fill {record['putpixel_fill_ms']:>10.2f} ms")
@@ -1,11 +1,197 @@
-from LazorSolver import LazorSolver
+"""
+Command-line entry point: solve a batch of .bff puzzles on a pool of worker processes.
+
+Puzzles may be given as files, glob patterns, or directories (every .bff file inside is solved). Every puzzle of a
+pack file (see PuzzlePack) is solved, each worker loading only its own puzzle from the mapped pack. One JSON record
+is printed per puzzle as soon as it finishes, e.g.
+
+    python run.py bff/ --processes 4 > results.jsonl
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+import traceback
+
+from LazorSolver import solve_file, SEARCH_METHODS
+from PuzzlePack import PuzzlePack, PACK_SUFFIX, pack_entry
+from laser_kernels import warm_up
+from SearchCheckpoint import SearchCheckpoint
+from SolutionCache import SolutionCache
+from SolveBudget import SolveBudget
+
+
+def find_puzzles(paths):
+    """
+    Expand files, glob patterns, and directories into a sorted list of .bff files (without duplicates). Pack files
+    given as files or glob patterns expand to one reference per puzzle ('pack.lzpk#N').
+
+    **Parameters**
+
+        paths: *list, str*
+            Files, glob patterns, or directories
+
+    **Returns**
+
+        puzzle_files: *list, str*
+            The .bff files (and puzzles of packs) to solve
+    """
+    puzzle_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, '**', '*.bff'), recursive=True)
+        elif os.path.isfile(path):
+            matches = [path]
+        else:
+            matches = glob.glob(path, recursive=True)
+        if len(matches) == 0:
+            print(f'warning: no puzzles found for {path!r}', file=sys.stderr)
+        for match in sorted(match for match in matches if os.path.isfile(match)):
+            if match.endswith(PACK_SUFFIX):
+                with PuzzlePack(match) as pack:
+                    puzzle_files += [pack_entry(match, n) for n in range(len(pack))]
+            else:
+                puzzle_files.append(match)
+    return list(dict.fromkeys(puzzle_files))
+
+
+def solve_puzzle(file_ptr, method='enumerate', render=False, cache_path=None, time_limit=None, checkpoint_dir=None,
+                 checkpoint_interval=60.0):
+    """
+    Worker task: solve one puzzle and summarize the outcome as a JSON-serializable record.
+
+    **Parameters**
+
+        file_ptr: *str*
+            A string pointing to the .bff file (or the puzzle of a pack, 'pack.lzpk#N') to solve
+        method: *str*
+            The search method used by LazorSolver.solve
+        render: *bool*
+            Save an image of the solved board next to the .bff file
+        cache_path: *str*
+            Path of a SolutionCache database to check before searching and to store new solutions in (None
+            disables the cache)
+        time_limit: *float*
+            Seconds the search may run before it gives up with its best partial placement (None for no limit)
+        checkpoint_dir: *str*
+            Directory of the search checkpoints: the search resumes from the checkpoint of this puzzle if there is
+            one and keeps it up to date (None disables checkpoints)
+        checkpoint_interval: *float*
+            Minimum seconds between two checkpoint writes
+
+    **Returns**
+
+        record: *dict*
+            file, solved, seconds, boards_evaluated, from_cache, and placement ([row, col, block] per placed
+            block), plus score, n_goals, stop_reason, and best_placement under a time limit, or file and error if
+            the puzzle could not be processed
+    """
+    start = time.perf_counter()
+    budget = None if time_limit is None else SolveBudget(time_limit)
+    checkpoint = None
+    if checkpoint_dir is not None:
+        checkpoint = SearchCheckpoint(os.path.join(checkpoint_dir, checkpoint_name(file_ptr)), checkpoint_interval)
+    try:
+        if cache_path is None:
+            result = solve_file(file_ptr, verbose=False, render=render, budget=budget, checkpoint=checkpoint,
+                                method=method)
+        else:
+            with SolutionCache(cache_path) as cache:
+                result = solve_file(file_ptr, verbose=False, render=render, budget=budget, checkpoint=checkpoint,
+                                    method=method, solution_cache=cache)
+    except Exception as e:
+        return {'file': file_ptr, 'solved': False, 'seconds': round(time.perf_counter() - start, 4),
+                'error': f'{type(e).__name__}: {e}', 'traceback': traceback.format_exc()}
+    record = {
+        'file': file_ptr,
+        'solved': result.solved,
+        'seconds': round(time.perf_counter() - start, 4),
+        'boards_evaluated': result.boards_evaluated,
+        'from_cache': result.from_cache,
+        'placement': result.placement,
+    }
+    if checkpoint is not None:
+        record.update(resumed=checkpoint.resumed)
+    if budget is not None:
+        record.update(score=result.score, n_goals=result.n_goals, stop_reason=result.stop_reason,
+                      best_placement=result.best_placement)
+    return record
+
+
+def checkpoint_name(file_ptr):
+    """
+    File name of the checkpoint of a puzzle: its path with every character other than letters, digits, '-', and '.'
+    replaced, so that puzzles with the same name in different directories (or packs) do not share a checkpoint.
+
+    **Parameters**
+
+        file_ptr: *str*
+            A string pointing to the .bff file (or the puzzle of a pack)
+
+    **Returns**
+
+        *str*
+            e.g. 'bff_mad_7.bff.checkpoint.json'
+    """
+    return re.sub(r'[^\w.-]', '_', os.path.normpath(file_ptr)) + '.checkpoint.json'
+
+
+def main(argv=None):
+    """
+    Parse the command line, solve every puzzle, and stream one JSON record per puzzle to stdout.
+
+    **Parameters**
+
+        argv: *list, str*
+            Command-line arguments (defaults to sys.argv[1:])
+
+    **Returns**
+
+        exit_code: *int*
+            0 if every puzzle was solved, 1 otherwise
+    """
+    parser = argparse.ArgumentParser(description='Solve Lazors puzzles (.bff files) in parallel.')
+    parser.add_argument('paths', nargs='*', default=['bff'],
+                        help='.bff files, pack files, glob patterns, or directories to solve (default: bff)')
+    parser.add_argument('-p', '--processes', type=int, default=os.cpu_count(),
+                        help='number of worker processes (default: every core)')
+    parser.add_argument('-m', '--method', choices=SEARCH_METHODS, default='enumerate',
+                        help='search method (default: enumerate)')
+    parser.add_argument('--render', action='store_true', help='save an image of each solved board')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='SQLite solution cache to reuse solutions from and store new ones in')
+    parser.add_argument('--time-limit', type=float, metavar='SECONDS',
+                        help='give up on a puzzle after this long and report its best partial placement')
+    parser.add_argument('--checkpoint-dir', metavar='DIR',
+                        help='keep a checkpoint of each search in DIR and resume from it after an interruption '
+                             '(enumerate method only)')
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0, metavar='SECONDS',
+                        help='minimum seconds between two checkpoint writes (default: 60)')
+    args = parser.parse_args(argv)
+    if args.checkpoint_dir is not None and args.method != 'enumerate':
+        parser.error('--checkpoint-dir needs --method enumerate')
+
+    puzzle_files = find_puzzles(args.paths)
+    if len(puzzle_files) == 0:
+        parser.error(f'no .bff files found in {args.paths}')
+
+    # load the compiled kernels before forking, so the workers inherit them instead of each loading them again
+    warm_up()
+    all_solved = True
+    with ProcessPoolExecutor(max_workers=max(1, args.processes)) as executor:
+        futures = [executor.submit(solve_puzzle, file_ptr, args.method, args.render, args.cache, args.time_limit,
+                                   args.checkpoint_dir, args.checkpoint_interval)
+                   for file_ptr in puzzle_files]
+        for future in as_completed(futures):
+            record = future.result()
+            all_solved = all_solved and record['solved']
+            print(json.dumps(record), flush=True)
+    return 0 if all_solved else 1
+
 
 if __name__ == '__main__':
-    LazorSolver('bff/dark_1.bff')
-    LazorSolver('bff/mad_1.bff')
-    LazorSolver('bff/mad_4.bff')
-    LazorSolver('bff/mad_7.bff')
-    LazorSolver('bff/numbered_6.bff')
-    LazorSolver('bff/showstopper_4.bff')
-    LazorSolver('bff/yarn_5.bff')
-    LazorSolver('bff/tiny_5.bff')
+    sys.exit(main())
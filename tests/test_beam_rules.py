@@ -0,0 +1,39 @@
+from beam_rules import next_relevant_cell, reflected_state, edge_cells, cell_edge_points
+from laser_kernels import get_next_relevant_cell
+
+N_ROWS, N_COLS = 3, 4
+
+
+def edge_points():
+    """
+    Every point of the lattice a beam can occupy (on a cell edge, so x + y is odd).
+    """
+    return [(x, y) for x in range(2 * N_COLS + 1) for y in range(2 * N_ROWS + 1) if (x + y) % 2 == 1]
+
+
+def test_next_relevant_cell_matches_kernel():
+    for x, y in edge_points():
+        for dx in (-1, 1):
+            for dy in (-1, 1):
+                assert next_relevant_cell(x, y, dx, dy) == get_next_relevant_cell(x, y, dx, dy)
+
+
+def test_next_relevant_cell_is_an_edge_cell():
+    for x, y in edge_points():
+        for dx in (-1, 1):
+            for dy in (-1, 1):
+                row, col = next_relevant_cell(x, y, dx, dy)
+                if 0 <= row < N_ROWS and 0 <= col < N_COLS:
+                    assert (row, col) in edge_cells(x, y, N_ROWS, N_COLS)
+                    # reflecting keeps the beam at the point but turns it away from the cell
+                    assert next_relevant_cell(*reflected_state(x, y, dx, dy)) != (row, col)
+
+
+def test_edge_cells_and_cell_edge_points_agree():
+    for row in range(N_ROWS):
+        for col in range(N_COLS):
+            for x, y in cell_edge_points(row, col):
+                assert (row, col) in edge_cells(x, y, N_ROWS, N_COLS)
+    for x, y in edge_points():
+        for row, col in edge_cells(x, y, N_ROWS, N_COLS):
+            assert (x, y) in cell_edge_points(row, col)
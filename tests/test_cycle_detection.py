@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from bffParser import parseBFF
+from Board import N_BLOCK_TYPES
+from laser_kernels import evaluate_boards, score_boards, trace_laser_paths
+from LazorSolver import LazorSolver
+from SegmentCache import SegmentCache
+
+# a closed box of reflective blocks around 2x2 free cells: the beam bounces around the box forever
+BOX = [[1, 1, 1, 1],
+       [1, 0, 0, 1],
+       [1, 0, 0, 1],
+       [1, 1, 1, 1]]
+LASER_POS = [[3, 2]]
+LASER_DIR = [[1, 1]]
+DIAMOND = [[3, 2], [4, 3], [5, 4], [6, 5], [5, 6], [4, 5], [3, 4], [2, 3]]
+
+# a refractive block inside the box splits the beam, and both branches loop
+SPLIT_BOX = [[1, 1, 1, 1],
+             [1, 2, 0, 1],
+             [1, 0, 0, 1],
+             [1, 1, 1, 1]]
+SPLIT_POINTS = DIAMOND + [[2, 5], [3, 6], [6, 3], [5, 2]]
+
+# the only solution closes the beam into a loop around the fixed box
+LOOPING_BFF = '''GRID START
+A A A A A
+A o o o A
+A o o o A
+A o o o A
+A A A A A
+GRID STOP
+A 1
+L 3 2 1 1
+P 7 4
+P 5 8
+P 2 5
+'''
+
+
+def kernel_trace(grid, attribute_lasers):
+    """
+    Trace a board with the compiled kernel.
+    """
+    visited_pts, _, _, _ = trace_laser_paths(np.array(grid, dtype=np.int8), np.array(LASER_POS), np.array(LASER_DIR),
+                                             None, attribute_lasers)
+    return visited_pts.tolist()
+
+
+def cached_trace(grid, attribute_lasers):
+    """
+    Trace a board through a segment cache.
+    """
+    block_masks = [0] * N_BLOCK_TYPES
+    for row, cells in enumerate(grid):
+        for col, cell in enumerate(cells):
+            block_masks[cell] |= 1 << (row * len(cells) + col)
+    visited_pts, _, _, _ = SegmentCache(len(grid), len(grid[0])).trace(tuple(block_masks), LASER_POS, LASER_DIR, None,
+                                                                       attribute_lasers)
+    return visited_pts
+
+
+@pytest.mark.parametrize('attribute_lasers', [False, True])
+def test_kernel_ends_a_loop_where_it_closes(attribute_lasers):
+    # every state of the loop is visited once, then the beam is back at its start
+    assert kernel_trace(BOX, attribute_lasers) == DIAMOND + [DIAMOND[0]]
+
+
+@pytest.mark.parametrize('trace', [kernel_trace, cached_trace])
+@pytest.mark.parametrize('attribute_lasers', [False, True])
+def test_split_loops_terminate(trace, attribute_lasers):
+    visited_pts = trace(SPLIT_BOX, attribute_lasers)
+    assert set(map(tuple, visited_pts)) == set(map(tuple, SPLIT_POINTS))
+    # each of the four directions can pass a point at most once
+    assert len(visited_pts) <= 4 * len(SPLIT_POINTS) + 2
+
+
+def test_cached_trace_of_a_loop_visits_the_kernel_points():
+    assert set(map(tuple, cached_trace(BOX, False))) == set(map(tuple, DIAMOND))
+
+
+def test_batch_kernels_terminate_on_looping_boards():
+    grids = np.array([BOX, SPLIT_BOX], dtype=np.int8)
+    goals = np.array([[6, 5], [2, 3], [3, 6]])
+    laser_pos, laser_dir = np.array(LASER_POS), np.array(LASER_DIR)
+    assert evaluate_boards(grids, laser_pos, laser_dir, goals).tolist() == [False, True]
+    assert score_boards(grids, laser_pos, laser_dir, goals).tolist() == [2, 3]
+
+
+@pytest.mark.parametrize('method', ['enumerate', 'backtrack', 'constraint'])
+def test_solves_a_puzzle_whose_solution_loops(method):
+    solver = LazorSolver(method=method)
+    solver.load_puzzle(*parseBFF(LOOPING_BFF))
+    result = solver.solve()
+    assert result.solved
+    assert result.placement == [[1, 2, 1]]
+    result.board.get_laser_path(attribute_lasers=True)
+    (path,) = result.board.laser_visited_pts.values()
+    assert path[-1] == path[0] == [3, 2]
@@ -0,0 +1,23 @@
+import pytest
+from bffParser import parseBFF
+from LazorSolver import LazorSolver, SEARCH_METHODS
+
+# a valid level with no blocks to place: the laser already crosses the goal
+ZERO_BLOCK_BFF = """
+GRID START
+o o
+o o
+GRID STOP
+L 1 0 1 1
+P 2 1
+"""
+
+
+@pytest.mark.parametrize('method', SEARCH_METHODS)
+def test_solves_zero_block_puzzle(method):
+    solver = LazorSolver(method=method)
+    solver.load_puzzle(*parseBFF(ZERO_BLOCK_BFF))
+    solver.precompute()
+    result = solver.solve()
+    assert result.solved
+    assert result.placement == []
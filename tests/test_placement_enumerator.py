@@ -0,0 +1,66 @@
+import itertools
+from math import factorial
+import pytest
+from PlacementEnumerator import PlacementEnumerator, ENUMERATION_ORDERS
+
+# sites listed out of index order, as a SiteOrdering ranks them; blocks with repeated types
+FREE_SITES = [7, 2, 9, 0, 5, 3]
+BLOCKS = [2, 1, 1, 3, 1]
+
+
+def expected_size(n_sites, blocks):
+    """
+    The number of distinct placements of a multiset of blocks on n_sites: n! / ((n - k)! * prod(count!)).
+    """
+    size = factorial(n_sites) // factorial(n_sites - len(blocks))
+    for block in set(blocks):
+        size //= factorial(blocks.count(block))
+    return size
+
+
+def as_cells(enumerator, placement):
+    """
+    The (site, block) pairs of a placement, equal for two placements exactly when they fill the same board.
+    """
+    return frozenset(zip(placement, enumerator.block_list))
+
+
+@pytest.mark.parametrize('order', ENUMERATION_ORDERS)
+def test_visits_every_placement_once(order):
+    enumerator = PlacementEnumerator(FREE_SITES, BLOCKS, order)
+    placements = list(enumerator.iterate())
+    assert len(placements) == enumerator.size == expected_size(len(FREE_SITES), BLOCKS)
+
+    boards = {as_cells(enumerator, placement) for placement in placements}
+    assert len(boards) == len(placements)
+    every_board = {frozenset(zip(sites, BLOCKS)) for sites in itertools.permutations(FREE_SITES, len(BLOCKS))}
+    assert boards == every_board
+
+
+@pytest.mark.parametrize('order', ENUMERATION_ORDERS)
+def test_rank_and_unrank_are_inverses(order):
+    enumerator = PlacementEnumerator(FREE_SITES, BLOCKS, order)
+    for index, placement in enumerate(enumerator.iterate()):
+        assert enumerator.rank(placement) == index
+        assert enumerator.unrank(index) == placement
+        assert enumerator.unrank(enumerator.rank(placement)) == placement
+
+
+@pytest.mark.parametrize('order', ENUMERATION_ORDERS)
+def test_slices_concatenate_to_the_whole_order(order):
+    enumerator = PlacementEnumerator(FREE_SITES, BLOCKS, order)
+    bounds = [0, 1, 17, 100, 101, enumerator.size]
+    sliced = [placement for lo, hi in zip(bounds[:-1], bounds[1:]) for placement in enumerator.iterate(lo, hi)]
+    assert sliced == list(enumerator.iterate())
+
+
+def test_best_first_exhausts_the_best_sites_first():
+    enumerator = PlacementEnumerator(FREE_SITES, BLOCKS, 'best_first')
+    worst_ranks = [max(FREE_SITES.index(site) for site in placement) for placement in enumerator.iterate()]
+    assert worst_ranks == sorted(worst_ranks)
+
+
+def test_empty_block_list_has_one_empty_placement():
+    enumerator = PlacementEnumerator(FREE_SITES, [])
+    assert list(enumerator.iterate()) == [()]
+    assert enumerator.rank(()) == 0
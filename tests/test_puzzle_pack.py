@@ -0,0 +1,73 @@
+import glob
+import os
+import pytest
+from bffParser import openBFF, parseBFF
+from LazorSolver import LazorSolver
+from PuzzlePack import PuzzlePack, bff_to_pack, load_puzzle_file, pack_entry, write_pack
+
+BFF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bff')
+BFF_FILES = sorted(glob.glob(os.path.join(BFF_DIR, '*.bff')))
+
+# holes, fixed blocks of every type, negative directions, and blocks of every type to place
+MIXED_BFF = '''GRID START
+o A x o
+B o C o
+o o o x
+GRID STOP
+A 2
+B 1
+C 3
+L 8 1 -1 1
+L 3 6 1 -1
+P 0 3
+P 5 0
+P 7 6
+'''
+
+
+def same_puzzle(packed, parsed):
+    """
+    Whether a puzzle read from a pack is the parsed one (a pack keeps the blocks to place grouped by type).
+    """
+    return packed[:3] == parsed[:3] and sorted(packed[3]) == sorted(parsed[3])
+
+
+def test_round_trip_matches_openbff(tmp_path):
+    path = str(tmp_path / 'levels.lzpk')
+    assert bff_to_pack(BFF_FILES, path) == len(BFF_FILES)
+    with PuzzlePack(path) as pack:
+        assert len(pack) == len(BFF_FILES)
+        for n, file_ptr in enumerate(BFF_FILES):
+            assert same_puzzle(pack[n], openBFF(file_ptr))
+            assert pack.name(n) == os.path.splitext(os.path.basename(file_ptr))[0]
+            assert pack.index_of(pack.name(n)) == n
+        assert all(map(same_puzzle, pack, map(openBFF, BFF_FILES)))
+        assert same_puzzle(pack[-1], openBFF(BFF_FILES[-1]))
+        with pytest.raises(IndexError):
+            pack[len(BFF_FILES)]
+
+
+def test_round_trip_keeps_every_cell_and_block_type(tmp_path):
+    path = str(tmp_path / 'mixed.lzpk')
+    puzzle = parseBFF(MIXED_BFF)
+    write_pack(path, [('mixed', puzzle), ('empty', ([[0]], [[1, 0, 1, 1]], [[2, 1]], []))])
+    with PuzzlePack(path) as pack:
+        assert same_puzzle(pack[0], puzzle)
+        assert pack[0][3] == [1, 1, 2, 2, 2, 3]
+        assert pack[1] == ([[0]], [[1, 0, 1, 1]], [[2, 1]], [])
+
+
+def test_load_puzzle_file_reads_pack_entries(tmp_path):
+    path = str(tmp_path / 'levels.lzpk')
+    bff_to_pack(BFF_FILES, path)
+    for n, file_ptr in enumerate(BFF_FILES):
+        assert same_puzzle(load_puzzle_file(pack_entry(path, n)), load_puzzle_file(file_ptr))
+
+
+def test_packed_puzzles_solve_like_their_bff_files(tmp_path):
+    path = str(tmp_path / 'levels.lzpk')
+    bff_to_pack(BFF_FILES, path)
+    for n, file_ptr in enumerate(BFF_FILES):
+        packed = LazorSolver(pack_entry(path, n), method='constraint').solve()
+        parsed = LazorSolver(file_ptr, method='constraint').solve()
+        assert packed.solved and packed.placement == parsed.placement
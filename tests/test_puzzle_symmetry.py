@@ -0,0 +1,91 @@
+import pytest
+from bffParser import parseBFF
+from Board import Board, points_to_mask
+from LazorSolver import LazorSolver, generate_possible_configs
+
+# lasers and goals mirrored about the vertical axis of the grid
+MIRRORED = '''GRID START
+o o o
+o o o
+o o o
+GRID STOP
+A 2
+L 1 0 1 1
+L 5 0 -1 1
+P 0 3
+P 6 3
+'''
+
+# lasers and goals turned by quarter turns about the center of the grid
+ROTATED = '''GRID START
+o o o
+o o o
+o o o
+GRID STOP
+A 2
+C 1
+L 3 0 1 1
+L 6 3 -1 1
+L 3 6 -1 -1
+L 0 3 1 -1
+P 1 4
+P 4 5
+P 5 2
+P 2 1
+'''
+
+# mirrored, but the goal on the axis is out of reach of a single reflective block
+MIRRORED_UNSOLVABLE = '''GRID START
+o o o
+o o o
+o o o
+GRID STOP
+A 1
+L 1 0 1 1
+L 5 0 -1 1
+P 3 0
+'''
+
+PUZZLES = {'mirrored': MIRRORED, 'rotated': ROTATED, 'mirrored_unsolvable': MIRRORED_UNSOLVABLE}
+
+
+def solve(text, method, use_symmetry):
+    """
+    Solve a puzzle given as .bff text.
+    """
+    solver = LazorSolver(method=method, use_symmetry=use_symmetry)
+    solver.load_puzzle(*parseBFF(text))
+    return solver.solve()
+
+
+def all_solutions(text):
+    """
+    Every placement that solves a puzzle given as .bff text, found by tracing every board.
+    """
+    grid, laser_list, point_goal_list, block_list = parseBFF(text)
+    goal_mask = points_to_mask(point_goal_list, len(grid[0]))
+    solutions = []
+    for filled_board in generate_possible_configs(grid, block_list):
+        board = Board(filled_board, [laser[0:2] for laser in laser_list], [laser[2:] for laser in laser_list], None)
+        board.get_laser_path()
+        if board.hits_goals(goal_mask):
+            solutions.append(sorted([i, j, cell] for i, row in enumerate(filled_board)
+                                    for j, cell in enumerate(row) if cell != grid[i][j]))
+    return solutions
+
+
+@pytest.mark.parametrize('method', ['enumerate', 'backtrack', 'constraint'])
+@pytest.mark.parametrize('name', sorted(PUZZLES))
+def test_symmetric_search_matches_the_full_search(name, method):
+    text = PUZZLES[name]
+    reduced = solve(text, method, use_symmetry=True)
+    full = solve(text, method, use_symmetry=False)
+    assert len(reduced.symmetries) > 0
+
+    solutions = all_solutions(text)
+    assert reduced.solved == full.solved == (len(solutions) > 0)
+    if reduced.solved:
+        assert sorted(reduced.placement) in solutions
+        assert sorted(full.placement) in solutions
+    if method == 'enumerate':
+        assert reduced.boards_evaluated < full.boards_evaluated
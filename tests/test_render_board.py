@@ -0,0 +1,30 @@
+import glob
+import os
+import pytest
+from Board import Board
+from LazorSolver import LazorSolver
+from render_board import draw_board, BEAM_COLOR
+
+BFF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bff')
+
+
+@pytest.mark.parametrize('file_ptr', sorted(glob.glob(os.path.join(BFF_DIR, '*.bff'))), ids=os.path.basename)
+def test_laser_branches_are_runs_of_beam_steps(file_ptr):
+    solver = LazorSolver(file_ptr)
+    assert solver.solve().solved
+    board = Board(solver.solved_board.board, solver.laser_pos_list, solver.laser_dir_list, file_ptr)
+    board.get_laser_path(attribute_lasers=True)
+    for run in board.laser_branches:
+        for (x0, y0), (x1, y1) in zip(run[:-1], run[1:]):
+            assert abs(x1 - x0) == 1 and abs(y1 - y0) == 1
+    # the runs hold every visited point, in the order of the per-laser paths
+    assert [pt for run in board.laser_branches for pt in run] == \
+        [pt for path in board.laser_visited_pts.values() for pt in path]
+
+
+def test_draws_no_segment_between_runs():
+    # the second run starts diagonally next to where the first one ends
+    img = draw_board([[0, 0], [0, 0]], [[1, 0, 1, 1]], 100, laserPaths=[[[1, 0], [2, 1]], [[3, 2], [4, 3]]])
+    assert img.getpixel((75, 25)) == BEAM_COLOR
+    assert img.getpixel((175, 125)) == BEAM_COLOR
+    assert img.getpixel((125, 75)) != BEAM_COLOR
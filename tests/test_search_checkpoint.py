@@ -0,0 +1,62 @@
+import os
+import pytest
+from LazorSolver import LazorSolver
+from SearchCheckpoint import SearchCheckpoint
+from SolveBudget import SolveBudget
+
+BFF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bff')
+PUZZLE = os.path.join(BFF_DIR, 'yarn_5.bff')
+
+
+def solve(processes=1, budget=None, checkpoint=None):
+    """
+    Enumerate the test puzzle in small batches, so a budget can stop the search part way.
+    """
+    return LazorSolver(PUZZLE, processes=processes, batch_size=256, chunk_size=1024).solve(budget, checkpoint)
+
+
+def covers(ranges, index_range):
+    """
+    Whether sorted, disjoint [lo, hi) ranges cover a whole index range.
+    """
+    return any(lo <= index_range[0] and index_range[1] <= hi for lo, hi in ranges)
+
+
+@pytest.fixture(scope='module')
+def uninterrupted():
+    return solve()
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_resume_skips_covered_ranges(tmp_path, uninterrupted, processes):
+    path = str(tmp_path / 'yarn_5.checkpoint.json')
+
+    # stop the search half way; the checkpoint file records the boards covered so far
+    interrupted = SearchCheckpoint(path, interval=0)
+    first = solve(budget=SolveBudget(max_evaluations=uninterrupted.boards_evaluated // 2), checkpoint=interrupted)
+    assert first.stop_reason == 'evaluations' and not first.solved
+    assert interrupted.status == 'running'
+    assert interrupted.covered == [[0, first.boards_evaluated]]
+
+    checkpoint = SearchCheckpoint(path, interval=0)
+    resumed = solve(processes, checkpoint=checkpoint)
+    assert checkpoint.resumed and checkpoint.status == 'solved'
+    assert resumed.solved and resumed.placement == uninterrupted.placement
+
+    # the resumed run carries the counters over and traces none of the covered boards again
+    n_traced = resumed.boards_evaluated - first.boards_evaluated
+    if processes == 1:
+        assert n_traced == uninterrupted.boards_evaluated - first.boards_evaluated
+    else:
+        assert 0 < n_traced < uninterrupted.boards_evaluated
+    assert covers(checkpoint.covered, [0, first.boards_evaluated])
+
+
+def test_solved_checkpoint_returns_without_tracing(tmp_path, uninterrupted):
+    path = str(tmp_path / 'yarn_5.checkpoint.json')
+    assert solve(checkpoint=SearchCheckpoint(path)).solved
+    checkpoint = SearchCheckpoint(path)
+    resumed = solve(checkpoint=checkpoint)
+    assert checkpoint.resumed
+    assert resumed.solved and resumed.placement == uninterrupted.placement
+    assert resumed.boards_evaluated == uninterrupted.boards_evaluated
@@ -0,0 +1,43 @@
+import random
+import numpy as np
+from Board import N_BLOCK_TYPES
+from laser_kernels import trace_laser_paths
+from SegmentCache import SegmentCache
+
+
+def random_puzzle(rng, n_rows, n_cols):
+    """
+    A random board holding every cell type, and two laser sources on the edges of its cells.
+    """
+    grid = [[rng.choice([0, 0, 0, 0, 1, 2, 3, 4, 5, 6, 7]) for _ in range(n_cols)] for _ in range(n_rows)]
+    lasers = []
+    while len(lasers) < 2:
+        x, y = rng.randrange(2 * n_cols + 1), rng.randrange(2 * n_rows + 1)
+        if (x + y) % 2 == 1:
+            lasers.append([x, y, rng.choice([-1, 1]), rng.choice([-1, 1])])
+    block_masks = [0] * N_BLOCK_TYPES
+    for row in range(n_rows):
+        for col in range(n_cols):
+            block_masks[grid[row][col]] |= 1 << (row * n_cols + col)
+    return grid, lasers, tuple(block_masks)
+
+
+def test_cached_trace_matches_fresh_trace():
+    rng = random.Random(8)
+    n_rows, n_cols = 5, 6
+    cache = SegmentCache(n_rows, n_cols)
+    for _ in range(300):
+        grid, lasers, block_masks = random_puzzle(rng, n_rows, n_cols)
+        laser_pos = [laser[:2] for laser in lasers]
+        laser_dir = [laser[2:] for laser in lasers]
+        for attribute_lasers in (False, True):
+            cached = cache.trace(block_masks, laser_pos, laser_dir, None, attribute_lasers)
+            fresh = SegmentCache(n_rows, n_cols).trace(block_masks, laser_pos, laser_dir, None, attribute_lasers)
+            assert cached == fresh
+
+            # the points and cells visited are the kernel's
+            visited_pts, _, touched_cells, _ = trace_laser_paths(np.array(grid, dtype=np.int8), np.array(laser_pos),
+                                                                  np.array(laser_dir), None, attribute_lasers)
+            assert set(map(tuple, cached[0])) == set(map(tuple, visited_pts.tolist()))
+            assert cached[2] == sum(1 << k for k, touched in enumerate(touched_cells.ravel()) if touched)
+    assert cache.hits > cache.misses
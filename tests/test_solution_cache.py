@@ -0,0 +1,46 @@
+import os
+from Board import TRACER_VERSION
+from LazorSolver import LazorSolver
+from SolutionCache import SolutionCache
+
+BFF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bff')
+PUZZLE = os.path.join(BFF_DIR, 'mad_1.bff')
+
+
+def solve(cache):
+    """
+    Solve the test puzzle through a solution cache.
+    """
+    return LazorSolver(PUZZLE, solution_cache=cache).solve()
+
+
+def test_serves_solutions_of_the_same_tracer_version(tmp_path):
+    path = str(tmp_path / 'solutions.sqlite')
+    with SolutionCache(path) as cache:
+        first = solve(cache)
+    assert first.solved and not first.from_cache
+    with SolutionCache(path) as cache:
+        second = solve(cache)
+        assert cache.hits == 1
+    assert second.from_cache
+    assert second.placement == first.placement
+
+
+def test_misses_after_a_tracer_version_bump(tmp_path):
+    path = str(tmp_path / 'solutions.sqlite')
+    old_version = f'{TRACER_VERSION}-old'
+    with SolutionCache(path, tracer_version=old_version) as cache:
+        assert solve(cache).solved
+        assert len(cache) == 1
+
+    # opening the cache with the current tracer drops the entries of the older one
+    with SolutionCache(path) as cache:
+        assert len(cache) == 0
+        result = solve(cache)
+        assert cache.misses == 1 and cache.hits == 0
+        assert len(cache) == 1
+    assert result.solved and not result.from_cache
+
+    # and going back to the older tracer finds nothing either
+    with SolutionCache(path, tracer_version=old_version) as cache:
+        assert not solve(cache).from_cache
@@ -0,0 +1,78 @@
+import time
+import pytest
+from bffParser import parseBFF
+from Board import Board
+from LazorSolver import LazorSolver
+from SolveBudget import SolveBudget
+
+# no placement of six reflective blocks covers all eight goals, so only the budget can end the search early
+SLOW_BFF = '\n'.join(['GRID START'] + ['o o o o o o o o'] * 8 + ['GRID STOP', 'A 6', 'L 1 0 1 1'] +
+                     [f'P {x} {y}' for x, y in ((0, 1), (16, 1), (0, 15), (16, 15), (7, 0), (9, 16), (0, 7), (16, 9))])
+
+SEARCHES = [('enumerate', 1), ('enumerate', 2), ('backtrack', 1)]
+
+
+def solve(method, processes, budget):
+    """
+    Search the slow puzzle under a budget.
+    """
+    solver = LazorSolver(method=method, processes=processes)
+    solver.load_puzzle(*parseBFF(SLOW_BFF))
+    return solver.solve(budget)
+
+
+def goals_covered(placement):
+    """
+    The number of goals of the slow puzzle covered by the beam of a placement.
+    """
+    grid, laser_list, point_goal_list, block_list = parseBFF(SLOW_BFF)
+    for i, j, block in placement:
+        grid[i][j] = block
+    board = Board(grid, [laser[0:2] for laser in laser_list], [laser[2:] for laser in laser_list], None)
+    board.get_laser_path()
+    visited = {tuple(pt) for path in board.laser_visited_pts.values() for pt in path}
+    return sum(tuple(goal) in visited for goal in point_goal_list)
+
+
+def check_partial_result(result):
+    """
+    Check that a stopped search reports its best complete placement and the goals it covers.
+    """
+    assert not result.solved and result.placement is None
+    assert result.n_goals == 8
+    assert 0 < result.score < result.n_goals
+    assert len(result.best_placement) == 6
+    assert all(block == 1 for _, _, block in result.best_placement)
+    assert goals_covered(result.best_placement) == result.score
+
+
+@pytest.mark.parametrize('method, processes', SEARCHES)
+def test_stops_after_max_evaluations(method, processes):
+    result = solve(method, processes, SolveBudget(max_evaluations=5000))
+    assert result.stop_reason == 'evaluations'
+    assert result.boards_evaluated == 5000
+    check_partial_result(result)
+
+
+@pytest.mark.parametrize('method, processes', SEARCHES)
+def test_stops_at_the_time_limit(method, processes):
+    start = time.perf_counter()
+    result = solve(method, processes, SolveBudget(time_limit=0.3))
+    assert time.perf_counter() - start < 5
+    assert result.stop_reason == 'time'
+    check_partial_result(result)
+
+
+@pytest.mark.parametrize('method', ['enumerate', 'backtrack'])
+def test_progress_callback_cancels_the_search(method):
+    reports = []
+
+    def progress_callback(progress):
+        reports.append(progress)
+        return len(reports) < 3
+
+    result = solve(method, 1, SolveBudget(progress_callback=progress_callback, progress_interval=0))
+    assert result.stop_reason == 'cancelled'
+    assert len(reports) == 3
+    assert reports[-1]['n_goals'] == 8
+    check_partial_result(result)
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+import pytest
+from SolveClient import SolveClient, SolveServerError
+from SolveServer import SolveServer, MAX_BATCH_SIZE
+
+SMALL_BFF = """
+GRID START
+o o
+o o
+GRID STOP
+L 1 0 1 1
+P 2 1
+"""
+
+# a large open board with goals on every side: its search space is far too large to finish within the timeouts
+SLOW_BFF = '\n'.join(['GRID START'] + ['o o o o o o o o'] * 8 + ['GRID STOP', 'A 6', 'L 1 0 1 1'] +
+                     [f'P {x} {y}' for x, y in ((0, 1), (16, 1), (0, 15), (16, 15), (7, 0), (9, 16), (0, 7), (16, 9))])
+
+SMALL_PUZZLE = {'grid': [[0, 0], [0, 0]], 'lasers': [[1, 0, 1, 1]], 'goals': [[2, 1]], 'blocks': []}
+
+MALFORMED_REQUESTS = [
+    {'bff': 5},
+    {'puzzle': dict(SMALL_PUZZLE, grid='o o')},
+    {'bff': SMALL_BFF, 'timeout': 'soon'},
+    {'bff': 'GRID START\no\nGRID STOP\n', 'options': ['batch_size']},
+    {'bff': SMALL_BFF, 'options': {'batch_size': 'x'}},
+    {'bff': SMALL_BFF, 'options': {'batch_size': 0}},
+    {'bff': SMALL_BFF, 'options': {'batch_size': MAX_BATCH_SIZE + 1}},
+    {'bff': SMALL_BFF, 'options': {'segment_cache_size': -1}},
+    {'bff': SMALL_BFF, 'options': {'use_symmetry': 1}},
+    {'bff': SMALL_BFF, 'options': {'ordering': 'bogus'}},
+    {'bff': SMALL_BFF, 'options': {'enumeration_order': 'bogus'}},
+    {'puzzle': dict(SMALL_PUZZLE, lasers=[[1, 0, 1]])},
+    {'puzzle': dict(SMALL_PUZZLE, lasers=[[9, 0, 1, 1]])},
+    {'puzzle': dict(SMALL_PUZZLE, goals=[[2, 1, 0]])},
+    {'puzzle': dict(SMALL_PUZZLE, grid=[[0, 0], [0]])},
+    {'puzzle': dict(SMALL_PUZZLE, grid=[[0, 8], [0, 0]])},
+    {'puzzle': dict(SMALL_PUZZLE, blocks=[4])},
+]
+
+
+def run_with_server(path, client_code, **server_options):
+    """
+    Start a SolveServer on a Unix socket, run client_code(path) in a thread, and return what it returns.
+    """
+    async def scenario():
+        server = SolveServer(**server_options)
+        await server.start(path=path)
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(client_code, path), timeout=30)
+        finally:
+            await server.close()
+
+    return asyncio.run(scenario())
+
+
+def send_malformed_requests(path):
+    """
+    Send every malformed request, returning the error type of each reply and the counters of the server.
+    """
+    error_types = []
+    with SolveClient(path=path) as client:
+        for request in MALFORMED_REQUESTS:
+            with pytest.raises(SolveServerError) as error:
+                client._request(dict(request))
+            error_types.append(error.value.error_type)
+        # the connection is still served after the rejected requests
+        return error_types, client.ping()['counters']
+
+
+def test_rejects_malformed_requests(tmp_path):
+    error_types, counters = run_with_server(str(tmp_path / 'lazor.sock'), send_malformed_requests, processes=1)
+    assert error_types == ['invalid'] * len(MALFORMED_REQUESTS)
+    assert counters['invalid'] == len(MALFORMED_REQUESTS)
+    assert counters['failed'] == 0
+
+
+def time_out_queued_request(path):
+    """
+    Occupy the only worker with a slow search, time out a request waiting behind it, and return the counters once
+    the worker is free again.
+    """
+    slow_result = {}
+
+    def solve_slow():
+        with SolveClient(path=path) as client:
+            slow_result.update(client.solve_bff(SLOW_BFF, timeout=2.5))
+
+    slow = threading.Thread(target=solve_slow)
+    slow.start()
+    time.sleep(0.3)
+    with SolveClient(path=path) as client:
+        with pytest.raises(SolveServerError) as error:
+            client.solve_bff(SMALL_BFF, timeout=0.1)
+        slow.join()
+        # let the dispatcher dequeue the timed out request
+        time.sleep(0.2)
+        counters = client.ping()['counters']
+    return error.value.error_type, slow_result, counters
+
+
+def test_counts_timeout_once(tmp_path):
+    error_type, slow_result, counters = run_with_server(str(tmp_path / 'lazor.sock'), time_out_queued_request,
+                                                        processes=1)
+    assert error_type == 'timeout'
+    assert slow_result['stop_reason'] == 'time'
+    assert counters['timeouts'] == 1
+    assert (counters['solved'], counters['unsolved'], counters['failed']) == (0, 1, 0)